@@ -0,0 +1,288 @@
+"""
+analysis_history.py
+Historial persistente (SQLite) de los análisis generados. Solo se añaden filas: cada
+análisis que genera el LLM guarda ticker, perfil, horizonte, modo, el contexto enviado, los
+indicadores y el resultado (las respuestas servidas desde la caché no se vuelven a guardar).
+Sirve para mostrar al instante el último análisis guardado mientras se genera uno nuevo y
+para ver cómo se han movido los indicadores desde la ejecución anterior con otros datos.
+Las consultas por ticker van por índice, así que siguen siendo rápidas con millones de filas.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from price_cache import CACHE_DIR
+
+DB_FILE = CACHE_DIR / "history.sqlite"
+
+# Filas devueltas por defecto al consultar el historial de un ticker
+DEFAULT_LIMIT = 50
+
+# Las columnas pequeñas van primero: listar el historial lee solo el principio de cada
+# fila y nunca las páginas de desbordamiento del contexto y el resultado, que se guardan
+# comprimidos con zlib (ocupan varias veces menos con millones de filas).
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    horizon TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    last_bar TEXT,
+    indicators TEXT NOT NULL,
+    context BLOB NOT NULL,
+    result BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_ticker ON runs (ticker, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_ticker_profile ON runs (ticker, profile, horizon, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_day ON runs (day);
+"""
+
+_SUMMARY_COLUMNS = "id, created_at, ticker, profile, horizon, mode, last_bar, indicators"
+
+
+# Archivos cuyo esquema ya se creó en este proceso (WAL queda fijado en el propio archivo)
+_ready: set[str] = set()
+_ready_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Abre una conexión al historial; el esquema se crea una vez por proceso y archivo."""
+    path = str(DB_FILE)
+    if path not in _ready:
+        with _ready_lock:
+            if path not in _ready:
+                DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(DB_FILE, timeout=10)
+                try:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                finally:
+                    conn.close()
+                _ready.add(path)
+    return sqlite3.connect(DB_FILE, timeout=10)
+
+
+@contextmanager
+def _db():
+    """Conexión dentro de una transacción que se confirma y se cierra al salir."""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _summary(row: tuple) -> dict:
+    """Convierte una fila de _SUMMARY_COLUMNS en diccionario."""
+    keys = ("id", "created_at", "ticker", "profile", "horizon", "mode", "last_bar", "indicators")
+    entry = dict(zip(keys, row))
+    entry["indicators"] = json.loads(entry["indicators"])
+    return entry
+
+
+def _full(row: Optional[tuple]) -> Optional[dict]:
+    """Convierte una fila de _SUMMARY_COLUMNS más contexto y resultado en diccionario."""
+    if row is None:
+        return None
+    entry = _summary(row[:-2])
+    entry["context"], entry["result"] = (zlib.decompress(blob).decode("utf-8") for blob in row[-2:])
+    return entry
+
+
+def bar_key(value) -> Optional[str]:
+    """
+    Fecha de una barra en el formato único de la columna last_bar ('AAAA-MM-DD HH:MM:SS',
+    sin zona horaria), para que las comparaciones de texto ordenen por fecha.
+
+    Args:
+        value: Fecha como texto ISO, datetime o pandas.Timestamp (o None).
+
+    Raises:
+        ValueError: si el texto no es una fecha ISO.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value.replace(tzinfo=None).isoformat(sep=" ", timespec="seconds")
+
+
+def _compress(text: str) -> bytes:
+    """Texto comprimido para las columnas context y result."""
+    return zlib.compress(text.encode("utf-8"))
+
+
+def record(
+    ticker: str,
+    profile: str,
+    horizon: str,
+    mode: str,
+    context: str,
+    indicators: dict,
+    result: str,
+    last_bar: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Añade un análisis al historial (nunca modifica los anteriores). Las respuestas servidas
+    desde la caché del LLM no deben guardarse otra vez: ya están en el historial.
+
+    Args:
+        ticker: Símbolo del activo.
+        profile: Perfil de riesgo.
+        horizon: Horizonte de inversión.
+        mode: Modo de análisis ('full' o 'fast').
+        context: Texto enviado al LLM.
+        indicators: Indicadores usados en el contexto.
+        result: Texto del análisis.
+        last_bar: Fecha de la última barra de precios usada (ver bar_key).
+
+    Returns:
+        Identificador de la fila, o None si no se pudo guardar.
+
+    Raises:
+        ValueError: si last_bar no es una fecha ISO.
+    """
+    now = time.time()
+    last_bar = bar_key(last_bar)
+    try:
+        with _db() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, day, ticker, profile, horizon, mode, last_bar, indicators, context, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    now, datetime.fromtimestamp(now).strftime("%Y-%m-%d"), ticker.upper(), profile, horizon, mode,
+                    last_bar, json.dumps(indicators, default=float), _compress(context), _compress(result),
+                ),
+            )
+            return cursor.lastrowid
+    except sqlite3.Error:
+        return None
+
+
+def latest(ticker: str, profile: Optional[str] = None, horizon: Optional[str] = None) -> Optional[dict]:
+    """
+    Último análisis guardado de un ticker (y, si se indican, de ese perfil y horizonte).
+
+    Returns:
+        Diccionario con id, created_at, ticker, profile, horizon, mode, last_bar,
+        indicators, context y result; None si no hay ninguno.
+    """
+    query = f"SELECT {_SUMMARY_COLUMNS}, context, result FROM runs WHERE ticker = ?"
+    params: list = [ticker.upper()]
+    if profile is not None and horizon is not None:
+        query += " AND profile = ? AND horizon = ?"
+        params += [profile, horizon]
+    query += " ORDER BY created_at DESC LIMIT 1"
+    try:
+        with _db() as conn:
+            row = conn.execute(query, params).fetchone()
+    except sqlite3.Error:
+        return None
+    return _full(row)
+
+
+def recent(
+    ticker: str,
+    limit: int = DEFAULT_LIMIT,
+    since: Optional[float] = None,
+    before_bar: Optional[str] = None,
+) -> list[dict]:
+    """
+    Historial reciente de un ticker, del más nuevo al más antiguo (sin contexto ni resultado).
+
+    Args:
+        ticker: Símbolo del activo.
+        limit: Filas como máximo.
+        since: Solo análisis posteriores a esta marca de tiempo (segundos epoch).
+        before_bar: Solo análisis cuya última barra es anterior a esta (se normaliza con
+            bar_key); sirve para comparar con la ejecución anterior con otros datos.
+
+    Returns:
+        Lista de diccionarios con id, created_at, ticker, profile, horizon, mode, last_bar e indicators.
+
+    Raises:
+        ValueError: si before_bar no es una fecha ISO.
+    """
+    query = f"SELECT {_SUMMARY_COLUMNS} FROM runs WHERE ticker = ?"
+    params: list = [ticker.upper()]
+    if since is not None:
+        query += " AND created_at > ?"
+        params.append(since)
+    if before_bar is not None:
+        query += " AND last_bar < ?"
+        params.append(bar_key(before_bar))
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+    try:
+        with _db() as conn:
+            rows = conn.execute(query, params).fetchall()
+    except sqlite3.Error:
+        return []
+    return [_summary(row) for row in rows]
+
+
+def get(run_id: int) -> Optional[dict]:
+    """Análisis completo por identificador, o None si no existe."""
+    try:
+        with _db() as conn:
+            row = conn.execute(f"SELECT {_SUMMARY_COLUMNS}, context, result FROM runs WHERE id = ?", (run_id,)).fetchone()
+    except sqlite3.Error:
+        return None
+    return _full(row)
+
+
+def indicator_changes(current: dict, previous: dict) -> list[dict]:
+    """
+    Cambios de los indicadores numéricos presentes en las dos ejecuciones.
+
+    Args:
+        current: Indicadores actuales.
+        previous: Indicadores de la ejecución anterior.
+
+    Returns:
+        Una fila por indicador con indicator, previous, current, change y pct_change
+        (None si el valor anterior es 0).
+    """
+    changes = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (value, before)):
+            continue
+        changes.append({
+            "indicator": name,
+            "previous": before,
+            "current": value,
+            "change": value - before,
+            "pct_change": (value - before) / abs(before) if before else None,
+        })
+    return changes
+
+
+def count(ticker: Optional[str] = None) -> int:
+    """Número de análisis guardados (de un ticker, si se indica)."""
+    try:
+        with _db() as conn:
+            if ticker is None:
+                return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM runs WHERE ticker = ?", (ticker.upper(),)).fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+
+def clear() -> None:
+    """Borra todo el historial."""
+    try:
+        with _db() as conn:
+            conn.execute("DELETE FROM runs")
+    except sqlite3.Error:
+        pass
@@ -4,17 +4,66 @@ Aplicación Streamlit para análisis de trading con Gemini.
 Punto de entrada: streamlit run app.py
 """
 
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+# Streamlit vuelve a ejecutar este script en cada interacción; los módulos de la app
+# solo se importan en la primera ejecución del proceso (arranque en frío)
+_script_started = time.perf_counter()
+_cold_start = "llm_client" not in sys.modules
+
+import numpy as np
+import pandas as pd
 import streamlit as st
-import altair as alt
-from data_fetcher import get_historical_data, get_news_headlines, validate_ticker
-from indicators import compute_all_indicators
-from llm_client import generate_analysis
+import analysis_history
+from backtest import default_report
+from charting import CHART_WINDOWS, decimate, price_chart_spec
+from context_builder import ANALYSIS_MODES, CONTEXT_INDICATORS, HORIZONS, RISK_PROFILES, build_context
+from data_fetcher import (
+    INTRADAY_INTERVALS, get_historical_data, get_historical_data_many, get_news_headlines, trim_to_months,
+)
+from indicators import compute_indicators
+from llm_client import AnalysisError, count_tokens, start_analysis_stream
+import live
+import portfolio
+from prefetch import start_in_process as start_prefetch
+import telemetry
+from screener import (
+    RSI_ZONES, TRENDS, build_snapshot, filter_snapshot, load_snapshot, snapshot_mtime, volatility_ceiling,
+)
 from tickers import TOP_100_TICKERS
 
+if _cold_start:
+    telemetry.record("cold_imports", time.perf_counter() - _script_started, _script_started)
+
 
 # Configuración de la página
 st.set_page_config(page_title="TradeWise AI", page_icon="📈", layout="wide")
 
+# Meses de histórico usados en el backtest de señales
+BACKTEST_MONTHS = 120
+
+# Meses de histórico sobre los que se calculan los indicadores
+INDICATOR_MONTHS = 6
+
+# Vistas disponibles en la barra lateral
+VIEW_SINGLE = "Análisis individual"
+VIEW_SCREENER = "Screener"
+VIEW_PORTFOLIO = "Cartera"
+VIEWS = [VIEW_SINGLE, VIEW_SCREENER, VIEW_PORTFOLIO]
+
+# Segundos que se reutilizan en memoria precios y titulares entre reruns y sesiones
+RERUN_CACHE_TTL = 60
+
+# Cartera inicial de la vista de cartera y sesiones por mes (ventana de la covarianza)
+DEFAULT_PORTFOLIO = ["AAPL", "MSFT", "AMZN", "NVDA", "GOOGL"]
+SESSIONS_PER_MONTH = 21
+
 # Estilos personalizados (tema fintech azul, botones, contenedores)
 st.markdown(
     """
@@ -62,67 +111,310 @@ st.markdown(
 )
 
 
-def build_context(ticker: str, risk_profile: str, horizon: str, indicators: dict, headlines: list[str]) -> str:
-    """Construye el contexto estructurado para enviar al LLM."""
-    lines = [
-        "# Contexto para análisis de trading",
-        "",
-        f"## Activo: {ticker}",
-        f"- Perfil de riesgo del usuario: {risk_profile}",
-        f"- Horizonte de inversión: {horizon}",
-        "",
-        "## Indicadores técnicos (últimos 6 meses)",
-        f"- Precio de cierre más reciente: {indicators.get('last_close')}",
-        f"- Media móvil 20 días: {indicators.get('ma_20')}",
-        f"- Media móvil 50 días: {indicators.get('ma_50')}",
-        f"- RSI (14): {indicators.get('rsi')}",
-        f"- Volatilidad anualizada (desv. estándar retornos): {indicators.get('volatility')}",
-        "",
-        "## Titulares recientes",
+@st.cache_data(show_spinner=False)
+def _cached_snapshot(mtime: float):
+    """Instantánea del screener cacheada en memoria mientras no cambie el archivo."""
+    return load_snapshot()
+
+
+def _data_version(prices: pd.DataFrame) -> tuple[str, float, int]:
+    """
+    Última barra, su cierre y número de filas: identifican la versión de los datos en las
+    claves de caché sin recorrer el DataFrame.
+    """
+    return str(prices.index[-1]), float(prices["Close"].iloc[-1]), len(prices)
+
+
+@st.cache_resource(show_spinner=False, ttl=RERUN_CACHE_TTL, max_entries=256)
+def _cached_prices(ticker: str, months: int):
+    """
+    Histórico de precios reutilizado en memoria durante RERUN_CACHE_TTL.
+    cache_resource devuelve el mismo objeto sin copiarlo; los datos no se modifican.
+    """
+    return get_historical_data(ticker, months=months)
+
+
+@st.cache_data(show_spinner=False, ttl=RERUN_CACHE_TTL, max_entries=256)
+def _cached_headlines(ticker: str) -> list[str]:
+    """Titulares recientes reutilizados en memoria durante RERUN_CACHE_TTL."""
+    return get_news_headlines(ticker, 10)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _cached_indicators(ticker: str, last_bar: str, last_close: float, names: tuple, _prices) -> dict:
+    """Indicadores pedidos de los últimos INDICATOR_MONTHS meses, cacheados por versión de los datos."""
+    return compute_indicators(trim_to_months(_prices, INDICATOR_MONTHS), names)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_backtest(ticker: str, last_bar: str, last_close: float, rows: int, _history) -> pd.DataFrame:
+    """Backtest de las señales por defecto, cacheado por versión de los datos."""
+    return default_report(_history)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _cached_price_chart(ticker: str, months: int, last_bar: str, last_close: float, rows: int, _prices) -> dict:
+    """Especificación del gráfico de precio (serie ya reducida) cacheada por ticker, ventana y versión."""
+    return price_chart_spec(_prices)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_live_chart(ticker: str, interval: str, last_bar: str, last_close: float, rows: int, _bars) -> dict:
+    """Especificación del gráfico intradía, recalculada solo cuando llega una barra nueva."""
+    return price_chart_spec(_bars)
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _covariance_state(tickers: tuple, months: int) -> portfolio.CovarianceState:
+    """Estado de covarianza compartido entre sesiones; se actualiza solo con los días nuevos."""
+    return portfolio.CovarianceState(list(tickers), window=months * SESSIONS_PER_MONTH)
+
+
+def render_portfolio():
+    """Vista de cartera: correlaciones, volatilidad conjunta y contribución al riesgo."""
+    st.markdown("### Riesgo de cartera")
+    col1, col2 = st.columns([3, 1])
+    selected = col1.multiselect("Acciones de la cartera", TOP_100_TICKERS, default=DEFAULT_PORTFOLIO)
+    window = col2.selectbox("Histórico", [w for w in CHART_WINDOWS if CHART_WINDOWS[w] >= 12], index=0)
+    if col1.checkbox("Todo el universo", value=False):
+        selected = list(TOP_100_TICKERS)
+    if len(selected) < 2:
+        st.info("Selecciona al menos dos acciones.")
+        return
+    months = CHART_WINDOWS[window]
+
+    with st.spinner("Obteniendo precios de la cartera..."):
+        with telemetry.span("portfolio_prices"):
+            prices = get_historical_data_many(selected, months=months)
+    with telemetry.span("portfolio_risk"):
+        returns = portfolio.returns_matrix(prices)
+        if returns.shape[1] < 2:
+            st.error("No hay datos suficientes para las acciones seleccionadas.")
+            return
+        state = _covariance_state(tuple(returns.columns), months)
+        state.sync(returns)
+        cov = state.covariance()
+        corr = state.correlation()
+
+    tickers = list(returns.columns)
+    missing = [t for t in selected if t not in tickers]
+    if missing:
+        st.caption(f"Sin datos: {', '.join(missing)}")
+
+    weights_df = st.data_editor(
+        pd.DataFrame({"ticker": tickers, "peso": [round(100 / len(tickers), 2)] * len(tickers)}),
+        hide_index=True,
+        disabled=["ticker"],
+        column_config={"peso": st.column_config.NumberColumn("Peso (%)", min_value=0.0, format="%.2f")},
+        key=f"weights_{'_'.join(tickers)}",
+    )
+    weights = weights_df["peso"].to_numpy(dtype=float)
+
+    vol = portfolio.portfolio_volatility(cov, weights)
+    contributions = portfolio.risk_contributions(cov, weights)
+    avg_corr = portfolio.average_correlation(corr)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Volatilidad de la cartera", f"{vol * 100:.2f} %" if vol is not None else "N/A")
+    col2.metric("Correlación media", f"{avg_corr:.2f}" if avg_corr is not None else "N/A")
+    col3.metric("Mayor contribución al riesgo", tickers[int(np.argmax(contributions))])
+
+    st.markdown("#### Matriz de correlación")
+    corr_long = pd.DataFrame({
+        "fila": np.repeat(tickers, len(tickers)),
+        "columna": np.tile(tickers, len(tickers)),
+        "correlacion": corr.ravel(),
+    })
+    st.vega_lite_chart(
+        corr_long,
+        {
+            "mark": "rect",
+            "encoding": {
+                "x": {"field": "columna", "type": "nominal", "sort": tickers, "title": None},
+                "y": {"field": "fila", "type": "nominal", "sort": tickers, "title": None},
+                "color": {"field": "correlacion", "type": "quantitative",
+                          "scale": {"scheme": "redblue", "domain": [-1, 1], "reverse": True}},
+                "tooltip": [{"field": "fila"}, {"field": "columna"},
+                            {"field": "correlacion", "type": "quantitative", "format": ".2f"}],
+            },
+            "height": max(300, 14 * len(tickers)),
+        },
+        use_container_width=True,
+    )
+
+    st.markdown("#### Contribución al riesgo")
+    st.dataframe(
+        pd.DataFrame({
+            "ticker": tickers,
+            "peso": weights / weights.sum() * 100 if weights.sum() else weights,
+            "volatilidad": np.sqrt(np.diag(cov)) * 100,
+            "contribucion": contributions * 100,
+        }).sort_values("contribucion", ascending=False),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "ticker": "Ticker",
+            "peso": st.column_config.NumberColumn("Peso", format="%.1f %%"),
+            "volatilidad": st.column_config.NumberColumn("Volatilidad", format="%.1f %%"),
+            "contribucion": st.column_config.NumberColumn("Contribución", format="%.1f %%"),
+        },
+    )
+
+    st.markdown("#### Correlación móvil")
+    col1, col2, col3 = st.columns(3)
+    first = col1.selectbox("Acción A", tickers, index=0)
+    second = col2.selectbox("Acción B", tickers, index=1)
+    days = col3.slider("Ventana (sesiones)", 20, 250, 60, step=10)
+    if first != second:
+        rolling = portfolio.rolling_correlation(returns, first, second, window=days)
+        st.line_chart(decimate(rolling).rename("Correlación"), height=250)
+
+
+def render_live(ticker: str, interval: str) -> None:
+    """
+    Sección intradía en vivo: un fragmento de Streamlit que se vuelve a ejecutar solo cada
+    pocos segundos, sin rerun de la página ni nuevas llamadas al LLM.
+    """
+    st.fragment(run_every=live.REFRESH_SECONDS[interval])(_live_section)(ticker, interval)
+
+
+def _live_section(ticker: str, interval: str) -> None:
+    feed = live.get_feed(ticker, interval)
+    feed.poll()
+    values = feed.snapshot()
+    st.markdown(f"### En vivo ({interval})")
+    if values["last_time"] is None:
+        st.info("Sin barras intradía por ahora (mercado cerrado o sin datos).")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    last_close, ma_20, ma_50, rsi = (values.get(k) for k in ("last_close", "ma_20", "ma_50", "rsi"))
+    col1.metric("Último precio", f"${last_close:,.2f}" if last_close is not None else "N/A")
+    col2.metric(f"SMA 20 ({interval})", f"${ma_20:,.2f}" if ma_20 is not None else "N/A")
+    col3.metric(f"SMA 50 ({interval})", f"${ma_50:,.2f}" if ma_50 is not None else "N/A")
+    col4.metric(f"RSI (14, {interval})", f"{rsi:.2f}" if rsi is not None else "N/A")
+
+    bars = feed.frame()
+    with telemetry.span("live_chart"):
+        chart_spec = _cached_live_chart(ticker, interval, *_data_version(bars), bars)
+    st.vega_lite_chart(chart_spec, use_container_width=True)
+    st.caption(
+        f"Última barra: {values['last_time']:%Y-%m-%d %H:%M} · {values['bars']} barras cerradas · "
+        f"se actualiza cada {live.REFRESH_SECONDS[interval]} s"
+    )
+
+
+def render_screener():
+    """Vista de screener: ranking de todo el universo a partir de la instantánea guardada."""
+    st.markdown("### Screener del universo")
+    mtime = snapshot_mtime()
+    col_info, col_button = st.columns([3, 1])
+    if col_button.button("Actualizar datos", use_container_width=True):
+        with st.spinner("Descargando precios y calculando indicadores de todo el universo..."):
+            build_snapshot()
+        mtime = snapshot_mtime()
+    snapshot = _cached_snapshot(mtime) if mtime is not None else None
+    if snapshot is None or snapshot.empty:
+        st.info("Todavía no hay datos del screener. Pulsa «Actualizar datos» para calcularlos.")
+        return
+    updated = datetime.fromtimestamp(float(snapshot["updated_at"].iloc[0]))
+    col_info.caption(f"Datos calculados el {updated:%Y-%m-%d %H:%M}. {len(snapshot)} acciones.")
+
+    col1, col2, col3, col4 = st.columns(4)
+    rsi_zones = col1.multiselect("Zona RSI", RSI_ZONES)
+    trend = col2.selectbox("Tendencia SMA20 vs SMA50", ["Todas", *TRENDS])
+    price_vs_ma = col3.selectbox(
+        "Precio vs medias",
+        ["Todos", "Sobre SMA20", "Bajo SMA20", "Sobre SMA50", "Bajo SMA50"],
+    )
+    vol_max = volatility_ceiling(snapshot)
+    vol_range = col4.slider("Volatilidad anualizada (%)", 0.0, vol_max, (0.0, vol_max))
+    # Con la escala completa no se filtra: se conservan también los tickers sin volatilidad
+    vol_filter = None if vol_range == (0.0, vol_max) else (vol_range[0] / 100, vol_range[1] / 100)
+
+    filtered = filter_snapshot(
+        snapshot,
+        rsi_zones=rsi_zones,
+        trend=None if trend == "Todas" else trend,
+        above_ma20={"Sobre SMA20": True, "Bajo SMA20": False}.get(price_vs_ma),
+        above_ma50={"Sobre SMA50": True, "Bajo SMA50": False}.get(price_vs_ma),
+        volatility_range=vol_filter,
+    )
+    columns = [
+        "ticker", "last_close", "ma_20", "ma_50", "pct_vs_ma20", "pct_vs_ma50",
+        "trend", "rsi", "rsi_zone", "volatility", "macd_hist", "bb_percent_b",
     ]
-    if headlines:
-        for h in headlines:
-            lines.append(f"- {h}")
-    else:
-        lines.append("- No se encontraron titulares recientes.")
-    lines.extend([
-        "",
-        "---",
-        "",
-        "Responde en español, de forma clara y estructurada. Incluye las siguientes secciones:",
-        "1. **Análisis técnico**: Explica detalladamente la relación entre medias móviles, RSI y volatilidad. Justifica cada interpretación con base en los valores proporcionados.",
-        "2. **Sentimiento de noticias**: Clasifica el sentimiento general como POSITIVO, NEGATIVO o NEUTRAL y justifica brevemente.",
-        "3. **Escenario alcista**: Describe condiciones específicas que deberían cumplirse para que este escenario ocurra. Sé técnico y específico.",
-        "4. **Escenario bajista**: Describe riesgos concretos y señales técnicas que confirmarían este escenario.",
-        "5. **Evaluación de riesgo**: Nivel de riesgo (bajo/medio/alto) y por qué.",
-        "6. **Recomendación según perfil**: Adapta el tono y las consideraciones al perfil de riesgo indicado.",
-        "7. **Advertencia**: Incluye una advertencia explícita de que este análisis NO es asesoría financiera y que el usuario debe consultar a un profesional.",
-        "8. **Advertencia**: Para el sentimiento, primero analiza brevemente cada titular y luego sintetiza el sentimiento general justificando con ejemplos concretos.",
-        "9. **Advertencia**: Desarrolla cada sección con al menos 2–3 párrafos explicativos. No seas breve. Profundiza en la interpretación técnica y contextual."
-    ])
-    return "\n".join(lines)
+    # Las instantáneas anteriores pueden no tener los indicadores extendidos
+    table = filtered[[c for c in columns if c in filtered.columns]].copy()
+    table["volatility"] = table["volatility"] * 100
+    st.dataframe(
+        table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "ticker": "Ticker",
+            "last_close": st.column_config.NumberColumn("Precio", format="$%.2f"),
+            "ma_20": st.column_config.NumberColumn("SMA 20", format="$%.2f"),
+            "ma_50": st.column_config.NumberColumn("SMA 50", format="$%.2f"),
+            "pct_vs_ma20": st.column_config.NumberColumn("vs SMA20", format="%.2f %%"),
+            "pct_vs_ma50": st.column_config.NumberColumn("vs SMA50", format="%.2f %%"),
+            "trend": "Tendencia",
+            "rsi": st.column_config.NumberColumn("RSI (14)", format="%.2f"),
+            "rsi_zone": "Zona RSI",
+            "volatility": st.column_config.NumberColumn("Volatilidad", format="%.2f %%"),
+            "macd_hist": st.column_config.NumberColumn("Hist. MACD", format="%.2f"),
+            "bb_percent_b": st.column_config.NumberColumn("%B Bollinger", format="%.2f"),
+        },
+    )
 
 
 def main():
+    # Refresco en segundo plano dentro del proceso, si está activado
+    if os.getenv("TRADEWISE_PREFETCH") == "1":
+        start_prefetch()
+
     # Sidebar: panel de control
     with st.sidebar:
         st.markdown("### Panel de control")
-        selected_ticker = st.selectbox(
-            "Seleccione una acción:",
-            TOP_100_TICKERS,
-        )
-        ticker = selected_ticker
-        risk_profile = st.selectbox(
-            "Perfil de riesgo",
-            options=["Conservador", "Moderado", "Agresivo"],
-            index=1,
-        )
-        horizon = st.selectbox(
-            "Horizonte de inversión",
-            options=["Corto plazo", "Mediano plazo", "Largo plazo"],
-            index=1,
-        )
-        generate_clicked = st.button("Generar análisis", use_container_width=True)
+        view = st.radio("Vista", VIEWS, horizontal=True)
+        if view == VIEW_SINGLE:
+            selected_ticker = st.selectbox(
+                "Seleccione una acción:",
+                TOP_100_TICKERS,
+            )
+            ticker = selected_ticker
+            risk_profile = st.selectbox(
+                "Perfil de riesgo",
+                options=RISK_PROFILES,
+                index=1,
+            )
+            horizon = st.selectbox(
+                "Horizonte de inversión",
+                options=HORIZONS,
+                index=1,
+            )
+            chart_window = st.selectbox(
+                "Ventana del gráfico",
+                options=list(CHART_WINDOWS),
+                index=0,
+            )
+            mode_label = st.radio(
+                "Modo de análisis",
+                options=list(ANALYSIS_MODES),
+                horizontal=True,
+                help="Rápido: respuesta breve con menos titulares y menos tokens de salida.",
+            )
+            live_mode = st.toggle(
+                "Intradía en vivo",
+                value=False,
+                help="Precio, indicadores y gráfico intradía que se actualizan solos, sin volver a llamar al LLM.",
+            )
+            live_interval = st.selectbox("Intervalo intradía", INTRADAY_INTERVALS, disabled=not live_mode)
+            force_refresh = st.checkbox(
+                "Forzar nuevo análisis",
+                value=False,
+                help="Ignora el análisis guardado en caché para este mismo contexto.",
+            )
+            generate_clicked = st.button("Generar análisis", use_container_width=True)
 
         st.markdown("---")
         st.caption(
@@ -138,94 +430,290 @@ def main():
     )
     st.divider()
 
+    if view == VIEW_SCREENER:
+        render_screener()
+        return
+    if view == VIEW_PORTFOLIO:
+        render_portfolio()
+        return
+
+    if live_mode:
+        render_live(ticker, live_interval)
+
     if generate_clicked:
-        with st.spinner("Validando ticker y obteniendo datos..."):
-            if ticker not in TOP_100_TICKERS:
-                st.error("Ticker no permitido. Solo se pueden analizar las 100 acciones principales.")
-                return
-            if not validate_ticker(ticker):
-                st.error(f"Ticker '{ticker}' no válido o sin datos. Verifica el símbolo e intenta de nuevo.")
-                return
-            prices = get_historical_data(ticker, months=6)
-            headlines = get_news_headlines(ticker, max_headlines=10)
-        if prices is None or prices.empty:
-            st.error("No se pudieron obtener datos históricos para este ticker.")
-            return
+        with telemetry.trace() as request_trace:
+            run_analysis(ticker, risk_profile, horizon, force_refresh, chart_window, ANALYSIS_MODES[mode_label])
+        render_diagnostics(request_trace)
 
-        indicators = compute_all_indicators(prices)
-        context = build_context(ticker, risk_profile, horizon, indicators, headlines)
-
-        # Sección de métricas visuales
-        st.markdown("### Indicadores clave")
-        col1, col2, col3, col4, col5 = st.columns(5)
-        last_close = indicators.get("last_close")
-        ma_20 = indicators.get("ma_20")
-        ma_50 = indicators.get("ma_50")
-        rsi = indicators.get("rsi")
-        vol = indicators.get("volatility")
-
-        col1.metric(
-            "Precio actual",
-            f"${last_close:,.2f}" if last_close is not None else "N/A",
-        )
-        col2.metric(
-            "SMA 20",
-            f"${ma_20:,.2f}" if ma_20 is not None else "N/A",
-        )
-        col3.metric(
-            "SMA 50",
-            f"${ma_50:,.2f}" if ma_50 is not None else "N/A",
+
+def _delta(indicators: dict, previous: dict, name: str, fmt: str) -> Optional[str]:
+    """Variación de un indicador desde el análisis anterior, con formato para st.metric."""
+    value, before = indicators.get(name), previous.get(name)
+    if value is None or before is None:
+        return None
+    return fmt.format(value - before)
+
+
+def _run_label(entry: dict) -> str:
+    """Fecha y hora de un análisis guardado."""
+    return f"{datetime.fromtimestamp(entry['created_at']):%Y-%m-%d %H:%M}"
+
+
+def render_backtest(ticker: str) -> None:
+    """
+    Backtest de las señales sobre BACKTEST_MONTHS meses. El histórico largo solo se descarga
+    al activar el interruptor, y al ser un fragmento de Streamlit activarlo no vuelve a
+    ejecutar la página ni el análisis.
+    """
+    st.fragment(_backtest_section)(ticker)
+
+
+def _backtest_section(ticker: str) -> None:
+    with st.expander(f"Backtest de las señales ({BACKTEST_MONTHS // 12} años)", expanded=False):
+        enabled = st.toggle(
+            "Calcular backtest",
+            key="backtest_enabled",
+            help=f"Descarga {BACKTEST_MONTHS // 12} años de precios y evalúa las señales por defecto.",
         )
-        col4.metric(
-            "RSI (14)",
-            f"{rsi:.2f}" if rsi is not None else "N/A",
+        if not enabled:
+            st.caption("Activa el interruptor para calcular el backtest de este ticker.")
+            return
+        with telemetry.span("backtest"):
+            history = _cached_prices(ticker, BACKTEST_MONTHS)
+            report = None
+            if history is not None and not history.empty:
+                report = _cached_backtest(ticker, *_data_version(history), history)
+        if report is None or report.empty:
+            st.info("No hay histórico suficiente para el backtest.")
+        else:
+            table = report.copy()
+            for col in ("total_return", "annual_return", "annual_volatility", "max_drawdown", "exposure"):
+                table[col] = table[col] * 100
+            st.dataframe(
+                table,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "estrategia": "Estrategia",
+                    "total_return": st.column_config.NumberColumn("Retorno total", format="%.1f %%"),
+                    "annual_return": st.column_config.NumberColumn("Retorno anual", format="%.1f %%"),
+                    "annual_volatility": st.column_config.NumberColumn("Volatilidad", format="%.1f %%"),
+                    "sharpe": st.column_config.NumberColumn("Sharpe", format="%.2f"),
+                    "max_drawdown": st.column_config.NumberColumn("Máx. caída", format="%.1f %%"),
+                    "trades": st.column_config.NumberColumn("Operaciones", format="%d"),
+                    "exposure": st.column_config.NumberColumn("Tiempo invertido", format="%.0f %%"),
+                },
+            )
+            st.caption(
+                f"{len(history)} sesiones desde {history.index[0]:%Y-%m-%d}. Solo largo, sin costes; "
+                "la señal de cada cierre se aplica al día siguiente. Resultados pasados no garantizan "
+                "resultados futuros."
+            )
+
+
+def render_diagnostics(request_trace: telemetry.Trace) -> None:
+    """Panel plegable con los tiempos de la última petición y las métricas del proceso."""
+    with st.expander("Diagnóstico de rendimiento", expanded=False):
+        st.markdown("**Última petición**")
+        rows = request_trace.rows()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        if request_trace.counters:
+            st.caption(", ".join(f"{k}: {v}" for k, v in sorted(request_trace.counters.items())))
+
+        st.markdown("**Acumulado del proceso**")
+        summary = telemetry.snapshot()
+        stage_rows = [
+            {"etapa": stage, "n": stats["count"], "p50_ms": round(stats["p50"] * 1000, 1),
+             "p95_ms": round(stats["p95"] * 1000, 1), "max_ms": round(stats["max"] * 1000, 1)}
+            for stage, stats in sorted(summary["stages"].items())
+        ]
+        if stage_rows:
+            st.dataframe(stage_rows, hide_index=True, use_container_width=True)
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "Descargar métricas (Prometheus)",
+            telemetry.to_prometheus(),
+            file_name="tradewise_metrics.prom",
+            mime="text/plain",
         )
-        col5.metric(
-            "Volatilidad anualizada",
-            f"{vol * 100:.2f} %" if vol is not None else "N/A",
+        col2.download_button(
+            "Descargar métricas (JSON)",
+            json.dumps(telemetry.to_json(), indent=2),
+            file_name="tradewise_metrics.json",
+            mime="application/json",
         )
 
-        # Gráfico profesional de precio histórico
-        st.markdown("### Evolución del precio (últimos 6 meses)")
-        price_df = prices[["Close"]].reset_index()
-        price_df.columns = ["Fecha", "Precio de cierre"]
-        price_chart = (
-            alt.Chart(price_df)
-            .mark_line(interpolate="monotone")
-            .encode(
-                x=alt.X("Fecha:T", title="Fecha"),
-                y=alt.Y("Precio de cierre:Q", title="Precio de cierre (USD)"),
-                tooltip=["Fecha:T", "Precio de cierre:Q"],
-            )
-            .properties(height=400)
+
+def run_analysis(
+    ticker: str,
+    risk_profile: str,
+    horizon: str,
+    force_refresh: bool,
+    chart_window: str = "6 meses",
+    mode: str = "full",
+) -> None:
+    """Descarga datos, calcula indicadores, dibuja métricas y gráfico, y muestra el análisis."""
+    if ticker not in TOP_100_TICKERS:
+        st.error("Ticker no permitido. Solo se pueden analizar las 100 acciones principales.")
+        return
+    # El último análisis guardado se muestra al instante mientras se genera el nuevo
+    with telemetry.span("history_lookup"):
+        stored = analysis_history.latest(ticker, risk_profile, horizon)
+    stored_slot = st.empty()
+    if stored is not None:
+        with stored_slot.container():
+            with st.expander(f"Último análisis guardado ({_run_label(stored)})", expanded=True):
+                st.markdown(stored["result"])
+    # Una sola descarga cubre el gráfico y los indicadores (que usan los últimos 6 meses)
+    chart_months = max(CHART_WINDOWS.get(chart_window, INDICATOR_MONTHS), INDICATOR_MONTHS)
+    # Precios y titulares se descargan a la vez; la validación sale de los propios precios
+    with st.spinner("Validando ticker y obteniendo datos..."):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            prices_future = telemetry.submit(pool, "price_fetch", _cached_prices, ticker, chart_months)
+            news_future = telemetry.submit(pool, "news_fetch", _cached_headlines, ticker)
+            prices = prices_future.result()
+            with telemetry.span("validate"):
+                valid = prices is not None and not prices.empty
+            if not valid:
+                st.error(f"Ticker '{ticker}' no válido o sin datos. Verifica el símbolo e intenta de nuevo.")
+                return
+            with telemetry.span("indicators"):
+                names = CONTEXT_INDICATORS.get(mode, CONTEXT_INDICATORS["full"])
+                indicators = _cached_indicators(ticker, *_data_version(prices)[:2], names, prices)
+            headlines = news_future.result()
+
+    # El LLM arranca en segundo plano mientras se dibujan métricas y gráfico
+    with telemetry.span("context_build"):
+        context = build_context(
+            ticker, risk_profile, horizon, indicators, headlines, mode=mode, count_tokens=count_tokens,
         )
-        st.altair_chart(price_chart, use_container_width=True)
+    analysis_stream = start_analysis_stream(context, use_cache=not force_refresh, mode=mode)
 
-        # Análisis generado por IA en contenedor elegante
-        with st.spinner("Analizando datos y generando informe con IA..."):
-            success, result = generate_analysis(context)
-        if not success:
-            st.error(result)
-            return
+    # Las variaciones se miden contra el último análisis con datos anteriores, no contra
+    # uno de hace unos segundos sobre las mismas barras
+    last_bar = _data_version(prices)[0]
+    with telemetry.span("history_previous"):
+        previous_runs = analysis_history.recent(ticker, limit=1, before_bar=last_bar)
+    previous = previous_runs[0]["indicators"] if previous_runs else {}
 
-        st.markdown("### Análisis generado por IA")
-        with st.container():
-            st.markdown(
-                '<div class="analysis-container">',
-                unsafe_allow_html=True,
-            )
-            with st.expander("Ver análisis completo", expanded=True):
-                st.markdown(result)
-            st.markdown(
-                "</div>",
-                unsafe_allow_html=True,
+    render_started = time.perf_counter()
+    # Sección de métricas visuales
+    st.markdown("### Indicadores clave")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    last_close = indicators.get("last_close")
+    ma_20 = indicators.get("ma_20")
+    ma_50 = indicators.get("ma_50")
+    rsi = indicators.get("rsi")
+    vol = indicators.get("volatility")
+
+    # Las variaciones son respecto al último análisis guardado del ticker
+    col1.metric(
+        "Precio actual",
+        f"${last_close:,.2f}" if last_close is not None else "N/A",
+        delta=_delta(indicators, previous, "last_close", "{:+,.2f}"),
+    )
+    col2.metric(
+        "SMA 20",
+        f"${ma_20:,.2f}" if ma_20 is not None else "N/A",
+        delta=_delta(indicators, previous, "ma_20", "{:+,.2f}"),
+    )
+    col3.metric(
+        "SMA 50",
+        f"${ma_50:,.2f}" if ma_50 is not None else "N/A",
+        delta=_delta(indicators, previous, "ma_50", "{:+,.2f}"),
+    )
+    col4.metric(
+        "RSI (14)",
+        f"{rsi:.2f}" if rsi is not None else "N/A",
+        delta=_delta(indicators, previous, "rsi", "{:+.2f}"),
+    )
+    col5.metric(
+        "Volatilidad anualizada",
+        f"{vol * 100:.2f} %" if vol is not None else "N/A",
+        delta=_delta(indicators, previous, "volatility", "{:+.2%}"),
+        delta_color="off",
+    )
+    # Indicadores extendidos (solo en el modo completo)
+    if "macd" in indicators:
+        ext1, ext2, ext3, ext4 = st.columns(4)
+        macd_hist = indicators.get("macd_hist")
+        percent_b = indicators.get("bb_percent_b")
+        atr = indicators.get("atr")
+        vwap = indicators.get("vwap")
+        ext1.metric("Histograma MACD", f"{macd_hist:,.2f}" if macd_hist is not None else "N/A",
+                    delta=_delta(indicators, previous, "macd_hist", "{:+,.2f}"))
+        ext2.metric("%B Bollinger", f"{percent_b:.2f}" if percent_b is not None else "N/A",
+                    delta=_delta(indicators, previous, "bb_percent_b", "{:+.2f}"))
+        ext3.metric("ATR (14)", f"${atr:,.2f}" if atr is not None else "N/A",
+                    delta=_delta(indicators, previous, "atr", "{:+,.2f}"), delta_color="off")
+        ext4.metric("VWAP (20)", f"${vwap:,.2f}" if vwap is not None else "N/A",
+                    delta=_delta(indicators, previous, "vwap", "{:+,.2f}"))
+    if previous_runs:
+        st.caption(f"Variación desde el análisis anterior de {ticker} ({_run_label(previous_runs[0])}).")
+
+    # Gráfico profesional de precio histórico
+    st.markdown(f"### Evolución del precio ({chart_window})")
+    with telemetry.span("chart"):
+        chart_spec = _cached_price_chart(ticker, chart_months, *_data_version(prices), prices)
+    st.vega_lite_chart(chart_spec, use_container_width=True)
+    telemetry.record("render", time.perf_counter() - render_started, render_started)
+
+    # Análisis generado por IA en contenedor elegante, mostrado según llega
+    st.markdown("### Análisis generado por IA")
+    with st.container():
+        st.markdown(
+            '<div class="analysis-container">',
+            unsafe_allow_html=True,
+        )
+        with st.expander("Ver análisis completo", expanded=True):
+            try:
+                with telemetry.span("render_analysis"):
+                    result = st.write_stream(analysis_stream)
+            except AnalysisError as e:
+                st.error(str(e))
+                return
+        st.markdown(
+            "</div>",
+            unsafe_allow_html=True,
+        )
+    # El análisis nuevo sustituye al guardado; solo pasa al historial si lo generó el modelo
+    # (una respuesta de la caché ya se guardó cuando se generó)
+    stored_slot.empty()
+    if isinstance(result, str) and result and analysis_stream.source == "model":
+        with telemetry.span("history_store"):
+            analysis_history.record(
+                ticker, risk_profile, horizon, mode, context, indicators, result, last_bar=last_bar,
             )
 
-        st.caption(
-            "TradeWise AI — Este contenido no constituye asesoría financiera. "
-            "Consulta siempre a un profesional."
+    # Evidencia histórica de las mismas señales sobre un histórico largo (bajo demanda)
+    render_backtest(ticker)
+
+    with st.expander(f"Historial de análisis de {ticker}", expanded=False):
+        runs = analysis_history.recent(ticker, limit=20)
+        st.dataframe(
+            [
+                {
+                    "fecha": _run_label(run),
+                    "perfil": run["profile"],
+                    "horizonte": run["horizon"],
+                    "modo": run["mode"],
+                    "precio": run["indicators"].get("last_close"),
+                    "rsi": run["indicators"].get("rsi"),
+                }
+                for run in runs
+            ],
+            hide_index=True,
+            use_container_width=True,
         )
 
+    st.caption(
+        "TradeWise AI — Este contenido no constituye asesoría financiera. "
+        "Consulta siempre a un profesional."
+    )
+
 
 if __name__ == "__main__":
     main()
+    # Coste total de esta ejecución del script (cada interacción es un rerun)
+    telemetry.record("script_run", time.perf_counter() - _script_started, _script_started)
@@ -0,0 +1,274 @@
+"""
+backtest.py
+Backtesting vectorizado de las señales que muestra la app (cruce de medias móviles
+y umbrales de RSI), con las mismas definiciones que indicators.py.
+Todas las estrategias de un barrido se evalúan a la vez como filas de una matriz NumPy,
+sin bucles por barra; el barrido sobre muchos tickers se reparte en un pool de procesos.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def sma_matrix(close: np.ndarray, windows: list[int]) -> np.ndarray:
+    """
+    Medias móviles simples de varias ventanas mediante una única suma acumulada.
+
+    Args:
+        close: Array 1-D de cierres.
+        windows: Ventanas a calcular.
+
+    Returns:
+        Array (ventanas x días); NaN mientras no hay datos suficientes.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    csum = np.concatenate(([0.0], np.cumsum(close)))
+    out = np.full((len(windows), n), np.nan)
+    for row, window in enumerate(windows):
+        if window <= n:
+            out[row, window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def rsi_matrix(close: np.ndarray, periods: list[int]) -> np.ndarray:
+    """
+    RSI simple (media de ganancias/pérdidas, como rsi_simple) para varios períodos.
+
+    Args:
+        close: Array 1-D de cierres.
+        periods: Períodos a calcular.
+
+    Returns:
+        Array (períodos x días); NaN mientras no hay datos suficientes.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    delta = np.diff(close)
+    gains = np.concatenate(([0.0], np.cumsum(np.maximum(delta, 0.0))))
+    losses = np.concatenate(([0.0], np.cumsum(np.maximum(-delta, 0.0))))
+    out = np.full((len(periods), n), np.nan)
+    for row, period in enumerate(periods):
+        if period + 1 > n:
+            continue
+        avg_gain = (gains[period:] - gains[:-period]) / period
+        avg_loss = (losses[period:] - losses[:-period]) / period
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        # Mismo redondeo que rsi_simple: los umbrales se comparan con los valores mostrados
+        out[row, period:] = np.round(np.where(avg_loss <= 0, 100.0, rsi), 2)
+    return out
+
+
+def _hold_positions(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    Convierte señales de entrada/salida en posiciones 0/1 manteniendo la última señal
+    (relleno hacia delante vectorizado por filas).
+    """
+    events = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    n = events.shape[1]
+    idx = np.where(~np.isnan(events), np.arange(n), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    held = np.take_along_axis(events, idx, axis=1)
+    return np.nan_to_num(held, nan=0.0)
+
+
+def evaluate(positions: np.ndarray, close: np.ndarray, cost_bps: float = 0.0) -> dict[str, np.ndarray]:
+    """
+    Evalúa muchas series de posiciones a la vez sobre la misma serie de precios.
+    La posición decidida al cierre del día t se aplica al retorno del día t+1.
+
+    Args:
+        positions: Array (estrategias x días) con la exposición (0 o 1) al cierre de cada día.
+        close: Array 1-D de cierres.
+        cost_bps: Coste por cambio de posición en puntos básicos.
+
+    Returns:
+        Diccionario de arrays (uno por estrategia): total_return, annual_return,
+        annual_volatility, sharpe, max_drawdown, trades y exposure.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    positions = np.atleast_2d(positions)
+    returns = close[1:] / close[:-1] - 1.0
+    held = positions[:, :-1]
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))[:, :-1]
+    strat = held * returns - turnover * cost_bps / 10_000
+    equity = np.cumprod(1.0 + strat, axis=1)
+    years = max(len(returns) / TRADING_DAYS, 1e-9)
+    total = equity[:, -1] - 1.0 if equity.shape[1] else np.zeros(len(positions))
+    std = strat.std(axis=1, ddof=1) if strat.shape[1] > 1 else np.zeros(len(positions))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, strat.mean(axis=1) / std * np.sqrt(TRADING_DAYS), 0.0)
+    peaks = np.maximum.accumulate(equity, axis=1)
+    drawdown = (equity / peaks - 1.0).min(axis=1) if equity.shape[1] else np.zeros(len(positions))
+    return {
+        "total_return": total,
+        "annual_return": np.maximum(1.0 + total, 0.0) ** (1.0 / years) - 1.0,
+        "annual_volatility": std * np.sqrt(TRADING_DAYS),
+        "sharpe": sharpe,
+        "max_drawdown": drawdown,
+        "trades": (np.diff(positions, axis=1) > 0).sum(axis=1) + (positions[:, 0] > 0),
+        "exposure": held.mean(axis=1) if held.shape[1] else np.zeros(len(positions)),
+    }
+
+
+def sweep_crossover(close: np.ndarray, fast_windows: list[int], slow_windows: list[int], cost_bps: float = 0.0) -> pd.DataFrame:
+    """
+    Evalúa todas las combinaciones de cruce de medias (largo cuando SMA rápida > SMA lenta).
+
+    Args:
+        close: Array 1-D de cierres.
+        fast_windows: Ventanas de la media rápida.
+        slow_windows: Ventanas de la media lenta (solo se usan pares rápida < lenta).
+        cost_bps: Coste por cambio de posición en puntos básicos.
+
+    Returns:
+        DataFrame con una fila por combinación (fast, slow) y sus métricas.
+    """
+    combos = [(f, s) for f, s in product(fast_windows, slow_windows) if f < s]
+    if not combos:
+        return pd.DataFrame()
+    windows = sorted({w for combo in combos for w in combo})
+    row_of = {w: i for i, w in enumerate(windows)}
+    smas = sma_matrix(close, windows)
+    fast = smas[[row_of[f] for f, _ in combos]]
+    slow = smas[[row_of[s] for _, s in combos]]
+    with np.errstate(invalid="ignore"):
+        positions = (fast > slow).astype(np.float64)
+    metrics = evaluate(positions, close, cost_bps)
+    result = pd.DataFrame(combos, columns=["fast", "slow"])
+    for name, values in metrics.items():
+        result[name] = values
+    return result
+
+
+def sweep_rsi(
+    close: np.ndarray,
+    periods: list[int],
+    lower_thresholds: list[float],
+    upper_thresholds: list[float],
+    cost_bps: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Evalúa todas las combinaciones de la estrategia de umbrales de RSI
+    (entra largo cuando RSI < inferior, sale cuando RSI > superior).
+
+    Args:
+        close: Array 1-D de cierres.
+        periods: Períodos del RSI.
+        lower_thresholds: Umbrales de entrada (sobreventa).
+        upper_thresholds: Umbrales de salida (sobrecompra).
+        cost_bps: Coste por cambio de posición en puntos básicos.
+
+    Returns:
+        DataFrame con una fila por combinación (period, lower, upper) y sus métricas.
+    """
+    combos = [(p, lo, up) for p, lo, up in product(periods, lower_thresholds, upper_thresholds) if lo < up]
+    if not combos:
+        return pd.DataFrame()
+    row_of = {p: i for i, p in enumerate(periods)}
+    rsis = rsi_matrix(close, periods)[[row_of[p] for p, _, _ in combos]]
+    lower = np.array([lo for _, lo, _ in combos])[:, None]
+    upper = np.array([up for _, _, up in combos])[:, None]
+    with np.errstate(invalid="ignore"):
+        positions = _hold_positions(rsis < lower, rsis > upper)
+    metrics = evaluate(positions, close, cost_bps)
+    result = pd.DataFrame(combos, columns=["period", "lower", "upper"])
+    for name, values in metrics.items():
+        result[name] = values
+    return result
+
+
+def buy_and_hold(close: np.ndarray) -> dict[str, float]:
+    """Métricas de comprar y mantener, como referencia."""
+    metrics = evaluate(np.ones((1, len(close))), close)
+    return {name: float(values[0]) for name, values in metrics.items()}
+
+
+def default_report(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Resultado de las señales que muestra la app: cruce SMA20/SMA50, RSI(14) 30/70
+    y comprar y mantener.
+
+    Args:
+        prices: DataFrame con columna 'Close'.
+
+    Returns:
+        DataFrame con una fila por estrategia.
+    """
+    close = prices["Close"].dropna().to_numpy(dtype=np.float64)
+    rows = []
+    if len(close) >= 2:
+        cross = sweep_crossover(close, [20], [50])
+        if not cross.empty:
+            rows.append({"estrategia": "Cruce SMA20/SMA50", **cross.iloc[0].drop(["fast", "slow"]).to_dict()})
+        rsi = sweep_rsi(close, [14], [30.0], [70.0])
+        if not rsi.empty:
+            rows.append({"estrategia": "RSI(14) 30/70", **rsi.iloc[0].drop(["period", "lower", "upper"]).to_dict()})
+        rows.append({"estrategia": "Comprar y mantener", **buy_and_hold(close)})
+    return pd.DataFrame(rows)
+
+
+def _sweep_ticker(args: tuple) -> pd.DataFrame:
+    """Barrido completo de un ticker (se ejecuta en un proceso del pool)."""
+    ticker, close, fast, slow, periods, lowers, uppers, cost_bps = args
+    parts = []
+    cross = sweep_crossover(close, fast, slow, cost_bps)
+    if not cross.empty:
+        cross.insert(0, "strategy", "crossover")
+        parts.append(cross)
+    rsi = sweep_rsi(close, periods, lowers, uppers, cost_bps)
+    if not rsi.empty:
+        rsi.insert(0, "strategy", "rsi")
+        parts.append(rsi)
+    if not parts:
+        return pd.DataFrame()
+    result = pd.concat(parts, ignore_index=True)
+    result.insert(0, "ticker", ticker)
+    return result
+
+
+def sweep_universe(
+    prices_by_ticker: dict[str, Optional[pd.DataFrame]],
+    fast_windows: list[int] = (5, 10, 20, 30),
+    slow_windows: list[int] = (50, 100, 150, 200),
+    rsi_periods: list[int] = (7, 14, 21),
+    rsi_lower: list[float] = (20.0, 25.0, 30.0, 35.0),
+    rsi_upper: list[float] = (65.0, 70.0, 75.0, 80.0),
+    cost_bps: float = 0.0,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Barrido de parámetros de ambas estrategias para muchos tickers en un pool de procesos.
+
+    Args:
+        prices_by_ticker: Diccionario ticker -> DataFrame de precios (o None).
+        fast_windows, slow_windows: Ventanas para el cruce de medias.
+        rsi_periods, rsi_lower, rsi_upper: Parámetros de la estrategia de RSI.
+        cost_bps: Coste por cambio de posición en puntos básicos.
+        max_workers: Procesos del pool (por defecto, los de la máquina).
+
+    Returns:
+        DataFrame con una fila por ticker, estrategia y combinación de parámetros.
+    """
+    tasks = []
+    for ticker, prices in prices_by_ticker.items():
+        if prices is None or prices.empty:
+            continue
+        close = prices["Close"].dropna().to_numpy(dtype=np.float64)
+        if len(close) < 2:
+            continue
+        tasks.append((ticker, close, list(fast_windows), list(slow_windows), list(rsi_periods),
+                      list(rsi_lower), list(rsi_upper), cost_bps))
+    if not tasks:
+        return pd.DataFrame()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        parts = list(pool.map(_sweep_ticker, tasks, chunksize=max(1, len(tasks) // 32)))
+    parts = [p for p in parts if not p.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
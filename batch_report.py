@@ -0,0 +1,240 @@
+"""
+batch_report.py
+Generador de informes por lotes sin interfaz: descarga datos en bloque, construye el
+contexto de cada combinación ticker/perfil/horizonte y genera los análisis con
+concurrencia acotada y un limitador de ritmo (token bucket) acorde a la cuota de Gemini.
+Los resultados se escriben en JSONL; al relanzar se omiten los ya generados.
+
+Uso:
+    python batch_report.py                                   # todo el universo, todos los perfiles
+    python batch_report.py --tickers AAPL MSFT --profiles Moderado --rpm 10
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+
+import analysis_history
+import llm_cache
+from context_builder import ANALYSIS_MODES, CONTEXT_INDICATORS, HORIZONS, RISK_PROFILES, build_context
+from data_fetcher import get_historical_data_many, get_news_headlines, trim_to_months
+from indicators import compute_indicators
+from llm_client import analysis_cache_key, count_tokens, generate_analysis
+from tickers import TOP_100_TICKERS
+
+# Peticiones por minuto permitidas por defecto (cuota gratuita de Gemini Flash)
+DEFAULT_RPM = int(os.getenv("TRADEWISE_BATCH_RPM", "10"))
+
+
+class TokenBucket:
+    """
+    Limitador de ritmo: como mucho 'rate' peticiones por segundo de media,
+    con ráfagas de hasta 'capacity' peticiones. Seguro entre hilos.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def job_id(ticker: str, profile: str, horizon: str) -> str:
+    """Identificador estable de una combinación (sirve de punto de control)."""
+    return f"{ticker}|{profile}|{horizon}"
+
+
+def load_done(output: Path) -> set[str]:
+    """Combinaciones ya generadas con éxito en un archivo de salida previo."""
+    done = set()
+    if not output.exists():
+        return done
+    with open(output, "r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # línea a medias de una ejecución interrumpida
+            if record.get("success"):
+                done.add(record["id"])
+    return done
+
+
+def _ends_with_newline(path: Path) -> bool:
+    """Indica si el archivo está vacío o termina en salto de línea."""
+    with open(path, "rb") as fh:
+        if fh.seek(0, os.SEEK_END) == 0:
+            return True
+        fh.seek(-1, os.SEEK_END)
+        return fh.read(1) == b"\n"
+
+
+def run_batch(
+    tickers: list[str],
+    profiles: list[str],
+    horizons: list[str],
+    output: Path,
+    concurrency: int = 4,
+    rpm: float = DEFAULT_RPM,
+    months: int = 6,
+    use_cache: bool = True,
+    mode: str = "full",
+) -> dict:
+    """
+    Genera los análisis de todas las combinaciones pendientes y los añade a 'output'.
+
+    Args:
+        tickers: Tickers a analizar.
+        profiles: Perfiles de riesgo.
+        horizons: Horizontes de inversión.
+        output: Archivo JSONL de resultados (también es el punto de control).
+        concurrency: Llamadas al LLM simultáneas como máximo.
+        rpm: Llamadas al LLM por minuto como máximo (las respuestas en caché no cuentan).
+        months: Meses de historia para los indicadores.
+        use_cache: Si False, no se reutilizan análisis cacheados.
+        mode: Modo de análisis ('full' o 'fast').
+
+    Returns:
+        Resumen con total, skipped, ok, failed, cached y seconds.
+    """
+    started = time.perf_counter()
+    done = load_done(output)
+    pending = [
+        (t, p, h) for t, p, h in product(tickers, profiles, horizons)
+        if job_id(t, p, h) not in done
+    ]
+    summary = {"total": len(pending) + len(done), "skipped": len(done), "ok": 0, "failed": 0, "cached": 0}
+    if not pending:
+        summary["seconds"] = round(time.perf_counter() - started, 2)
+        return summary
+
+    needed = sorted({t for t, _, _ in pending})
+    prices = get_historical_data_many(needed, months=months)
+    # Mismo cálculo que la app (ventana y registro por ticker): el contexto, y por tanto la
+    # clave de caché del análisis, sale idéntico y el lote precalienta la caché de la app
+    names = CONTEXT_INDICATORS.get(mode, CONTEXT_INDICATORS["full"])
+    indicators = {
+        ticker: compute_indicators(trim_to_months(data, months), names)
+        for ticker, data in prices.items() if data is not None
+    }
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        headlines = dict(zip(needed, pool.map(lambda t: get_news_headlines(t, max_headlines=10), needed)))
+
+    bucket = TokenBucket(rate=rpm / 60.0, capacity=1.0)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    def run_job(ticker: str, profile: str, horizon: str) -> dict:
+        record = {
+            "id": job_id(ticker, profile, horizon),
+            "ticker": ticker,
+            "profile": profile,
+            "horizon": horizon,
+            "mode": mode,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if prices.get(ticker) is None:
+            record.update(success=False, result="Error: sin datos históricos.", cached=False)
+            return record
+        context = build_context(
+            ticker, profile, horizon, indicators[ticker], headlines[ticker], mode=mode, count_tokens=count_tokens,
+            months=months,
+        )
+        job_started = time.perf_counter()
+        cached = llm_cache.get(analysis_cache_key(context, mode)) if use_cache else None
+        if cached is not None:
+            success, result = True, cached
+        else:
+            # Solo las llamadas reales a la API consumen cuota, reintentos incluidos
+            success, result = generate_analysis(context, use_cache=False, mode=mode, before_call=bucket.acquire)
+        record.update(
+            success=success,
+            result=result,
+            cached=cached is not None,
+            indicators=indicators[ticker],
+            headlines=headlines[ticker],
+            seconds=round(time.perf_counter() - job_started, 3),
+        )
+        # Las respuestas de la caché ya están en el historial desde que se generaron
+        if success and cached is None:
+            analysis_history.record(
+                ticker, profile, horizon, mode, context, indicators[ticker], result,
+                last_bar=str(prices[ticker].index[-1]),
+            )
+        return record
+
+    with open(output, "a", encoding="utf-8") as fh, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Una ejecución interrumpida puede dejar la última línea a medias: se cierra antes de seguir
+        if not _ends_with_newline(output):
+            fh.write("\n")
+        futures = [pool.submit(run_job, *job) for job in pending]
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                print(f"Error inesperado: {e}")
+                continue
+            # Cada resultado se vuelca al momento: el archivo es el punto de control
+            fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            fh.flush()
+            summary["ok" if record["success"] else "failed"] += 1
+            summary["cached"] += int(record["cached"])
+            print(f"[{summary['ok'] + summary['failed']}/{len(pending)}] {record['id']}: "
+                  f"{'ok' if record['success'] else record['result']}")
+
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera análisis de TradeWise por lotes.")
+    parser.add_argument("--tickers", nargs="+", default=TOP_100_TICKERS, help="Tickers (por defecto TOP_100_TICKERS).")
+    parser.add_argument("--profiles", nargs="+", default=RISK_PROFILES, choices=RISK_PROFILES, help="Perfiles de riesgo.")
+    parser.add_argument("--horizons", nargs="+", default=HORIZONS, choices=HORIZONS, help="Horizontes de inversión.")
+    parser.add_argument(
+        "--output", type=Path,
+        default=Path("reports") / f"report_{datetime.now():%Y%m%d}.jsonl",
+        help="Archivo JSONL de salida (se reanuda si ya existe).",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Llamadas simultáneas al LLM.")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Llamadas al LLM por minuto.")
+    parser.add_argument("--months", type=int, default=6, help="Meses de historia de precios.")
+    parser.add_argument("--mode", default="full", choices=list(ANALYSIS_MODES.values()), help="Modo de análisis.")
+    parser.add_argument("--no-cache", action="store_true", help="No reutilizar análisis cacheados.")
+    args = parser.parse_args()
+
+    tickers = [t.strip().upper() for t in args.tickers]
+    not_allowed = [t for t in tickers if t not in TOP_100_TICKERS]
+    if not_allowed:
+        parser.error(f"Tickers no permitidos: {', '.join(not_allowed)}")
+
+    summary = run_batch(
+        tickers, args.profiles, args.horizons, args.output,
+        concurrency=args.concurrency, rpm=args.rpm, months=args.months,
+        use_cache=not args.no_cache, mode=args.mode,
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+benchmarks
+Suite de benchmarks de TradeWise que se ejecuta sin red: precios sintéticos,
+un proveedor falso de yfinance y un cliente falso de Gemini con latencia configurable.
+Uso: python -m benchmarks.run
+"""
@@ -0,0 +1,94 @@
+"""
+benchmarks/fakes.py
+Sustitutos sin red de yfinance (datos sintéticos) y de Gemini con latencia configurable,
+sobre los proveedores de providers.py.
+install() los coloca en data_fetcher y llm_client durante un bloque with.
+"""
+
+import os
+import zlib
+from contextlib import contextmanager
+from typing import Optional
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlcv
+from providers import MockGemini, ReplayYFinance
+
+# El LLM simulado de providers.py ya sirve tal cual para las mediciones
+FakeGemini = MockGemini
+
+
+class FakeYFinance(ReplayYFinance):
+    """
+    Proveedor de repetición con datos sintéticos en lugar de fixtures grabados.
+    Las barras intradía avanzan una barra por cada descarga intradía, como un mercado abierto.
+
+    Args:
+        latency: Segundos de espera por llamada (simula la ida y vuelta a Yahoo).
+        n_days: Barras disponibles por ticker.
+        unknown: Tickers para los que no se devuelven datos.
+        intraday_bars: Barras intradía publicadas al empezar.
+    """
+
+    def __init__(self, latency: float = 0.0, n_days: int = 2520, unknown: Optional[set] = None, intraday_bars: int = 390):
+        super().__init__(latency=latency, intraday_bars=intraday_bars)
+        self.n_days = n_days
+        self.unknown = unknown or set()
+
+    def history(self, ticker: str) -> Optional[pd.DataFrame]:
+        """Histórico sintético completo y estable de un ticker."""
+        if ticker in self.unknown:
+            return None
+        if ticker not in self._data:
+            self._data[ticker] = synthetic_ohlcv(self.n_days, seed=zlib.crc32(ticker.encode()))
+        return self._data[ticker]
+
+    def intraday(self, ticker: str, interval: str) -> Optional[pd.DataFrame]:
+        """Serie intradía sintética completa de un ticker (se publica poco a poco)."""
+        if ticker in self.unknown:
+            return None
+        key = (ticker, interval)
+        if key not in self._intraday:
+            data = synthetic_ohlcv(20_000, seed=zlib.crc32(f"{ticker}{interval}".encode()))
+            data.index = pd.date_range("2024-01-02 09:30", periods=len(data), freq=interval.replace("m", "min"), name="Datetime")
+            self._intraday[key] = data
+        return self._intraday[key]
+
+    def news(self, ticker: str) -> list[dict]:
+        return [
+            {"title": f"{ticker} publica resultados trimestrales"},
+            {"title": f"Analistas revisan el precio objetivo de {ticker}"},
+            {"title": f"{ticker} anuncia nuevo programa de recompra"},
+        ]
+
+
+@contextmanager
+def install(yf: Optional[FakeYFinance] = None, gemini: Optional[FakeGemini] = None):
+    """
+    Sustituye yfinance y Gemini en data_fetcher y llm_client durante el bloque.
+
+    Args:
+        yf: Proveedor falso de precios (por defecto sin latencia).
+        gemini: Cliente falso del LLM (por defecto sin latencia).
+
+    Yields:
+        Tupla (yf, gemini) con los objetos instalados.
+    """
+    import data_fetcher
+    import llm_client
+
+    yf = yf or FakeYFinance()
+    gemini = gemini or FakeGemini()
+    saved = (data_fetcher.yf, llm_client.genai, os.environ.get("GEMINI_API_KEY"))
+    data_fetcher.yf = yf
+    llm_client.genai = gemini
+    os.environ["GEMINI_API_KEY"] = "benchmark"
+    try:
+        yield yf, gemini
+    finally:
+        data_fetcher.yf, llm_client.genai = saved[0], saved[1]
+        if saved[2] is None:
+            os.environ.pop("GEMINI_API_KEY", None)
+        else:
+            os.environ["GEMINI_API_KEY"] = saved[2]
@@ -0,0 +1,224 @@
+"""
+benchmarks/loadtest.py
+Prueba de carga: simula muchas sesiones de Streamlit a la vez en un mismo proceso, cada
+una carga la página y genera análisis con su propio ticker, perfil y horizonte. Los precios
+salen del proveedor de repetición (fixtures grabados con providers.py) o de datos
+sintéticos, y el LLM es el simulado con la latencia indicada, así que no hace falta red.
+Informa del rendimiento (análisis por segundo), latencias p50/p95/p99, errores y memoria
+por sesión abierta.
+
+Uso:
+    python -m benchmarks.loadtest                                # 50 sesiones, datos sintéticos
+    python -m benchmarks.loadtest --sessions 200 --concurrency 50
+    python -m benchmarks.loadtest --fixtures fixtures --llm-total 8 --json
+"""
+
+import os
+import tempfile
+
+# La caché debe apuntar a un directorio temporal antes de importar los módulos de la app
+os.environ.setdefault("TRADEWISE_CACHE_DIR", tempfile.mkdtemp(prefix="tradewise-load-"))
+
+import argparse
+import json
+import random
+import resource
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.fakes import FakeYFinance, install
+from providers import MockGemini, ReplayYFinance
+
+APP_FILE = Path(__file__).resolve().parent.parent / "app.py"
+
+
+def _rss_bytes() -> int:
+    """Memoria residente actual del proceso (pico si /proc no está disponible)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _latencies(values: list[float]) -> dict:
+    """Percentiles p50/p95/p99 y máximo de una lista de duraciones, en milisegundos."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50 * 1000, 1), "p95": round(p95 * 1000, 1), "p99": round(p99 * 1000, 1), "max": round(max(values) * 1000, 1)}
+
+
+@contextmanager
+def _shared_runtime():
+    """
+    Prepara Streamlit para varias sesiones de AppTest en paralelo durante el bloque:
+
+    - AppTest instala un Runtime simulado global al empezar cada ejecución y lo retira al
+      acabar, así que una sesión lo retiraría mientras otra lo usa; Runtime.instance()
+      devuelve el último instalado aunque otra sesión lo haya retirado.
+    - Cada ejecución compila de nuevo app.py, y compilar en varios hilos a la vez falla en
+      algunas versiones de CPython 3.11; la compilación se serializa (es breve).
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    last = []
+    compiling = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def locked_bytecode(self, script_path):
+        with compiling:
+            return get_bytecode(self, script_path)
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        if not last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last[0]
+
+    def exists(cls):
+        return cls._instance is not None or bool(last)
+
+    with mock.patch.object(Runtime, "instance", classmethod(instance)), \
+            mock.patch.object(Runtime, "exists", classmethod(exists)), \
+            mock.patch.object(ScriptCache, "get_bytecode", locked_bytecode):
+        yield
+
+
+def run_load(
+    sessions: int,
+    concurrency: int,
+    requests: int,
+    tickers: list[str],
+    seed: int = 0,
+) -> dict:
+    """
+    Lanza las sesiones simuladas contra los proveedores ya instalados y resume los resultados.
+
+    Args:
+        sessions: Sesiones de navegador simuladas.
+        concurrency: Sesiones activas a la vez como máximo.
+        requests: Análisis generados por sesión.
+        tickers: Tickers entre los que elige cada sesión.
+        seed: Semilla para repartir tickers, perfiles y horizontes.
+
+    Returns:
+        Resumen con sessions, analyses, errors, seconds, throughput, page_load y analysis
+        (percentiles en ms), memory_per_session_mb y counters de telemetría.
+    """
+    import telemetry
+    from context_builder import HORIZONS, RISK_PROFILES
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    plans = [
+        [(rng.choice(tickers), rng.choice(RISK_PROFILES), rng.choice(HORIZONS)) for _ in range(requests)]
+        for _ in range(sessions)
+    ]
+    # Una carga previa importa la app y sus dependencias: la memoria medida es la de las sesiones
+    with _shared_runtime():
+        AppTest.from_file(str(APP_FILE), default_timeout=120).run()
+    telemetry.reset()
+    baseline = _rss_bytes()
+
+    page_loads, analyses, errors = [], [], []
+    apps = []
+    lock = threading.Lock()
+
+    def session(plan: list[tuple[str, str, str]]) -> None:
+        started = time.perf_counter()
+        app = AppTest.from_file(str(APP_FILE), default_timeout=120).run()
+        loaded = time.perf_counter() - started
+        timings, failed = [], 0
+        for ticker, profile, horizon in plan:
+            app.sidebar.selectbox[0].set_value(ticker)
+            app.sidebar.selectbox[1].set_value(profile)
+            app.sidebar.selectbox[2].set_value(horizon)
+            started = time.perf_counter()
+            app.button[0].click().run()
+            timings.append(time.perf_counter() - started)
+            failed += bool(app.exception or app.error)
+        with lock:
+            page_loads.append(loaded)
+            analyses.extend(timings)
+            errors.append(failed)
+            # Las sesiones siguen abiertas hasta el final, como pestañas de navegador
+            apps.append(app)
+
+    started = time.perf_counter()
+    with _shared_runtime(), ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for future in [pool.submit(session, plan) for plan in plans]:
+            future.result()
+    seconds = time.perf_counter() - started
+    memory = _rss_bytes() - baseline
+
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "analyses": len(analyses),
+        "errors": sum(errors),
+        "seconds": round(seconds, 2),
+        "throughput": round(len(analyses) / seconds, 2) if seconds else 0.0,
+        "page_load": _latencies(page_loads),
+        "analysis": _latencies(analyses),
+        "memory_per_session_mb": round(memory / max(1, len(apps)) / 2**20, 2),
+        "counters": telemetry.snapshot()["counters"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de TradeWise con sesiones simuladas.")
+    parser.add_argument("--sessions", type=int, default=50, help="Sesiones simuladas.")
+    parser.add_argument("--concurrency", type=int, default=None, help="Sesiones activas a la vez (por defecto, todas).")
+    parser.add_argument("--requests", type=int, default=1, help="Análisis por sesión.")
+    parser.add_argument("--tickers", nargs="+", default=["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL"], help="Tickers a repartir.")
+    parser.add_argument("--fixtures", type=Path, default=None, help="Directorio de fixtures (sin él, datos sintéticos).")
+    parser.add_argument("--yf-latency", type=float, default=0.05, help="Segundos por llamada al proveedor de datos.")
+    parser.add_argument("--llm-ttft", type=float, default=0.5, help="Segundos hasta el primer fragmento del LLM.")
+    parser.add_argument("--llm-total", type=float, default=3.0, help="Segundos totales de generación del LLM.")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del reparto de tickers, perfiles y horizontes.")
+    parser.add_argument("--json", action="store_true", help="Imprime el resumen en JSON.")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    # Cada sesión simulada avisa de que no hay servidor y de parámetros obsoletos; aquí sobra
+    import streamlit
+    streamlit.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+    if args.fixtures is not None:
+        yf = ReplayYFinance(args.fixtures, latency=args.yf_latency)
+    else:
+        yf = FakeYFinance(latency=args.yf_latency)
+    gemini = MockGemini(ttft=args.llm_ttft, total=args.llm_total)
+    with install(yf, gemini):
+        summary = run_load(
+            args.sessions, args.concurrency or args.sessions, args.requests,
+            [t.upper() for t in args.tickers], seed=args.seed,
+        )
+    summary.update(provider_calls=yf.calls, llm_calls=gemini.calls)
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return
+    print(f"sesiones     {summary['sessions']} ({summary['concurrency']} a la vez), "
+          f"{summary['analyses']} análisis, {summary['errors']} errores en {summary['seconds']} s")
+    print(f"rendimiento  {summary['throughput']} análisis/s")
+    for label, key in (("carga", "page_load"), ("análisis", "analysis")):
+        stats = summary[key]
+        print(f"{label:<12} p50 {stats['p50']:>8.1f} ms  p95 {stats['p95']:>8.1f} ms  "
+              f"p99 {stats['p99']:>8.1f} ms  max {stats['max']:>8.1f} ms")
+    print(f"memoria      {summary['memory_per_session_mb']} MB por sesión")
+    print(f"llamadas     {summary['provider_calls']} al proveedor de datos, {summary['llm_calls']} al LLM")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+benchmarks/prompt_modes.py
+Compara los modos de análisis (completo y rápido): titulares enviados, tokens de
+entrada y salida y latencia por modo. Sin --live usa el Gemini falso de benchmarks
+(los tokens de salida y tiempos son simulados); con --live llama a la API real.
+
+Uso:
+    python -m benchmarks.prompt_modes            # sin red
+    python -m benchmarks.prompt_modes --live     # con GEMINI_API_KEY, mide la API real
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("TRADEWISE_CACHE_DIR", tempfile.mkdtemp(prefix="tradewise-bench-"))
+
+import argparse
+import contextlib
+import statistics
+import time
+import warnings
+
+from benchmarks.fakes import FakeGemini, install
+from benchmarks.synthetic import synthetic_headlines, synthetic_ohlcv
+from benchmarks.run import LLM_TOTAL, LLM_TTFT
+
+
+def measure(tickers: list[str], modes: list[str]) -> list[dict]:
+    """
+    Genera un análisis por ticker y modo (sin caché) y resume tokens y latencias.
+
+    Returns:
+        Una fila por modo con headlines, prompt_tokens, input_tokens, output_tokens,
+        ttft_p50, total_p50 (segundos) y calls.
+    """
+    import telemetry
+    from context_builder import CONTEXT_INDICATORS, HEADLINE_TOKEN_BUDGET, build_context, compact_headlines
+    from indicators import compute_indicators
+    from llm_client import count_tokens, generate_analysis_stream
+
+    rows = []
+    for mode in modes:
+        telemetry.reset()
+        totals, ttfts, kept = [], [], []
+        for i, ticker in enumerate(tickers):
+            indicators = compute_indicators(synthetic_ohlcv(126, seed=i), CONTEXT_INDICATORS[mode])
+            headlines = synthetic_headlines(ticker)
+            kept.append(len(compact_headlines(headlines, HEADLINE_TOKEN_BUDGET[mode], count_tokens)))
+            context = build_context(
+                ticker, "Moderado", "Mediano plazo", indicators, headlines, mode=mode, count_tokens=count_tokens,
+            )
+            started = time.perf_counter()
+            first = None
+            for _ in generate_analysis_stream(context, use_cache=False, mode=mode):
+                first = first or time.perf_counter() - started
+            totals.append(time.perf_counter() - started)
+            ttfts.append(first or 0.0)
+        counters = telemetry.snapshot()["counters"]
+        calls = len(tickers)
+        rows.append({
+            "mode": mode,
+            "headlines": statistics.mean(kept),
+            "prompt_tokens": counters.get(f"llm_prompt_tokens_{mode}", 0) / calls,
+            "input_tokens": counters.get(f"llm_input_tokens_{mode}", 0) / calls,
+            "output_tokens": counters.get(f"llm_output_tokens_{mode}", 0) / calls,
+            "ttft_p50": statistics.median(ttfts),
+            "total_p50": statistics.median(totals),
+            "calls": calls,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens y latencia por modo de análisis.")
+    parser.add_argument("--live", action="store_true", help="Usa la API real de Gemini (requiere GEMINI_API_KEY).")
+    parser.add_argument("--tickers", nargs="+", default=["AAPL", "MSFT", "NVDA"], help="Tickers a analizar.")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    fake = contextlib.nullcontext() if args.live else install(gemini=FakeGemini(ttft=LLM_TTFT, total=LLM_TOTAL))
+    with fake:
+        rows = measure(args.tickers, ["full", "fast"])
+
+    print(f"{'modo':<6} {'titulares':>9} {'prompt':>10} {'entrada':>8} {'salida':>8} {'ttft_p50':>9} {'total_p50':>10}")
+    for row in rows:
+        print(
+            f"{row['mode']:<6} {row['headlines']:>9.1f} {row['prompt_tokens']:>10.0f} "
+            f"{row['input_tokens']:>8.0f} {row['output_tokens']:>8.0f} "
+            f"{row['ttft_p50'] * 1000:>7.0f}ms {row['total_p50'] * 1000:>8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+benchmarks/run.py
+Ejecuta los benchmarks y los compara con los valores de referencia guardados.
+No necesita red: usa precios sintéticos y sustitutos de yfinance y Gemini.
+
+Uso:
+    python -m benchmarks.run                    # ejecuta y compara con baseline.json
+    python -m benchmarks.run --update-baseline  # guarda los tiempos como nueva referencia
+    python -m benchmarks.run -k indicators      # solo los benchmarks cuyo nombre contenga el texto
+"""
+
+import os
+import tempfile
+
+# La caché debe apuntar a un directorio temporal antes de importar los módulos de la app
+os.environ.setdefault("TRADEWISE_CACHE_DIR", tempfile.mkdtemp(prefix="tradewise-bench-"))
+
+import argparse
+import json
+import logging
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.fakes import FakeGemini, FakeYFinance, install
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_universe
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+APP_FILE = Path(__file__).resolve().parent.parent / "app.py"
+
+# Latencias simuladas de los proveedores externos (segundos)
+YF_LATENCY = 0.05
+LLM_TTFT = 0.2
+LLM_TOTAL = 0.6
+
+# Un benchmark devuelve (preparación, función medida); la preparación no se cronometra
+BENCHMARKS: dict[str, Callable[[], tuple[Callable[[], None], Callable[[], None]]]] = {}
+
+
+def benchmark(name: str):
+    """Registra una función que construye un benchmark."""
+    def register(builder):
+        BENCHMARKS[name] = builder
+        return builder
+    return register
+
+
+def _noop() -> None:
+    pass
+
+
+def _clear_caches() -> None:
+    """Vacía todas las cachés (en disco y las de Streamlit en memoria) para medir el camino en frío."""
+    import streamlit as st
+
+    import analysis_history
+    import llm_cache
+    import news_cache
+    import price_cache
+    import price_store
+
+    analysis_history.clear()
+    price_cache.clear()
+    price_store.clear()
+    shutil.rmtree(news_cache.NEWS_DIR, ignore_errors=True)
+    llm_cache.clear()
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+@benchmark("indicators.single_6m")
+def _bench_single_6m():
+    from indicators import compute_all_indicators
+    prices = synthetic_ohlcv(126)
+    return _noop, lambda: compute_all_indicators(prices)
+
+
+@benchmark("indicators.single_10y")
+def _bench_single_10y():
+    from indicators import compute_all_indicators
+    prices = synthetic_ohlcv(2520)
+    return _noop, lambda: compute_all_indicators(prices)
+
+
+@benchmark("indicators.single_40y")
+def _bench_single_40y():
+    from indicators import compute_all_indicators
+    prices = synthetic_ohlcv(10080)
+    return _noop, lambda: compute_all_indicators(prices)
+
+
+@benchmark("indicators.extended_6m")
+def _bench_extended_6m():
+    from indicators import compute_indicators
+    prices = synthetic_ohlcv(126)
+    return _noop, lambda: compute_indicators(prices)
+
+
+@benchmark("indicators.extended_10y")
+def _bench_extended_10y():
+    from indicators import compute_indicators
+    prices = synthetic_ohlcv(2520)
+    return _noop, lambda: compute_indicators(prices)
+
+
+@benchmark("indicators.loop_100x10y")
+def _bench_loop_universe():
+    from indicators import compute_all_indicators
+    from tickers import TOP_100_TICKERS
+    universe = synthetic_universe(TOP_100_TICKERS, 2520)
+    return _noop, lambda: [compute_all_indicators(p) for p in universe.values()]
+
+
+@benchmark("indicators.panel_100x10y")
+def _bench_panel_universe():
+    from indicators import compute_all_indicators_many
+    from tickers import TOP_100_TICKERS
+    universe = synthetic_universe(TOP_100_TICKERS, 2520)
+    return _noop, lambda: compute_all_indicators_many(universe)
+
+
+@benchmark("charting.spec_20y")
+def _bench_chart_spec_20y():
+    from charting import price_chart_spec
+    prices = synthetic_ohlcv(5040)
+    return _noop, lambda: price_chart_spec(prices)
+
+
+@benchmark("portfolio.risk_100x10y")
+def _bench_portfolio_risk():
+    import portfolio
+    from tickers import TOP_100_TICKERS
+    returns = portfolio.returns_matrix(synthetic_universe(TOP_100_TICKERS, 2520))
+
+    def run():
+        cov = portfolio.covariance_matrix(returns)
+        portfolio.correlation_matrix(returns)
+        portfolio.portfolio_volatility(cov.to_numpy())
+    return _noop, run
+
+
+@benchmark("portfolio.update_day_100")
+def _bench_portfolio_update():
+    import portfolio
+    from tickers import TOP_100_TICKERS
+    returns = portfolio.returns_matrix(synthetic_universe(TOP_100_TICKERS, 2520))
+    state = portfolio.CovarianceState.from_returns(returns.iloc[:-1], window=1260)
+    row = returns.to_numpy()[-1]
+    return _noop, lambda: state.update(returns.index[-1], row)
+
+
+@benchmark("indicator_state.update_x1000")
+def _bench_state_update():
+    from indicator_state import IndicatorState
+    state = IndicatorState.from_series(synthetic_ohlcv(126)["Close"])
+    closes = synthetic_ohlcv(1000, seed=1)["Close"].tolist()
+
+    def run():
+        for close in closes:
+            state.update(close)
+    return _noop, run
+
+
+@benchmark("data.fetch_cold")
+def _bench_fetch_cold():
+    from data_fetcher import get_historical_data
+    return _clear_caches, lambda: get_historical_data("AAPL", months=6)
+
+
+@benchmark("data.fetch_warm")
+def _bench_fetch_warm():
+    from data_fetcher import get_historical_data
+
+    def setup():
+        _clear_caches()
+        get_historical_data("AAPL", months=6)
+    return setup, lambda: get_historical_data("AAPL", months=6)
+
+
+@benchmark("data.bulk_cold_100")
+def _bench_bulk_cold():
+    from data_fetcher import get_historical_data_many
+    from tickers import TOP_100_TICKERS
+    return _clear_caches, lambda: get_historical_data_many(TOP_100_TICKERS, months=6)
+
+
+@benchmark("data.bulk_warm_100")
+def _bench_bulk_warm():
+    from data_fetcher import get_historical_data_many
+    from tickers import TOP_100_TICKERS
+
+    def setup():
+        _clear_caches()
+        get_historical_data_many(TOP_100_TICKERS, months=6)
+    return setup, lambda: get_historical_data_many(TOP_100_TICKERS, months=6)
+
+
+@benchmark("data.fetch_shared")
+def _bench_fetch_shared():
+    import price_store
+    from data_fetcher import get_historical_data
+
+    def setup():
+        _clear_caches()
+        get_historical_data("AAPL", months=6)
+        price_store.publish()
+    return setup, lambda: get_historical_data("AAPL", months=6)
+
+
+@benchmark("data.bulk_shared_100")
+def _bench_bulk_shared():
+    import price_store
+    from data_fetcher import get_historical_data_many
+    from tickers import TOP_100_TICKERS
+
+    def setup():
+        _clear_caches()
+        get_historical_data_many(TOP_100_TICKERS, months=6)
+        price_store.publish()
+    return setup, lambda: get_historical_data_many(TOP_100_TICKERS, months=6)
+
+
+@benchmark("live.refresh_after_5000_bars")
+def _bench_live_refresh():
+    # Refresco de la sección en vivo con la sesión ya muy avanzada (búfer lleno)
+    import data_fetcher
+    import live
+    feeds = []
+
+    def setup():
+        data_fetcher.yf.intraday_bars = 5000
+        feed = live.LiveFeed("AAPL", "1m")
+        feed.poll(min_interval=0)
+        feeds[:] = [feed]
+
+    def run():
+        feed = feeds[0]
+        feed.poll(min_interval=0)
+        feed.snapshot()
+        feed.frame()
+    return setup, run
+
+
+@benchmark("history.lookup_1m_rows")
+def _bench_history_lookup():
+    # Último análisis, análisis anterior con otros datos e historial reciente de cada ticker
+    # con un millón de análisis guardados
+    from unittest import mock
+
+    import analysis_history
+    from context_builder import HORIZONS, RISK_PROFILES
+    from tickers import TOP_100_TICKERS
+
+    path = Path(tempfile.mkdtemp(prefix="tradewise-history-")) / "history.sqlite"
+    combos = [(t, p, h) for t in TOP_100_TICKERS for p in RISK_PROFILES for h in HORIZONS]
+    payload = analysis_history._compress("Análisis sintético de prueba. " * 20)
+    indicators = json.dumps({"last_close": 100.0, "ma_20": 99.0, "ma_50": 98.0, "rsi": 50.0, "volatility": 0.2})
+    sessions = -(-1_000_000 // len(combos))
+    bars = [analysis_history.bar_key(datetime(2020, 1, 1) + timedelta(days=day)) for day in range(sessions)]
+    with mock.patch.object(analysis_history, "DB_FILE", path), analysis_history._db() as conn:
+        conn.executemany(
+            "INSERT INTO runs (created_at, day, ticker, profile, horizon, mode, last_bar, indicators, context, result) "
+            "VALUES (?, ?, ?, ?, ?, 'full', ?, ?, ?, ?)",
+            (
+                # Una ejecución de cada combinación por sesión de mercado
+                (1.7e9 + i * 60, "2024-01-01", *combos[i % len(combos)], bars[i // len(combos)], indicators, payload, payload)
+                for i in range(1_000_000)
+            ),
+        )
+    last_bar = bars[999_999 // len(combos)]
+
+    def run():
+        with mock.patch.object(analysis_history, "DB_FILE", path):
+            for ticker in TOP_100_TICKERS:
+                analysis_history.latest(ticker, RISK_PROFILES[1], HORIZONS[1])
+                analysis_history.recent(ticker, limit=1, before_bar=last_bar)
+                analysis_history.recent(ticker, limit=20)
+    return _noop, run
+
+
+def _check_app(app) -> None:
+    """Lanza excepción si la ejecución simulada de la app terminó con errores."""
+    if app.exception or app.error:
+        raise RuntimeError(f"La app falló: {app.exception or [e.value for e in app.error]}")
+
+
+def _run_app_once():
+    """Simula una sesión: carga la página y pulsa «Generar análisis». Devuelve la sesión."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(APP_FILE), default_timeout=60).run()
+    app.button[0].click().run()
+    _check_app(app)
+    return app
+
+
+@benchmark("startup.import_app")
+def _bench_import_app():
+    # Proceso nuevo: mide el arranque en frío (importar la app y sus dependencias)
+    command = [sys.executable, "-c", "import app"]
+    cwd = APP_FILE.parent
+
+    def run():
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return _noop, run
+
+
+@benchmark("e2e.analysis_cold")
+def _bench_e2e_cold():
+    return _clear_caches, _run_app_once
+
+
+@benchmark("e2e.analysis_warm")
+def _bench_e2e_warm():
+    def setup():
+        _clear_caches()
+        _run_app_once()
+    return setup, _run_app_once
+
+
+@benchmark("e2e.rerun_idle")
+def _bench_e2e_rerun_idle():
+    # Rerun sin cambios tras un análisis: coste fijo de cada interacción
+    sessions = []
+
+    def setup():
+        _clear_caches()
+        sessions[:] = [_run_app_once()]
+    return setup, lambda: _check_app(sessions[0].run())
+
+
+@benchmark("e2e.rerun_profile_change")
+def _bench_e2e_rerun_profile():
+    # Nuevo análisis cambiando solo el perfil: precios, indicadores, gráfico y backtest
+    # salen de las cachés en memoria; solo cambian el contexto y la llamada al LLM
+    sessions = []
+
+    def setup():
+        _clear_caches()
+        app = _run_app_once()
+        app.sidebar.selectbox[1].set_value("Agresivo")
+        sessions[:] = [app]
+
+    def run():
+        _check_app(sessions[0].button[0].click().run())
+    return setup, run
+
+
+def run_benchmarks(names: list[str], repeat: int) -> dict[str, float]:
+    """
+    Ejecuta los benchmarks indicados con los proveedores falsos instalados.
+
+    Args:
+        names: Nombres de benchmarks a ejecutar.
+        repeat: Repeticiones por benchmark (se informa la mediana).
+
+    Returns:
+        Diccionario nombre -> mediana en segundos.
+    """
+    results = {}
+    yf = FakeYFinance(latency=YF_LATENCY)
+    gemini = FakeGemini(ttft=LLM_TTFT, total=LLM_TOTAL)
+    with install(yf, gemini):
+        for name in names:
+            setup, func = BENCHMARKS[name]()
+            func_times = []
+            for _ in range(repeat):
+                setup()
+                started = time.perf_counter()
+                func()
+                func_times.append(time.perf_counter() - started)
+            results[name] = statistics.median(func_times)
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Devuelve los benchmarks más lentos que la referencia por encima de la tolerancia."""
+    regressions = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de TradeWise sin red.")
+    parser.add_argument("-k", dest="filter", default="", help="Ejecuta solo los benchmarks cuyo nombre contenga este texto.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por benchmark.")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Factor sobre la referencia que cuenta como regresión.")
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda los resultados como nueva referencia.")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    # Las sesiones simuladas de Streamlit avisan de que no hay servidor; no es relevante aquí
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_benchmarks(names, args.repeat)
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+
+    print(f"{'benchmark':<32} {'mediana':>12} {'referencia':>12} {'ratio':>7}")
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        ratio = f"{seconds / reference:.2f}" if reference else "-"
+        ref_text = f"{reference * 1000:.3f} ms" if reference else "-"
+        print(f"{name:<32} {seconds * 1000:>9.3f} ms {ref_text:>12} {ratio:>7}")
+
+    if args.update_baseline:
+        baseline.update({name: round(seconds, 6) for name, seconds in results.items()})
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Referencia actualizada en {BASELINE_FILE}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regresiones (> x{args.tolerance}): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+benchmarks/synthetic.py
+Generadores de precios sintéticos (movimiento browniano geométrico) para benchmarks.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlcv(n_days: int, seed: int = 0, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Genera barras diarias OHLCV con el mismo formato que devuelve yfinance.
+
+    Args:
+        n_days: Número de barras (días hábiles).
+        seed: Semilla del generador aleatorio.
+        end: Última fecha (por defecto hoy).
+
+    Returns:
+        DataFrame con Open, High, Low, Close y Volume indexado por fecha.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.today().normalize() if end is None else end
+    index = pd.bdate_range(end=end, periods=n_days, name="Date")
+    returns = rng.normal(0.0003, 0.018, n_days)
+    close = 100.0 * np.exp(np.cumsum(returns))
+    spread = np.abs(rng.normal(0, 0.01, n_days))
+    open_ = close * (1 + rng.normal(0, 0.005, n_days))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(1_000_000, 50_000_000, n_days).astype(float)
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+def synthetic_universe(tickers: list[str], n_days: int) -> dict[str, pd.DataFrame]:
+    """Genera un histórico sintético distinto (semilla propia) para cada ticker."""
+    return {ticker: synthetic_ohlcv(n_days, seed=i) for i, ticker in enumerate(tickers)}
+
+
+def synthetic_headlines(ticker: str, n: int = 10) -> list[str]:
+    """
+    Titulares sintéticos con casi duplicados (la misma noticia redactada por varias fuentes),
+    como los que suele devolver yfinance.
+
+    Args:
+        ticker: Símbolo del activo.
+        n: Número de titulares.
+
+    Returns:
+        Lista de titulares.
+    """
+    stories = [
+        f"{ticker} beats quarterly earnings estimates as revenue climbs on strong demand",
+        f"Analysts raise {ticker} price target after upbeat guidance for the next fiscal year",
+        f"{ticker} announces new $10 billion share buyback program",
+        f"Regulators open inquiry into {ticker} business practices in Europe",
+        f"{ticker} shares slip as investors weigh rising costs and slowing margins",
+    ]
+    variants = [
+        "{}",
+        "UPDATE: {}",
+        "{} - report",
+    ]
+    return [variants[(i // len(stories)) % len(variants)].format(stories[i % len(stories)]) for i in range(n)]
@@ -0,0 +1,174 @@
+"""
+context_builder.py
+Construcción del contexto estructurado que se envía al LLM.
+Separado de app.py para poder reutilizarlo fuera de Streamlit (informes por lotes).
+Incluye la compactación de titulares (casi duplicados con news_cache.dedupe y
+presupuesto de tokens) y las instrucciones de cada modo de análisis (completo o rápido).
+"""
+
+from typing import Callable, Optional
+
+from indicators import BASE_INDICATORS, EXTENDED_INDICATORS
+from news_cache import dedupe
+
+# Opciones que el usuario puede elegir en la app
+RISK_PROFILES = ["Conservador", "Moderado", "Agresivo"]
+HORIZONS = ["Corto plazo", "Mediano plazo", "Largo plazo"]
+# Modos de análisis (etiqueta -> modo); el presupuesto de salida está en llm_client
+ANALYSIS_MODES = {"Completo": "full", "Rápido": "fast"}
+
+# Indicadores del registro (ver indicators.INDICATORS) que se envían en cada modo
+CONTEXT_INDICATORS = {"full": BASE_INDICATORS + EXTENDED_INDICATORS, "fast": BASE_INDICATORS}
+
+# Presupuesto de tokens para los titulares en cada modo
+HEADLINE_TOKEN_BUDGET = {"full": 300, "fast": 120}
+# Caracteres máximos por titular (los más largos se recortan)
+MAX_HEADLINE_CHARS = 160
+# Caracteres por token aproximados (estimación local cuando no se puede preguntar al modelo)
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens de un texto (aprox. CHARS_PER_TOKEN caracteres por token)."""
+    return max(1, -(-len(text) // CHARS_PER_TOKEN)) if text else 0
+
+
+def compact_headlines(
+    headlines: list[str],
+    budget_tokens: int,
+    count_tokens: Optional[Callable[[list[str]], list[int]]] = None,
+) -> list[str]:
+    """
+    Compacta los titulares para el prompt: quita casi duplicados, recorta los muy
+    largos y conserva, en orden, los que caben en el presupuesto de tokens.
+
+    Args:
+        headlines: Titulares (los más relevantes primero).
+        budget_tokens: Tokens máximos para el bloque de titulares.
+        count_tokens: Tokens de cada texto de una lista según el modelo (ver
+            llm_client.count_tokens); por defecto, estimate_tokens.
+
+    Returns:
+        Titulares que se enviarán al LLM.
+    """
+    candidates = []
+    for headline in dedupe(headlines):
+        headline = headline.strip()
+        if len(headline) > MAX_HEADLINE_CHARS:
+            headline = headline[:MAX_HEADLINE_CHARS - 1].rstrip() + "…"
+        candidates.append(headline)
+    lines = [f"- {headline}\n" for headline in candidates]
+    costs = count_tokens(lines) if count_tokens is not None else [estimate_tokens(line) for line in lines]
+    result, used = [], 0
+    for headline, cost in zip(candidates, costs):
+        if used + cost > budget_tokens:
+            break
+        result.append(headline)
+        used += cost
+    return result
+
+
+# Instrucciones del modo rápido: mismas secciones esenciales, respuesta breve
+_FAST_INSTRUCTIONS = [
+    "Responde en español, de forma breve y estructurada (unas 250 palabras en total):",
+    "1. **Análisis técnico**: 2–3 frases sobre medias móviles, RSI y volatilidad con los valores dados.",
+    "2. **Sentimiento de noticias**: POSITIVO, NEGATIVO o NEUTRAL, con una frase de justificación.",
+    "3. **Escenarios**: una frase para el alcista y otra para el bajista.",
+    "4. **Riesgo y recomendación**: nivel de riesgo (bajo/medio/alto) y consejo adaptado al perfil.",
+    "5. **Advertencia**: indica que este análisis NO es asesoría financiera.",
+]
+
+
+def _extended_lines(indicators: dict) -> list[str]:
+    """Líneas de los indicadores extendidos presentes en 'indicators' (vacía si no hay)."""
+    get = indicators.get
+    lines = []
+    if get("ema_12") is not None:
+        lines.append(f"- EMA 12 / EMA 26: {get('ema_12')} / {get('ema_26')}")
+    if get("macd") is not None:
+        lines.append(
+            f"- MACD (12, 26, 9): línea {get('macd')}, señal {get('macd_signal')}, histograma {get('macd_hist')}"
+        )
+    if get("bb_middle") is not None:
+        lines.append(
+            f"- Bandas de Bollinger (20, 2σ): superior {get('bb_upper')}, media {get('bb_middle')}, "
+            f"inferior {get('bb_lower')}, %B {get('bb_percent_b')}"
+        )
+    if get("atr") is not None:
+        lines.append(f"- ATR (14): {get('atr')}")
+    if get("obv") is not None:
+        lines.append(f"- OBV (acumulado del período): {get('obv'):.0f}")
+    if get("vwap") is not None:
+        lines.append(f"- VWAP (20 sesiones): {get('vwap')}")
+    return ["", "## Indicadores extendidos", *lines] if lines else []
+
+
+def build_context(
+    ticker: str,
+    risk_profile: str,
+    horizon: str,
+    indicators: dict,
+    headlines: list[str],
+    mode: str = "full",
+    headline_budget: Optional[int] = None,
+    count_tokens: Optional[Callable[[list[str]], list[int]]] = None,
+    months: int = 6,
+) -> str:
+    """
+    Construye el contexto estructurado para enviar al LLM.
+
+    Args:
+        ticker: Símbolo del activo.
+        risk_profile: Perfil de riesgo del usuario.
+        horizon: Horizonte de inversión.
+        indicators: Resultado de compute_indicators (ver CONTEXT_INDICATORS).
+        headlines: Titulares recientes.
+        mode: 'full' (análisis detallado) o 'fast' (respuesta breve).
+        headline_budget: Tokens para los titulares (por defecto, el del modo).
+        count_tokens: Contador de tokens del modelo para el presupuesto (ver compact_headlines).
+        months: Meses de histórico sobre los que se calcularon los indicadores.
+
+    Returns:
+        Texto del prompt.
+    """
+    if headline_budget is None:
+        headline_budget = HEADLINE_TOKEN_BUDGET.get(mode, HEADLINE_TOKEN_BUDGET["full"])
+    headlines = compact_headlines(headlines or [], headline_budget, count_tokens)
+    lines = [
+        "# Contexto para análisis de trading",
+        "",
+        f"## Activo: {ticker}",
+        f"- Perfil de riesgo del usuario: {risk_profile}",
+        f"- Horizonte de inversión: {horizon}",
+        "",
+        f"## Indicadores técnicos (últimos {months} meses)",
+        f"- Precio de cierre más reciente: {indicators.get('last_close')}",
+        f"- Media móvil 20 días: {indicators.get('ma_20')}",
+        f"- Media móvil 50 días: {indicators.get('ma_50')}",
+        f"- RSI (14): {indicators.get('rsi')}",
+        f"- Volatilidad anualizada (desv. estándar retornos): {indicators.get('volatility')}",
+        *_extended_lines(indicators),
+        "",
+        "## Titulares recientes",
+    ]
+    if headlines:
+        for h in headlines:
+            lines.append(f"- {h}")
+    else:
+        lines.append("- No se encontraron titulares recientes.")
+    lines.extend(["", "---", ""])
+    if mode == "fast":
+        lines.extend(_FAST_INSTRUCTIONS)
+        return "\n".join(lines)
+    lines.extend([
+        "Responde en español, de forma clara y estructurada. Incluye las siguientes secciones:",
+        "1. **Análisis técnico**: Explica detalladamente la relación entre medias móviles, RSI y volatilidad (y los indicadores extendidos si se incluyen). Justifica cada interpretación con base en los valores proporcionados.",
+        "2. **Sentimiento de noticias**: Clasifica el sentimiento general como POSITIVO, NEGATIVO o NEUTRAL y justifica brevemente.",
+        "3. **Escenario alcista**: Describe condiciones específicas que deberían cumplirse para que este escenario ocurra. Sé técnico y específico.",
+        "4. **Escenario bajista**: Describe riesgos concretos y señales técnicas que confirmarían este escenario.",
+        "5. **Evaluación de riesgo**: Nivel de riesgo (bajo/medio/alto) y por qué.",
+        "6. **Recomendación según perfil**: Adapta el tono y las consideraciones al perfil de riesgo indicado.",
+        "7. **Advertencia**: Incluye una advertencia explícita de que este análisis NO es asesoría financiera y que el usuario debe consultar a un profesional.",
+        "8. **Advertencia**: Para el sentimiento, primero analiza brevemente cada titular y luego sintetiza el sentimiento general justificando con ejemplos concretos.",
+        "9. **Advertencia**: Desarrolla cada sección con al menos 2–3 párrafos explicativos. No seas breve. Profundiza en la interpretación técnica y contextual."
+    ])
+    return "\n".join(lines)
@@ -4,19 +4,161 @@ Obtiene datos históricos y titulares de activos usando yfinance.
 Abstrae el acceso a datos para facilitar el cambio de proveedor en el futuro.
 """
 
-import yfinance as yf
 import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
+import news_cache
+import price_cache
+import price_store
+import telemetry
 
-def get_historical_data(ticker: str, months: int = 6) -> Optional[pd.DataFrame]:
+# Proveedor de datos (yfinance o el de repetición, ver providers.py). yfinance tarda en
+# importarse (~0,7 s), así que se carga en el primer uso (ver _yf)
+yf = None
+
+# Historia mínima que se guarda en caché por ticker, aunque se pida menos
+# (así validate_ticker y el gráfico de 6 meses comparten la misma descarga).
+CACHE_MIN_MONTHS = 6
+
+# Intervalos intradía admitidos (ver get_intraday_bars y live.py)
+INTRADAY_INTERVALS = ("1m", "5m")
+
+# Tolerancia relativa al comparar la barra solapada; si cambia más, hubo ajuste
+# por dividendos/splits y el histórico cacheado deja de ser comparable.
+_ADJUSTMENT_TOLERANCE = 1e-6
+
+
+def _yf():
+    """Proveedor de datos configurado (yfinance por defecto), cargado la primera vez que se necesita."""
+    global yf
+    if yf is None:
+        import providers
+        yf = providers.data_provider()
+    return yf
+
+
+def _normalize(data: pd.DataFrame) -> pd.DataFrame:
+    """Aplana columnas MultiIndex y deja el índice como fechas sin zona horaria."""
+    # yfinance puede devolver MultiIndex en columnas; normalizamos
+    if isinstance(data.columns, pd.MultiIndex):
+        levels = range(data.columns.nlevels)
+        level = next((i for i in levels if "Close" in data.columns.get_level_values(i)), 0)
+        data.columns = data.columns.get_level_values(level)
+    if getattr(data.index, "tz", None) is not None:
+        data.index = data.index.tz_localize(None)
+    data.index.name = "Date"
+    return data
+
+
+def _download(ticker: str, start: datetime, end: datetime) -> Optional[pd.DataFrame]:
+    """Descarga barras diarias de yfinance. None si falla; vacío si no hay barras nuevas."""
+    try:
+        data = _yf().download(ticker, start=start, end=end, progress=False, auto_adjust=True)
+    except Exception:
+        telemetry.incr("yfinance_error")
+        return None
+    if data is None:
+        return None
+    return _normalize(data)
+
+
+def _apply_delta(ticker: str, cached: pd.DataFrame, meta: dict, newer: Optional[pd.DataFrame], end: datetime) -> pd.DataFrame:
+    """
+    Fusiona en caché las barras recién descargadas desde la barra solapada.
+    Si la barra solapada cambió (ajuste por dividendos/splits), vuelve a descargar todo.
+    """
+    if newer is None:
+        return cached
+    if newer.empty:
+        price_cache.touch(ticker)
+        return cached
+    overlap = cached.index[-2] if len(cached) >= 2 else cached.index[-1]
+    if overlap in newer.index and "Close" in newer.columns:
+        before = float(cached.loc[overlap, "Close"])
+        after = float(newer.loc[overlap, "Close"])
+        if before and abs(after - before) / abs(before) > _ADJUSTMENT_TOLERANCE:
+            full = _download(ticker, datetime.fromisoformat(meta["start"]), end)
+            if full is not None and not full.empty:
+                return price_cache.save_prices(ticker, full, start=meta["start"], merge=False)
+    return price_cache.save_prices(ticker, newer[newer.index >= overlap])
+
+
+def _refresh_cache(ticker: str, start: datetime, end: datetime) -> Optional[pd.DataFrame]:
+    """
+    Asegura que la caché cubre [start, end] descargando solo lo que falta.
+    Si yfinance no responde, devuelve lo que haya en disco (modo sin conexión).
+    """
+    cached = price_cache.load_prices(ticker)
+    meta = price_cache.get_meta(ticker)
+    if cached is None or meta is None:
+        telemetry.incr("price_cache_miss")
+        data = _download(ticker, start, end)
+        if data is None or data.empty:
+            return cached
+        return price_cache.save_prices(ticker, data, start=start.date().isoformat(), merge=False)
+
+    # Historia anterior a la cubierta: se completa hacia atrás
+    if start.date().isoformat() < meta["start"]:
+        telemetry.incr("price_cache_backfill")
+        older = _download(ticker, start, cached.index[0].to_pydatetime())
+        if older is not None:
+            cached = price_cache.save_prices(ticker, older, start=start.date().isoformat())
+
+    if price_cache.is_fresh(ticker):
+        telemetry.incr("price_cache_hit")
+        return cached
+
+    # Barras nuevas: se vuelve a pedir desde la penúltima barra para detectar ajustes
+    # y actualizar la última (puede ser una sesión aún abierta).
+    telemetry.incr("price_cache_delta")
+    overlap = cached.index[-2] if len(cached) >= 2 else cached.index[-1]
+    return _apply_delta(ticker, cached, meta, _download(ticker, overlap.to_pydatetime(), end), end)
+
+
+def trim_to_months(data: pd.DataFrame, months: int, end: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Recorta un histórico a los últimos 'months' meses (mismo criterio que get_historical_data).
+    El recorte es por posición, así que conserva la vista sobre el almacén compartido.
+    
+    Args:
+        data: DataFrame indexado por fecha, ordenado.
+        months: Meses a conservar.
+        end: Fecha de referencia (por defecto, ahora).
+    
+    Returns:
+        DataFrame con las barras desde el inicio de la ventana.
+    """
+    start = (end or datetime.now()) - timedelta(days=months * 30)
+    return data.loc[pd.Timestamp(start.date()):]
+
+
+def _load_shared(ticker: str, start: datetime, meta: Optional[dict] = None) -> Optional[pd.DataFrame]:
+    """
+    Histórico desde el almacén compartido (vista sin copia) si la caché está fresca,
+    cubre 'start' y la versión publicada corresponde a la última escritura en disco.
+    """
+    meta = meta if meta is not None else price_cache.get_meta(ticker)
+    if not meta or start.date().isoformat() < meta["start"] or not price_cache.meta_is_fresh(meta):
+        return None
+    data = price_store.load(ticker, saved_at=meta.get("saved_at"))
+    if data is not None:
+        telemetry.incr("price_store_hit")
+    return data
+
+
+def get_historical_data(ticker: str, months: int = 6, use_cache: bool = True) -> Optional[pd.DataFrame]:
     """
     Obtiene datos históricos de precios para un ticker.
+    Sirve desde el almacén compartido o la caché local en disco y solo descarga las
+    barras que faltan.
     
     Args:
         ticker: Símbolo del activo (ej: AAPL).
         months: Cantidad de meses de historia (por defecto 6).
+        use_cache: Si False, descarga directamente de yfinance sin tocar la caché.
     
     Returns:
         DataFrame con columnas Open, High, Low, Close, Volume, o None si falla.
@@ -24,41 +166,295 @@ def get_historical_data(ticker: str, months: int = 6) -> Optional[pd.DataFrame]:
     try:
         end = datetime.now()
         start = end - timedelta(days=months * 30)
-        data = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=True)
-        if data.empty or len(data) < 2:
+        if use_cache:
+            cache_start = min(start, end - timedelta(days=CACHE_MIN_MONTHS * 30))
+            data = _load_shared(ticker, cache_start)
+            if data is None:
+                data = _refresh_cache(ticker, cache_start, end)
+            if data is not None:
+                data = trim_to_months(data, months, end)
+        else:
+            data = _download(ticker, start, end)
+        if data is None or data.empty or len(data) < 2:
             return None
-        # yfinance puede devolver MultiIndex en columnas; normalizamos
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
         return data
     except Exception:
         return None
 
 
-def get_news_headlines(ticker: str, max_headlines: int = 10) -> list[str]:
+def _download_chunk(tickers: list[str], start: datetime, end: datetime) -> dict[str, pd.DataFrame]:
     """
-    Obtiene titulares recientes relacionados con el ticker usando yfinance.
+    Descarga varios tickers en una sola llamada multi-símbolo de yfinance.
+    Los tickers sin datos no aparecen en el resultado; lanza excepción si falla la llamada.
+    """
+    data = _yf().download(
+        tickers, start=start, end=end, progress=False, auto_adjust=True,
+        group_by="ticker", threads=False,
+    )
+    result = {}
+    if data is None or data.empty:
+        return result
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker].copy()
+        elif len(tickers) == 1:
+            frame = data.copy()
+        else:
+            continue
+        # Cada símbolo tiene su propio calendario; se descartan filas de relleno
+        frame = frame.dropna(how="all")
+        if not frame.empty:
+            result[ticker] = _normalize(frame)
+    return result
+
+
+def _refresh_chunk(tickers: list[str], start: datetime, end: datetime) -> list[str]:
+    """
+    Refresca en caché un bloque de tickers con una única descarga.
+    Si la descarga conjunta falla, cada ticker se reintenta por separado para aislar fallos.
+
+    Returns:
+        Tickers que no se pudieron refrescar (su caché, si la hay, sigue sin actualizar).
+    """
+    cached = {t: price_cache.load_prices(t) for t in tickers}
+    metas = {t: price_cache.get_meta(t) for t in tickers}
+    cold = [t for t in tickers if cached[t] is None or metas[t] is None or start.date().isoformat() < metas[t]["start"]]
+    warm = [t for t in tickers if t not in cold]
+    chunk_start = start
+    if warm and not cold:
+        # Bloque ya cacheado: se pide desde la barra solapada más antigua
+        overlaps = [cached[t].index[-2] if len(cached[t]) >= 2 else cached[t].index[-1] for t in warm]
+        chunk_start = min(overlaps).to_pydatetime()
+    try:
+        downloaded = _download_chunk(tickers, chunk_start, end)
+    except Exception:
+        telemetry.incr("yfinance_error")
+        for ticker in tickers:
+            try:
+                _refresh_cache(ticker, start, end)
+            except Exception:
+                pass
+        return _stale(tickers)
+    for ticker in tickers:
+        try:
+            frame = downloaded.get(ticker)
+            if ticker in cold:
+                if frame is None:
+                    # Sin datos en la descarga conjunta: reintento individual
+                    _refresh_cache(ticker, start, end)
+                else:
+                    price_cache.save_prices(ticker, frame, start=start.date().isoformat(), merge=cached[ticker] is not None)
+            else:
+                _apply_delta(ticker, cached[ticker], metas[ticker], frame, end)
+        except Exception:
+            continue
+    return _stale(tickers)
+
+
+def _stale(tickers: list[str]) -> list[str]:
+    """Tickers cuya caché no quedó fresca tras un refresco (la descarga falló o no trajo datos)."""
+    index = price_cache.all_meta()
+    return [t for t in tickers if not price_cache.meta_is_fresh(index.get(t))]
+
+
+def get_historical_data_many(
+    tickers: list[str],
+    months: int = 6,
+    chunk_size: int = 25,
+    max_workers: int = 4,
+    errors: Optional[list[str]] = None,
+) -> dict[str, Optional[pd.DataFrame]]:
+    """
+    Obtiene datos históricos de muchos tickers con descargas multi-símbolo por bloques.
+    Los tickers ya frescos en caché no generan tráfico; el resto se descarga en bloques
+    de chunk_size símbolos, con un pool acotado de hilos. Un fallo en un ticker no afecta
+    a los demás.
     
     Args:
-        ticker: Símbolo del activo.
-        max_headlines: Número máximo de titulares a devolver.
+        tickers: Símbolos de los activos.
+        months: Cantidad de meses de historia (por defecto 6).
+        chunk_size: Símbolos por llamada a yf.download.
+        max_workers: Máximo de bloques descargándose a la vez.
+        errors: Lista opcional donde se añaden los tickers que no se pudieron refrescar
+            (pueden tener datos, pero son los de la caché anterior).
     
     Returns:
-        Lista de cadenas con titulares; vacía si no hay datos o falla.
+        Diccionario ticker -> DataFrame (Open, High, Low, Close, Volume) o None si no hay datos.
+    """
+    end = datetime.now()
+    start = end - timedelta(days=months * 30)
+    cache_start = min(start, end - timedelta(days=CACHE_MIN_MONTHS * 30))
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+
+    index = price_cache.all_meta()
+    pending = []
+    for ticker in symbols:
+        meta = index.get(ticker)
+        needs_backfill = meta is not None and cache_start.date().isoformat() < meta["start"]
+        if meta is None or needs_backfill or not price_cache.meta_is_fresh(meta):
+            pending.append(ticker)
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+            futures = [(chunk, pool.submit(_refresh_chunk, chunk, cache_start, end)) for chunk in chunks]
+            for chunk, future in futures:
+                try:
+                    failed = future.result()
+                except Exception:
+                    failed = chunk
+                if errors is not None:
+                    errors.extend(failed)
+
+    if pending:
+        index = price_cache.all_meta()
+    result = {}
+    for ticker in symbols:
+        data = _load_shared(ticker, cache_start, index.get(ticker, {}))
+        if data is None:
+            data = price_cache.load_prices(ticker)
+        if data is not None:
+            data = trim_to_months(data, months, end)
+        result[ticker] = data if data is not None and len(data) >= 2 else None
+    return result
+
+
+def align_panel(data_by_ticker: dict[str, Optional[pd.DataFrame]], column: str = "Close") -> pd.DataFrame:
+    """
+    Alinea una columna de varios tickers en un único panel (fechas x tickers).
+    
+    Args:
+        data_by_ticker: Resultado de get_historical_data_many.
+        column: Columna a extraer (por defecto 'Close').
+    
+    Returns:
+        DataFrame indexado por fecha con un ticker por columna; NaN donde falten barras.
+    """
+    series = {
+        ticker: data[column]
+        for ticker, data in data_by_ticker.items()
+        if data is not None and column in data.columns
+    }
+    if not series:
+        return pd.DataFrame()
+    return pd.DataFrame(series).sort_index()
+
+
+def get_intraday_bars(ticker: str, interval: str = "5m", since: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+    """
+    Barras intradía recientes de un ticker, sin caché en disco (ver live.py).
+
+    Args:
+        ticker: Símbolo del activo.
+        interval: Intervalo de las barras ('1m' o '5m').
+        since: Si se indica, solo se piden las barras desde esa marca de tiempo (incluida);
+            si no, las de la última sesión.
+
+    Returns:
+        DataFrame OHLCV indexado por fecha y hora de la bolsa (sin zona horaria), vacío si
+        no hay barras, o None si la consulta falla.
     """
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError(f"Intervalo intradía no soportado: {interval}")
+    window = {"start": since} if since is not None else {"period": "1d"}
     try:
-        obj = yf.Ticker(ticker)
+        data = _yf().download(ticker.upper(), interval=interval, progress=False, auto_adjust=True, **window)
+    except Exception:
+        telemetry.incr("yfinance_error")
+        return None
+    if data is None:
+        return None
+    return _normalize(data)
+
+
+def _fetch_news(ticker: str) -> Optional[list[str]]:
+    """Descarga los titulares de yfinance. None si la consulta falla."""
+    try:
+        obj = _yf().Ticker(ticker)
         news = obj.news
         if not news:
             return []
         headlines = []
-        for item in news[:max_headlines]:
+        for item in news:
             title = item.get("title") or item.get("link", "")
             if title and isinstance(title, str):
                 headlines.append(title)
         return headlines
     except Exception:
-        return []
+        telemetry.incr("yfinance_news_error")
+        return None
+
+
+_news_refreshing: set[str] = set()
+_news_refreshing_lock = threading.Lock()
+
+
+def refresh_news(ticker: str) -> Optional[list[str]]:
+    """
+    Descarga y guarda en caché los titulares de un ticker, ignorando la frescura.
+    
+    Args:
+        ticker: Símbolo del activo.
+    
+    Returns:
+        Titulares guardados, o None si la consulta a yfinance falla.
+    """
+    headlines = _fetch_news(ticker)
+    if headlines is None:
+        return None
+    return news_cache.save(ticker, headlines)
+
+
+def _refresh_news_background(ticker: str) -> None:
+    """Refresca los titulares en un hilo de fondo, como mucho uno a la vez por ticker."""
+    with _news_refreshing_lock:
+        if ticker in _news_refreshing:
+            return
+        _news_refreshing.add(ticker)
+
+    def worker():
+        try:
+            refresh_news(ticker)
+        finally:
+            with _news_refreshing_lock:
+                _news_refreshing.discard(ticker)
+
+    threading.Thread(target=worker, name=f"news-refresh-{ticker}", daemon=True).start()
+
+
+def get_news_headlines(ticker: str, max_headlines: int = 10) -> list[str]:
+    """
+    Obtiene titulares recientes relacionados con el ticker usando yfinance.
+    Los titulares se cachean en disco: dentro de la ventana de frescura no se consulta
+    yfinance; si han caducado hace poco, se devuelven los cacheados y se refrescan en
+    segundo plano.
+    
+    Args:
+        ticker: Símbolo del activo.
+        max_headlines: Número máximo de titulares a devolver.
+    
+    Returns:
+        Lista de cadenas con titulares; vacía si no hay datos o falla.
+    """
+    ticker = ticker.strip().upper()
+    entry = news_cache.load(ticker)
+    if entry is not None:
+        entry_age = news_cache.age(entry)
+        if entry_age < news_cache.FRESH_SECONDS:
+            telemetry.incr("news_cache_hit")
+            return entry["headlines"][:max_headlines]
+        if entry_age < news_cache.MAX_STALE_SECONDS:
+            telemetry.incr("news_cache_stale")
+            _refresh_news_background(ticker)
+            return entry["headlines"][:max_headlines]
+    telemetry.incr("news_cache_miss")
+    headlines = refresh_news(ticker)
+    if headlines is None:
+        # Sin conexión: mejor titulares antiguos que ninguno
+        return entry["headlines"][:max_headlines] if entry is not None else []
+    return headlines[:max_headlines]
 
 
 def validate_ticker(ticker: str) -> bool:
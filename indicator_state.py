@@ -0,0 +1,181 @@
+"""
+indicator_state.py
+Estado incremental de indicadores por ticker. Permite añadir un nuevo cierre en
+tiempo constante (sumas móviles para las SMA, ganancias/pérdidas móviles para el RSI
+y sumas móviles de los retornos para la volatilidad) sin volver a leer el histórico.
+Las definiciones coinciden con las de indicators.py sobre las mismas ventanas: la
+volatilidad usa los últimos VOLATILITY_WINDOW retornos, como compute_all_indicators
+sobre los ~6 meses de histórico que usa la app.
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import MA_DIGITS
+
+SMA_WINDOWS = (20, 50)
+RSI_PERIOD = 14
+# Retornos de la ventana de volatilidad (~6 meses de sesiones, como la app)
+VOLATILITY_WINDOW = 125
+_RING_SIZE = max(SMA_WINDOWS)
+
+
+class IndicatorState:
+    """
+    Estado compacto de indicadores de un ticker.
+    Guarda solo los últimos cierres necesarios (anillo de tamaño fijo) y acumuladores,
+    por lo que update() cuesta O(1) y el estado ocupa lo mismo sin importar la historia.
+    """
+
+    __slots__ = (
+        "closes", "pos", "count", "sums",
+        "deltas", "delta_pos", "gain_sum", "loss_sum",
+        "returns", "ret_pos", "n_returns", "ret_sum", "ret_sq",
+    )
+
+    def __init__(self):
+        # Anillo de los últimos cierres y sumas de cada ventana SMA
+        self.closes = [0.0] * _RING_SIZE
+        self.pos = 0
+        self.count = 0
+        self.sums = [0.0] * len(SMA_WINDOWS)
+        # Anillo de las últimas diferencias para el RSI
+        self.deltas = [0.0] * RSI_PERIOD
+        self.delta_pos = 0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        # Anillo de los últimos retornos simples, con su suma y suma de cuadrados
+        self.returns = [0.0] * VOLATILITY_WINDOW
+        self.ret_pos = 0
+        self.n_returns = 0
+        self.ret_sum = 0.0
+        self.ret_sq = 0.0
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "IndicatorState":
+        """
+        Inicializa el estado recorriendo una serie de cierres una sola vez.
+
+        Args:
+            series: Serie de precios de cierre.
+
+        Returns:
+            IndicatorState equivalente a haber llamado update() con cada cierre.
+        """
+        state = cls()
+        for value in series.dropna().to_numpy(dtype=float):
+            state.update(float(value))
+        return state
+
+    def _close_back(self, k: int) -> float:
+        """Cierre de hace k barras (k=1 es el último añadido)."""
+        return self.closes[(self.pos - k) % _RING_SIZE]
+
+    def update(self, close: float) -> None:
+        """
+        Añade un nuevo cierre y actualiza todos los indicadores en tiempo constante.
+
+        Args:
+            close: Precio de cierre de la nueva barra.
+        """
+        close = float(close)
+        if self.count:
+            prev = self._close_back(1)
+            delta = close - prev
+            # RSI: sale la diferencia más antigua de la ventana si ya está llena
+            if self.count > RSI_PERIOD:
+                old = self.deltas[self.delta_pos]
+                self.gain_sum -= max(old, 0.0)
+                self.loss_sum -= max(-old, 0.0)
+            self.deltas[self.delta_pos] = delta
+            self.delta_pos = (self.delta_pos + 1) % RSI_PERIOD
+            self.gain_sum += max(delta, 0.0)
+            self.loss_sum += max(-delta, 0.0)
+            # Volatilidad: sale el retorno más antiguo de la ventana si ya está llena
+            ret = delta / prev if prev else 0.0
+            if self.n_returns == VOLATILITY_WINDOW:
+                old = self.returns[self.ret_pos]
+                self.ret_sum -= old
+                self.ret_sq -= old * old
+            else:
+                self.n_returns += 1
+            self.returns[self.ret_pos] = ret
+            self.ret_pos = (self.ret_pos + 1) % VOLATILITY_WINDOW
+            self.ret_sum += ret
+            self.ret_sq += ret * ret
+            if self.ret_pos == 0:
+                self._resync_returns()
+
+        for i, window in enumerate(SMA_WINDOWS):
+            if self.count >= window:
+                self.sums[i] -= self._close_back(window)
+            self.sums[i] += close
+        self.closes[self.pos] = close
+        self.pos = (self.pos + 1) % _RING_SIZE
+        self.count += 1
+
+        # Cada vuelta completa del anillo se recalculan las sumas para no acumular error
+        if self.pos == 0:
+            self._resync()
+
+    def _resync(self) -> None:
+        """Recalcula las sumas móviles desde los anillos (coste amortizado O(1))."""
+        for i, window in enumerate(SMA_WINDOWS):
+            n = min(window, self.count)
+            self.sums[i] = math.fsum(self._close_back(k) for k in range(1, n + 1))
+        n = min(RSI_PERIOD, max(self.count - 1, 0))
+        recent = [self.deltas[(self.delta_pos - k) % RSI_PERIOD] for k in range(1, n + 1)]
+        self.gain_sum = math.fsum(max(d, 0.0) for d in recent)
+        self.loss_sum = math.fsum(max(-d, 0.0) for d in recent)
+
+    def _resync_returns(self) -> None:
+        """Recalcula las sumas de retornos desde su anillo en cada vuelta (coste amortizado O(1))."""
+        recent = [self.returns[(self.ret_pos - k) % VOLATILITY_WINDOW] for k in range(1, self.n_returns + 1)]
+        self.ret_sum = math.fsum(recent)
+        self.ret_sq = math.fsum(r * r for r in recent)
+
+    def moving_average(self, window: int) -> Optional[float]:
+        """Media móvil simple de la ventana indicada (debe estar en SMA_WINDOWS)."""
+        i = SMA_WINDOWS.index(window)
+        if self.count < window:
+            return None
+        return float(np.round(self.sums[i] / window, MA_DIGITS))
+
+    def rsi(self) -> Optional[float]:
+        """RSI simple del último período, con la misma definición que rsi_simple."""
+        if self.count < RSI_PERIOD + 1:
+            return None
+        avg_gain = self.gain_sum / RSI_PERIOD
+        avg_loss = self.loss_sum / RSI_PERIOD
+        if avg_loss <= 0:
+            return 100.0
+        rs = avg_gain / avg_loss
+        return float(round(100.0 - (100.0 / (1.0 + rs)), 2))
+
+    def volatility(self, annualize: bool = True) -> Optional[float]:
+        """Desviación estándar muestral de los retornos de la ventana, anualizada por defecto."""
+        n = self.n_returns
+        if n < 2:
+            return None
+        vol = math.sqrt(max(self.ret_sq - self.ret_sum * self.ret_sum / n, 0.0) / (n - 1))
+        if annualize:
+            vol = vol * math.sqrt(252)
+        return float(round(vol, 4))
+
+    def snapshot(self) -> dict:
+        """
+        Devuelve los indicadores actuales con el mismo formato que compute_all_indicators.
+
+        Returns:
+            Diccionario con ma_20, ma_50, rsi, volatility y last_close.
+        """
+        return {
+            "ma_20": self.moving_average(20),
+            "ma_50": self.moving_average(50),
+            "rsi": self.rsi(),
+            "volatility": self.volatility(True),
+            "last_close": self._close_back(1) if self.count else None,
+        }
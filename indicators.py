@@ -1,11 +1,31 @@
 """
 indicators.py
 Cálculo de indicadores técnicos a partir de series de precios.
+Además de los indicadores básicos de cierre, incluye un registro de indicadores
+(INDICATORS) que se calculan juntos sobre los arrays OHLCV, sin objetos de pandas
+intermedios, para que cada consumidor pida solo los que necesita.
 """
 
 import pandas as pd
 import numpy as np
-from typing import Optional
+from functools import cached_property
+from typing import Callable, NamedTuple, Optional
+
+# Parámetros de los indicadores extendidos
+EMA_SPANS = (12, 26)
+MACD_SIGNAL_SPAN = 9
+BOLLINGER_WINDOW = 20
+BOLLINGER_STD = 2.0
+ATR_PERIOD = 14
+VWAP_WINDOW = 20
+
+# Barras por bloque en la media exponencial (ver ewm)
+EWM_BLOCK = 256
+
+# Decimales de las medias móviles. Los valores van tal cual al contexto del LLM (y a su
+# clave de caché), así que se redondean para que no dependan de cómo se calculan:
+# por ticker, en panel o en el motor incremental difieren en unos pocos ulp.
+MA_DIGITS = 4
 
 
 def moving_average(series: pd.Series, window: int) -> Optional[float]:
@@ -21,7 +41,7 @@ def moving_average(series: pd.Series, window: int) -> Optional[float]:
     """
     if series is None or len(series) < window:
         return None
-    return float(series.rolling(window=window).mean().iloc[-1])
+    return float(np.round(series.rolling(window=window).mean().iloc[-1], MA_DIGITS))
 
 
 def rsi_simple(series: pd.Series, period: int = 14) -> Optional[float]:
@@ -72,6 +92,249 @@ def volatility_returns(series: pd.Series, annualize: bool = True) -> Optional[fl
     return float(round(vol, 4))
 
 
+def ewm(values: np.ndarray, alpha: float, block: int = EWM_BLOCK) -> np.ndarray:
+    """
+    Media exponencial recursiva y[t] = alpha * x[t] + (1 - alpha) * y[t-1], con y[0] = x[0]
+    (como pandas ewm(adjust=False)), sin bucle por barra. Dentro de cada bloque la
+    recursión se resuelve como una suma acumulada ponderada y solo el último valor pasa
+    al bloque siguiente; así los pesos (1 - alpha)^-k no desbordan en series largas.
+
+    Args:
+        values: Array 1-D, o 2-D con una serie por fila; sin NaN.
+        alpha: Factor de suavizado en (0, 1].
+        block: Barras por bloque.
+
+    Returns:
+        Array de la misma forma con la media de cada barra.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    decay = 1.0 - alpha
+    if x.shape[-1] == 0 or decay <= 0.0:
+        return x.copy()
+    # El bloque se acorta si hace falta para que decay^-block no pase de ~1e150
+    block = int(max(1, min(block, 345.0 / -np.log(decay))))
+    steps = np.arange(block)
+    grow, shrink, carry = decay ** -steps, decay ** steps, decay ** (steps + 1)
+    out = np.empty_like(x)
+    prev = x[..., :1]
+    for start in range(0, x.shape[-1], block):
+        chunk = x[..., start:start + block]
+        m = chunk.shape[-1]
+        acc = np.cumsum(chunk * grow[:m], axis=-1) * shrink[:m]
+        out[..., start:start + m] = alpha * acc + carry[:m] * prev
+        prev = out[..., start + m - 1:start + m]
+    return out
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Media móvil exponencial de 'span' períodos (alpha = 2 / (span + 1))."""
+    return ewm(values, 2.0 / (span + 1.0))
+
+
+def _last_mean(values: np.ndarray, window: int) -> Optional[float]:
+    """Media de los últimos 'window' valores, o None si no hay suficientes."""
+    if len(values) < window:
+        return None
+    return float(values[-window:].mean())
+
+
+def _rounded(value, digits: int = 4) -> Optional[float]:
+    """Redondea un valor numérico; None si no es finito."""
+    if value is None or not np.isfinite(value):
+        return None
+    return float(round(float(value), digits))
+
+
+class Bars:
+    """
+    Arrays OHLCV de un ticker (barras con cierre válido) y resultados intermedios
+    compartidos entre indicadores, que se calculan una sola vez y solo si se piden.
+    """
+
+    def __init__(self, prices: pd.DataFrame):
+        close = prices["Close"] if "Close" in prices.columns else prices.iloc[:, 0]
+        close = close.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(close)
+        self.close = close[valid]
+        self.columns = {"Close": self.close}
+        for column in ("Open", "High", "Low", "Volume"):
+            if column in prices.columns:
+                self.columns[column] = prices[column].to_numpy(dtype=np.float64)[valid]
+        self._emas: dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def has(self, columns: tuple[str, ...]) -> bool:
+        """True si están todas las columnas indicadas."""
+        return all(column in self.columns for column in columns)
+
+    @cached_property
+    def delta(self) -> np.ndarray:
+        """Diferencias entre cierres consecutivos."""
+        return np.diff(self.close)
+
+    def ema(self, span: int) -> np.ndarray:
+        """Serie EMA de cierres de 'span' períodos (compartida entre EMA y MACD)."""
+        if span not in self._emas:
+            self._emas[span] = ema(self.close, span)
+        return self._emas[span]
+
+
+class Indicator(NamedTuple):
+    """Entrada del registro: función de cálculo, columnas que necesita y claves que devuelve."""
+
+    compute: Callable[[Bars], dict]
+    columns: tuple[str, ...]
+    keys: tuple[str, ...]
+
+
+# Registro de indicadores: nombre -> Indicator
+INDICATORS: dict[str, Indicator] = {}
+
+
+def indicator(name: str, keys: tuple[str, ...], columns: tuple[str, ...] = ("Close",)):
+    """Registra una función que calcula un indicador a partir de un objeto Bars."""
+    def register(compute):
+        INDICATORS[name] = Indicator(compute, columns, keys)
+        return compute
+    return register
+
+
+@indicator("sma", ("ma_20", "ma_50"))
+def _sma(bars: Bars) -> dict:
+    means = {"ma_20": _last_mean(bars.close, 20), "ma_50": _last_mean(bars.close, 50)}
+    return {key: None if value is None else float(np.round(value, MA_DIGITS)) for key, value in means.items()}
+
+
+@indicator("rsi", ("rsi",))
+def _rsi(bars: Bars) -> dict:
+    period = 14
+    if len(bars) < period + 1:
+        return {"rsi": None}
+    recent = bars.delta[-period:]
+    avg_gain = np.maximum(recent, 0.0).mean()
+    avg_loss = np.maximum(-recent, 0.0).mean()
+    if avg_loss == 0:
+        return {"rsi": 100.0}
+    return {"rsi": float(round(100.0 - (100.0 / (1.0 + avg_gain / avg_loss)), 2))}
+
+
+@indicator("volatility", ("volatility",))
+def _volatility(bars: Bars) -> dict:
+    if len(bars) < 3:
+        return {"volatility": None}
+    returns = bars.delta / bars.close[:-1]
+    return {"volatility": float(round(returns.std(ddof=1) * np.sqrt(252), 4))}
+
+
+@indicator("last_close", ("last_close",))
+def _last_close(bars: Bars) -> dict:
+    return {"last_close": float(bars.close[-1])}
+
+
+@indicator("ema", tuple(f"ema_{span}" for span in EMA_SPANS))
+def _ema(bars: Bars) -> dict:
+    return {f"ema_{span}": _rounded(bars.ema(span)[-1]) for span in EMA_SPANS}
+
+
+@indicator("macd", ("macd", "macd_signal", "macd_hist"))
+def _macd(bars: Bars) -> dict:
+    fast, slow = EMA_SPANS
+    if len(bars) < slow:
+        return {"macd": None, "macd_signal": None, "macd_hist": None}
+    line = bars.ema(fast) - bars.ema(slow)
+    signal = ema(line, MACD_SIGNAL_SPAN)[-1]
+    return {
+        "macd": _rounded(line[-1]),
+        "macd_signal": _rounded(signal),
+        "macd_hist": _rounded(line[-1] - signal),
+    }
+
+
+@indicator("bollinger", ("bb_upper", "bb_middle", "bb_lower", "bb_percent_b"))
+def _bollinger(bars: Bars) -> dict:
+    if len(bars) < BOLLINGER_WINDOW:
+        return {"bb_upper": None, "bb_middle": None, "bb_lower": None, "bb_percent_b": None}
+    recent = bars.close[-BOLLINGER_WINDOW:]
+    middle = recent.mean()
+    band = BOLLINGER_STD * recent.std()
+    upper, lower = middle + band, middle - band
+    return {
+        "bb_upper": _rounded(upper),
+        "bb_middle": _rounded(middle),
+        "bb_lower": _rounded(lower),
+        "bb_percent_b": _rounded((bars.close[-1] - lower) / (upper - lower)) if upper > lower else None,
+    }
+
+
+@indicator("atr", ("atr",), columns=("High", "Low", "Close"))
+def _atr(bars: Bars) -> dict:
+    if len(bars) < ATR_PERIOD + 1:
+        return {"atr": None}
+    high, low, close = bars.columns["High"], bars.columns["Low"], bars.close
+    prev = np.concatenate((close[:1], close[:-1]))
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev), np.abs(low - prev)))
+    # Suavizado de Wilder: media exponencial con alpha = 1 / período
+    return {"atr": _rounded(ewm(true_range, 1.0 / ATR_PERIOD)[-1])}
+
+
+@indicator("obv", ("obv",), columns=("Close", "Volume"))
+def _obv(bars: Bars) -> dict:
+    if len(bars) < 2:
+        return {"obv": None}
+    return {"obv": _rounded(np.sign(bars.delta) @ bars.columns["Volume"][1:], 0)}
+
+
+@indicator("vwap", ("vwap",), columns=("High", "Low", "Close", "Volume"))
+def _vwap(bars: Bars) -> dict:
+    if len(bars) < VWAP_WINDOW:
+        return {"vwap": None}
+    window = slice(-VWAP_WINDOW, None)
+    typical = (bars.columns["High"][window] + bars.columns["Low"][window] + bars.close[window]) / 3.0
+    volume = bars.columns["Volume"][window]
+    total = volume.sum()
+    return {"vwap": _rounded(typical @ volume / total) if total > 0 else None}
+
+
+# Grupos de indicadores del registro
+BASE_INDICATORS = ("sma", "rsi", "volatility", "last_close")
+EXTENDED_INDICATORS = ("ema", "macd", "bollinger", "atr", "obv", "vwap")
+
+
+def compute_indicators(prices: pd.DataFrame, names: Optional[tuple[str, ...]] = None) -> dict:
+    """
+    Calcula los indicadores pedidos del registro en una sola pasada sobre los arrays OHLCV.
+    Los resultados intermedios (diferencias, EMAs) se comparten entre indicadores.
+
+    Args:
+        prices: DataFrame con columna 'Close' y, según el indicador, High, Low y Volume.
+        names: Nombres del registro (por defecto, todos).
+
+    Returns:
+        Diccionario plano con las claves de cada indicador pedido; None donde no hay
+        datos o columnas suficientes.
+
+    Raises:
+        ValueError: si algún nombre no está en el registro.
+    """
+    names = tuple(INDICATORS) if names is None else tuple(names)
+    unknown = [name for name in names if name not in INDICATORS]
+    if unknown:
+        raise ValueError(f"Indicadores desconocidos: {', '.join(unknown)}")
+    result = {key: None for name in names for key in INDICATORS[name].keys}
+    if prices is None or prices.empty:
+        return result
+    bars = Bars(prices)
+    if not len(bars):
+        return result
+    for name in names:
+        spec = INDICATORS[name]
+        if bars.has(spec.columns):
+            result.update(spec.compute(bars))
+    return result
+
+
 def compute_all_indicators(prices: pd.DataFrame) -> dict:
     """
     Calcula todos los indicadores requeridos a partir del DataFrame de precios.
@@ -83,19 +346,118 @@ def compute_all_indicators(prices: pd.DataFrame) -> dict:
     Returns:
         Diccionario con ma_20, ma_50, rsi, volatility y último precio.
     """
-    result = {
-        "ma_20": None,
-        "ma_50": None,
-        "rsi": None,
-        "volatility": None,
-        "last_close": None,
-    }
-    if prices is None or prices.empty:
-        return result
-    close = prices["Close"] if "Close" in prices.columns else prices.iloc[:, 0]
-    result["last_close"] = float(close.iloc[-1])
-    result["ma_20"] = moving_average(close, 20)
-    result["ma_50"] = moving_average(close, 50)
-    result["rsi"] = rsi_simple(close, 14)
-    result["volatility"] = volatility_returns(close, True)
+    return compute_indicators(prices, BASE_INDICATORS)
+
+
+def close_panel(prices_by_ticker: dict[str, Optional[pd.DataFrame]]) -> tuple[list[str], np.ndarray]:
+    """
+    Construye un panel 2-D de cierres (tickers x días) alineado a la derecha.
+    Cada fila contiene la serie completa del ticker, con NaN de relleno a la izquierda,
+    de modo que la última columna es siempre el último cierre de cada ticker.
+    
+    Args:
+        prices_by_ticker: Diccionario ticker -> DataFrame de precios (o None).
+    
+    Returns:
+        Tupla (lista de tickers, array float64 de forma (tickers, días)).
+    """
+    tickers = list(prices_by_ticker)
+    closes = []
+    for ticker in tickers:
+        prices = prices_by_ticker[ticker]
+        if prices is None or prices.empty:
+            closes.append(np.empty(0))
+            continue
+        close = prices["Close"] if "Close" in prices.columns else prices.iloc[:, 0]
+        closes.append(close.to_numpy(dtype=np.float64))
+    days = max((len(c) for c in closes), default=0)
+    panel = np.full((len(tickers), days), np.nan)
+    for row, close in enumerate(closes):
+        if len(close):
+            panel[row, days - len(close):] = close
+    return tickers, panel
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Suma de las últimas 'window' columnas usando una suma acumulada sobre el bloque final."""
+    block = values[:, -(window + 1):] if values.shape[1] > window else values
+    csum = np.cumsum(block, axis=1)
+    if block.shape[1] > window:
+        return csum[:, -1] - csum[:, -(window + 1)]
+    return csum[:, -1]
+
+
+def compute_panel_indicators(closes: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Calcula MA20, MA50, RSI(14) y volatilidad anualizada para todos los tickers a la vez.
+    Mismas definiciones que las funciones por ticker, en una sola pasada vectorizada.
+    
+    Args:
+        closes: Array (tickers x días) de cierres, con NaN solo como relleno a la izquierda
+            (ver close_panel).
+    
+    Returns:
+        Diccionario de arrays de longitud 'tickers' con last_close, ma_20, ma_50, rsi y
+        volatility; NaN donde no hay datos suficientes.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_tickers, n_days = closes.shape
+    valid = ~np.isnan(closes)
+    counts = valid.sum(axis=1)
+    filled = np.where(valid, closes, 0.0)
+    nan = np.full(n_tickers, np.nan)
+
+    result = {"last_close": closes[:, -1].copy() if n_days else nan.copy()}
+
+    for name, window in (("ma_20", 20), ("ma_50", 50)):
+        if n_days >= window:
+            ma = np.round(_window_sum(filled, window) / window, MA_DIGITS)
+            result[name] = np.where(counts >= window, ma, np.nan)
+        else:
+            result[name] = nan.copy()
+
+    # Retornos y diferencias solo donde ambos extremos son válidos
+    pair_valid = valid[:, 1:] & valid[:, :-1]
+    delta = np.where(pair_valid, filled[:, 1:] - filled[:, :-1], 0.0)
+
+    period = 14
+    if n_days >= period + 1:
+        avg_gain = _window_sum(np.maximum(delta, 0.0), period) / period
+        avg_loss = _window_sum(np.maximum(-delta, 0.0), period) / period
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+        rsi = np.where(avg_loss == 0, 100.0, np.round(rsi, 2))
+        result["rsi"] = np.where(counts >= period + 1, rsi, np.nan)
+    else:
+        result["rsi"] = nan.copy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(pair_valid, delta / np.where(pair_valid, filled[:, :-1], 1.0), 0.0)
+        n_returns = pair_valid.sum(axis=1)
+        mean = returns.sum(axis=1) / n_returns
+        sq_dev = np.where(pair_valid, (returns - mean[:, None]) ** 2, 0.0)
+        vol = np.sqrt(sq_dev.sum(axis=1) / (n_returns - 1)) * np.sqrt(252)
+    result["volatility"] = np.where(n_returns >= 2, np.round(vol, 4), np.nan)
+    return result
+
+
+def compute_all_indicators_many(prices_by_ticker: dict[str, Optional[pd.DataFrame]]) -> dict[str, dict]:
+    """
+    Equivalente a compute_all_indicators para muchos tickers, usando el motor de panel.
+    
+    Args:
+        prices_by_ticker: Diccionario ticker -> DataFrame de precios (o None).
+    
+    Returns:
+        Diccionario ticker -> dict con ma_20, ma_50, rsi, volatility y last_close
+        (None donde no hay datos suficientes).
+    """
+    tickers, panel = close_panel(prices_by_ticker)
+    values = compute_panel_indicators(panel) if tickers else {}
+    result = {}
+    for row, ticker in enumerate(tickers):
+        result[ticker] = {
+            key: (None if np.isnan(values[key][row]) else float(values[key][row]))
+            for key in ("ma_20", "ma_50", "rsi", "volatility", "last_close")
+        }
     return result
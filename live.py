@@ -0,0 +1,179 @@
+"""
+live.py
+Modo intradía en vivo. Por cada ticker e intervalo se mantiene un feed con las últimas
+barras en un búfer circular de tamaño fijo y el estado incremental de indicadores
+(ver indicator_state.py). Cada sondeo pide a yfinance solo las barras posteriores a la
+última cerrada y actualiza los indicadores barra a barra, así que el coste de un refresco
+(red, CPU y memoria) no crece con el tiempo que lleve abierta la página. Los feeds se
+comparten entre sesiones y se sondean como mucho una vez por intervalo de refresco.
+"""
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+from data_fetcher import INTRADAY_INTERVALS, get_intraday_bars
+from indicator_state import IndicatorState
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Barras que se conservan por feed (una sesión completa de barras de 1 minuto)
+LIVE_CAPACITY = 390
+
+# Segundos entre refrescos de la sección en vivo según el intervalo
+REFRESH_SECONDS = {"1m": 15, "5m": 60}
+
+_feeds: dict[tuple[str, str], "LiveFeed"] = {}
+_feeds_lock = threading.Lock()
+
+
+class RingBuffer:
+    """Últimas 'capacity' barras OHLCV en arrays NumPy preasignados."""
+
+    __slots__ = ("capacity", "times", "values", "start", "size")
+
+    def __init__(self, capacity: int = LIVE_CAPACITY):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype="datetime64[ns]")
+        self.values = np.full((capacity, len(COLUMNS)), np.nan)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, when: np.datetime64, row: np.ndarray) -> None:
+        """Añade una barra; si el búfer está lleno, sustituye a la más antigua."""
+        slot = (self.start + self.size) % self.capacity
+        self.times[slot] = when
+        self.values[slot] = row
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def last_time(self) -> Optional[pd.Timestamp]:
+        """Marca de tiempo de la última barra, o None si está vacío."""
+        if not self.size:
+            return None
+        return pd.Timestamp(self.times[(self.start + self.size - 1) % self.capacity])
+
+    def to_frame(self) -> pd.DataFrame:
+        """Barras en orden cronológico (copia, como mucho 'capacity' filas)."""
+        order = (self.start + np.arange(self.size)) % self.capacity
+        return pd.DataFrame(self.values[order], index=pd.DatetimeIndex(self.times[order], name="Date"), columns=COLUMNS)
+
+
+class LiveFeed:
+    """
+    Barras intradía recientes de un ticker e intervalo con sus indicadores incrementales.
+    La última barra recibida puede estar aún en formación: se muestra su precio, pero
+    solo entra en el búfer y en los indicadores cuando llega la siguiente.
+    Es seguro entre hilos, para poder compartirlo entre sesiones.
+    """
+
+    def __init__(self, ticker: str, interval: str, capacity: int = LIVE_CAPACITY):
+        if interval not in INTRADAY_INTERVALS:
+            raise ValueError(f"Intervalo intradía no soportado: {interval}")
+        self.ticker = ticker.upper()
+        self.interval = interval
+        self.bars = RingBuffer(capacity)
+        self.state = IndicatorState()
+        # Barra en formación: (marca de tiempo, valores OHLCV)
+        self.pending: Optional[tuple[np.datetime64, np.ndarray]] = None
+        self.polled_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def poll(self, min_interval: Optional[float] = None) -> int:
+        """
+        Pide las barras nuevas si ha pasado el intervalo mínimo desde el último sondeo.
+
+        Args:
+            min_interval: Segundos mínimos entre sondeos (por defecto, REFRESH_SECONDS).
+
+        Returns:
+            Número de barras cerradas añadidas.
+        """
+        if min_interval is None:
+            min_interval = REFRESH_SECONDS[self.interval]
+        # Quien llegue mientras otro sondea espera y reutiliza su resultado
+        with self._lock:
+            now = time.monotonic()
+            if self.polled_at is not None and now - self.polled_at < min_interval:
+                return 0
+            self.polled_at = now
+            with telemetry.span("live_poll"):
+                data = get_intraday_bars(self.ticker, self.interval, since=self.bars.last_time())
+            if data is None or data.empty:
+                return 0
+            added = self._ingest(data)
+        telemetry.incr("live_bars", added)
+        return added
+
+    def _ingest(self, data: pd.DataFrame) -> int:
+        """Incorpora las barras posteriores a la última cerrada; la última queda pendiente."""
+        times = data.index.values.astype("datetime64[ns]")
+        values = data.reindex(columns=COLUMNS).to_numpy(dtype=np.float64)
+        last = self.bars.last_time()
+        if last is not None:
+            newer = times > last.to_datetime64()
+            times, values = times[newer], values[newer]
+        if not len(times):
+            return 0
+        for when, row in zip(times[:-1], values[:-1]):
+            self.bars.append(when, row)
+            if not np.isnan(row[3]):
+                self.state.update(row[3])
+        self.pending = (times[-1], values[-1])
+        return len(times) - 1
+
+    def snapshot(self) -> dict:
+        """
+        Indicadores de las barras cerradas y último precio (incluida la barra en formación).
+
+        Returns:
+            Diccionario con ma_20, ma_50, rsi, last_close, last_time y bars.
+        """
+        with self._lock:
+            values = self.state.snapshot()
+            # La volatilidad de IndicatorState se anualiza con sesiones diarias
+            values.pop("volatility", None)
+            last_time = self.bars.last_time()
+            if self.pending is not None and not np.isnan(self.pending[1][3]):
+                values["last_close"] = float(self.pending[1][3])
+                last_time = pd.Timestamp(self.pending[0])
+            values["last_time"] = last_time
+            values["bars"] = len(self.bars)
+        return values
+
+    def frame(self) -> pd.DataFrame:
+        """Barras del búfer más la que está en formación, en orden cronológico."""
+        with self._lock:
+            data = self.bars.to_frame()
+            if self.pending is not None:
+                pending = pd.DataFrame([self.pending[1]], index=pd.DatetimeIndex([self.pending[0]], name="Date"), columns=COLUMNS)
+                data = pd.concat([data, pending]) if len(data) else pending
+        return data
+
+
+def get_feed(ticker: str, interval: str) -> LiveFeed:
+    """
+    Feed compartido del ticker e intervalo indicados (se crea la primera vez).
+
+    Args:
+        ticker: Símbolo del activo.
+        interval: Intervalo de las barras ('1m' o '5m').
+
+    Returns:
+        LiveFeed del proceso para ese ticker e intervalo.
+    """
+    key = (ticker.upper(), interval)
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = _feeds[key] = LiveFeed(ticker, interval)
+        return feed
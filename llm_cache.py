@@ -0,0 +1,179 @@
+"""
+llm_cache.py
+Caché en disco (SQLite) de análisis generados por el LLM.
+La clave es un hash del contexto enviado, el modelo y la configuración de generación,
+de modo que un mismo prompt devuelve el análisis guardado sin volver a llamar a la API.
+Incluye caducidad (TTL), límite de tamaño con expulsión LRU y contadores de aciertos.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from price_cache import CACHE_DIR
+
+DB_FILE = CACHE_DIR / "llm_cache.sqlite"
+
+# Caducidad de una entrada en segundos y número máximo de entradas guardadas
+TTL_SECONDS = int(os.getenv("TRADEWISE_LLM_CACHE_TTL", str(6 * 3600)))
+MAX_ENTRIES = int(os.getenv("TRADEWISE_LLM_CACHE_MAX_ENTRIES", "500"))
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses (accessed_at);
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    """Abre una conexión a la base de la caché creando el esquema si hace falta."""
+    DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_FILE, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def _db():
+    """Conexión dentro de una transacción que se confirma y se cierra al salir."""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _count(name: str, amount: int = 1) -> None:
+    """Incrementa un contador de estadísticas."""
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def make_key(context: str, model: str, generation_config: dict) -> str:
+    """
+    Calcula la clave de caché de una petición al LLM.
+
+    Args:
+        context: Texto completo enviado al modelo.
+        model: Nombre del modelo.
+        generation_config: Parámetros de generación.
+
+    Returns:
+        Hash SHA-256 hexadecimal.
+    """
+    payload = json.dumps(
+        {"model": model, "config": generation_config, "context": context},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str, ttl: Optional[int] = None) -> Optional[str]:
+    """
+    Busca un análisis cacheado.
+
+    Args:
+        key: Clave calculada con make_key.
+        ttl: Caducidad en segundos (por defecto TTL_SECONDS).
+
+    Returns:
+        Texto del análisis, o None si no existe o ha caducado.
+    """
+    ttl = TTL_SECONDS if ttl is None else ttl
+    now = time.time()
+    try:
+        with _db() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM analyses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                _count("misses")
+                return None
+            conn.execute("UPDATE analyses SET accessed_at = ? WHERE key = ?", (now, key))
+    except sqlite3.Error:
+        _count("misses")
+        return None
+    _count("hits")
+    return row[0]
+
+
+def put(key: str, model: str, value: str) -> None:
+    """
+    Guarda un análisis y expulsa las entradas menos usadas si se supera MAX_ENTRIES.
+
+    Args:
+        key: Clave calculada con make_key.
+        model: Nombre del modelo que generó el análisis.
+        value: Texto del análisis.
+    """
+    now = time.time()
+    try:
+        with _db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, model, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, now, now),
+            )
+            evicted = conn.execute(
+                "DELETE FROM analyses WHERE key IN ("
+                "SELECT key FROM analyses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (MAX_ENTRIES,),
+            ).rowcount
+    except sqlite3.Error:
+        return
+    _count("stores")
+    if evicted > 0:
+        _count("evictions", evicted)
+
+
+def invalidate(key: str) -> bool:
+    """Elimina una entrada concreta. Devuelve True si existía."""
+    try:
+        with _db() as conn:
+            return conn.execute("DELETE FROM analyses WHERE key = ?", (key,)).rowcount > 0
+    except sqlite3.Error:
+        return False
+
+
+def clear() -> None:
+    """Vacía la caché completa."""
+    try:
+        with _db() as conn:
+            conn.execute("DELETE FROM analyses")
+    except sqlite3.Error:
+        pass
+
+
+def stats() -> dict:
+    """
+    Devuelve los contadores de la caché en este proceso y el número de entradas en disco.
+
+    Returns:
+        Diccionario con hits, misses, stores, evictions y entries.
+    """
+    with _stats_lock:
+        result = dict(_stats)
+    try:
+        with _db() as conn:
+            result["entries"] = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+    except sqlite3.Error:
+        result["entries"] = None
+    return result
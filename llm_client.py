@@ -4,19 +4,69 @@ Cliente para el modelo de lenguaje (Gemini). Encapsula la llamada al LLM
 para facilitar el cambio de proveedor en el futuro.
 """
 
+import contextvars
 import os
-from typing import Optional
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
 
-# Carga de variables de entorno (debe llamarse antes de usar la API)
+# Carga de variables de entorno (debe llamarse antes de usar la API); una vez por proceso
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Proveedor actual: Google Generative AI (Gemini)
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+# Proveedor de LLM: Google Generative AI (Gemini) o el simulado (ver providers.py). Gemini
+# tarda en importarse (~0,9 s), así que se carga en el primer uso (ver _genai):
+# None hasta entonces, False si no está instalado.
+genai = None
+
+import llm_cache
+import telemetry
+from context_builder import estimate_tokens
+
+# Modelo y parámetros de generación (forman parte de la clave de caché)
+MODEL_NAME = "gemini-2.5-flash"
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "max_output_tokens": 2048,
+}
+
+# Presupuesto de tokens de salida por modo de análisis (ver context_builder.ANALYSIS_MODES)
+OUTPUT_TOKENS = {"full": 2048, "fast": 768}
+
+# Reintentos ante errores de cuota o saturación: espera aleatoria en [0, base * 2^intento]
+MAX_RETRIES = int(os.getenv("TRADEWISE_LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("TRADEWISE_LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX_SECONDS = float(os.getenv("TRADEWISE_LLM_BACKOFF_MAX", "20.0"))
+
+# Llamadas simultáneas al modelo como máximo en todo el proceso (todas las sesiones)
+MAX_CONCURRENT_CALLS = int(os.getenv("TRADEWISE_LLM_MAX_CONCURRENCY", "4"))
+
+# Fragmentos de mensajes de error que indican un fallo transitorio
+_RETRYABLE_MARKERS = ("quota", "resource", "429", "rate limit", "503", "unavailable", "overloaded")
+
+_call_slots = threading.BoundedSemaphore(max(1, MAX_CONCURRENT_CALLS))
+# Modelo reutilizado entre llamadas y sesiones: (módulo, API key, GenerativeModel)
+_model: Optional[tuple] = None
+_model_lock = threading.Lock()
+_flights: dict[str, "_Flight"] = {}
+_flights_lock = threading.Lock()
+# Tokens por texto según el modelo (titulares repetidos entre análisis no se vuelven a contar)
+_token_counts: dict[str, int] = {}
+_token_counts_lock = threading.Lock()
+MAX_TOKEN_COUNTS = 4096
+# Consultas simultáneas de recuento de tokens como máximo
+TOKEN_COUNT_CONCURRENCY = 8
+
+
+def generation_config(mode: str = "full") -> dict:
+    """Configuración de generación del modo indicado ('full' o 'fast')."""
+    return {**GENERATION_CONFIG, "max_output_tokens": OUTPUT_TOKENS.get(mode, OUTPUT_TOKENS["full"])}
 
 
 def _get_api_key() -> Optional[str]:
@@ -24,63 +74,468 @@ def _get_api_key() -> Optional[str]:
     return os.getenv("GEMINI_API_KEY")
 
 
-def _get_client():
-    """Configura y devuelve el cliente de Gemini. None si no está disponible."""
+def _genai():
+    """Proveedor de LLM configurado, cargado la primera vez; None si Gemini no está instalado."""
+    global genai
     if genai is None:
+        import providers
+        genai = providers.llm_provider() or False
+    return genai or None
+
+
+def _get_model():
+    """
+    Devuelve el modelo de Gemini, creado una sola vez por proceso y compartido entre
+    llamadas; genai.configure solo se repite si cambia la API key. None si no está disponible.
+    """
+    global _model
+    client = _genai()
+    api_key = (_get_api_key() or "").strip()
+    # El LLM simulado de providers.py no necesita API key
+    if client is None or (not api_key and getattr(client, "requires_api_key", True)):
         return None
-    api_key = _get_api_key()
-    if not api_key or not api_key.strip():
-        return None
-    genai.configure(api_key=api_key.strip())
-    return genai
+    with _model_lock:
+        if _model is None or _model[0] is not client or _model[1] != api_key:
+            client.configure(api_key=api_key)
+            _model = (client, api_key, client.GenerativeModel(MODEL_NAME))
+        return _model[2]
+
 
+def count_tokens(texts: list[str]) -> list[int]:
+    """
+    Tokens de cada texto según el modelo (count_tokens del proveedor), consultados en
+    paralelo y guardados por texto. Sin modelo disponible, o si la consulta falla, se usa
+    la estimación local de context_builder.estimate_tokens.
+
+    Args:
+        texts: Textos a contar.
 
-def generate_analysis(context: str) -> tuple[bool, str]:
+    Returns:
+        Tokens de cada texto, en el mismo orden.
+    """
+    model = _get_model()
+    counter = getattr(model, "count_tokens", None)
+    if counter is None:
+        return [estimate_tokens(text) for text in texts]
+
+    def count(text: str) -> Optional[int]:
+        try:
+            return int(counter(text).total_tokens)
+        except Exception:
+            telemetry.incr("llm_count_tokens_error")
+            return None
+
+    with _token_counts_lock:
+        pending = [text for text in dict.fromkeys(texts) if text not in _token_counts]
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(TOKEN_COUNT_CONCURRENCY, len(pending))) as pool:
+            counted = list(pool.map(count, pending))
+        with _token_counts_lock:
+            if len(_token_counts) + len(pending) > MAX_TOKEN_COUNTS:
+                _token_counts.clear()
+            _token_counts.update((text, n) for text, n in zip(pending, counted) if n is not None)
+    with _token_counts_lock:
+        return [_token_counts[text] if text in _token_counts else estimate_tokens(text) for text in texts]
+
+
+class AnalysisError(Exception):
+    """Error al generar el análisis; el mensaje ya está listo para mostrarse al usuario."""
+
+
+def _client_error() -> str:
+    """Mensaje de error cuando el cliente no está disponible."""
+    if _genai() is None:
+        return "Error: Falta instalar google-generativeai. Ver requirements.txt."
+    return "Error: GEMINI_API_KEY no configurada. Crea un archivo .env con tu API key."
+
+
+def _error_message(e: Exception) -> str:
+    """Traduce una excepción de la API a un mensaje para el usuario."""
+    err_msg = str(e).strip() or "Error desconocido"
+    if "API_KEY" in err_msg.upper() or "invalid" in err_msg.lower():
+        return "Error: API key inválida o no autorizada. Revisa tu .env."
+    if "quota" in err_msg.lower() or "resource" in err_msg.lower():
+        return "Error: Límite de uso de la API alcanzado. Intenta más tarde."
+    return f"Error de API: {err_msg}"
+
+
+def _response_text(response) -> str:
+    """Concatena el texto de todas las partes del primer candidato (respuesta o fragmento)."""
+    if not response or not response.candidates:
+        return ""
+    content = response.candidates[0].content
+    if not hasattr(content, "parts") or not content.parts:
+        return ""
+    full_text = ""
+    for part in content.parts:
+        if hasattr(part, "text") and part.text:
+            full_text += part.text
+    return full_text
+
+
+def _record_usage(response, mode: str) -> None:
+    """Suma a la telemetría los tokens de entrada y salida que informa la API, si los hay."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    telemetry.incr(f"llm_input_tokens_{mode}", int(getattr(usage, "prompt_token_count", 0) or 0))
+    telemetry.incr(f"llm_output_tokens_{mode}", int(getattr(usage, "candidates_token_count", 0) or 0))
+
+
+def _is_retryable(e: Exception) -> bool:
+    """True si el error es transitorio (cuota, límite de ritmo o servicio saturado)."""
+    err_msg = str(e).lower()
+    return any(marker in err_msg for marker in _RETRYABLE_MARKERS)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Espera antes del reintento 'attempt' (0, 1, ...): exponencial con jitter completo."""
+    return random.uniform(0.0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _wait_before_retry(attempt: int) -> None:
+    """Cuenta el reintento y espera (sin ocupar hueco de llamada)."""
+    telemetry.incr("llm_retry")
+    time.sleep(_backoff_delay(attempt))
+
+
+@contextmanager
+def _call_slot() -> Iterator[None]:
+    """Ocupa uno de los MAX_CONCURRENT_CALLS huecos de llamada al modelo."""
+    started = time.perf_counter()
+    with _call_slots:
+        telemetry.record("llm_queue", time.perf_counter() - started, started)
+        yield
+
+
+class _Flight:
+    """
+    Llamada al modelo en curso, compartida por todas las peticiones con la misma clave.
+    El líder publica los fragmentos; los seguidores los reciben desde el principio.
+    """
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.error: Optional[AnalysisError] = None
+        self.done = False
+        self._cond = threading.Condition()
+
+    def publish(self, text: str) -> None:
+        """Añade un fragmento y despierta a los seguidores."""
+        with self._cond:
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def finish(self, error: Optional[AnalysisError] = None) -> None:
+        """Marca la llamada como terminada (con error o sin él)."""
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def follow(self) -> Iterator[str]:
+        """Fragmentos publicados y por publicar; lanza el AnalysisError del líder si falla."""
+        index = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: index < len(self.chunks) or self.done)
+                pending = self.chunks[index:]
+                finished, error = self.done, self.error
+            index += len(pending)
+            yield from pending
+            if finished:
+                if error is not None:
+                    raise error
+                return
+
+
+def _join_flight(key: str, join: bool = True) -> tuple[_Flight, bool]:
+    """
+    Se une a la llamada en curso para la clave o inicia una nueva.
+
+    Args:
+        key: Clave de caché del análisis.
+        join: Si False (petición que ignora la caché), siempre inicia una llamada nueva;
+            las peticiones siguientes se unen a esta, que tiene el resultado más reciente.
+
+    Returns:
+        Tupla (llamada, es_líder). Solo el líder llama al modelo.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None and join:
+            return flight, False
+        flight = _flights[key] = _Flight()
+        return flight, True
+
+
+def _land(key: str, flight: _Flight, error: Optional[AnalysisError] = None) -> None:
+    """Retira la llamada del registro y entrega el resultado a los seguidores."""
+    with _flights_lock:
+        if _flights.get(key) is flight:
+            del _flights[key]
+    flight.finish(error)
+
+
+def _call_model(
+    context: str, mode: str = "full", before_call: Optional[Callable[[], None]] = None,
+) -> tuple[bool, str]:
+    """
+    Llama al modelo sin caché, con reintentos, y devuelve (éxito, texto o mensaje de error).
+    before_call se invoca antes de cada intento (por ejemplo, para limitar el ritmo de llamadas).
+    """
+    model = _get_model()
+    if model is None:
+        return False, _client_error()
+    telemetry.incr(f"llm_calls_{mode}")
+    telemetry.incr(f"llm_prompt_tokens_{mode}", count_tokens([context])[0])
+    for attempt in range(MAX_RETRIES + 1):
+        if before_call is not None:
+            before_call()
+        try:
+            with _call_slot():
+                response = model.generate_content(
+                    context,
+                    generation_config=generation_config(mode),
+                )
+            full_text = _response_text(response)
+            _record_usage(response, mode)
+        except Exception as e:
+            telemetry.incr("gemini_error")
+            if attempt < MAX_RETRIES and _is_retryable(e):
+                _wait_before_retry(attempt)
+                continue
+            return False, _error_message(e)
+        if not full_text.strip():
+            telemetry.incr("gemini_empty_response")
+            return False, "Error: No se recibió contenido del modelo."
+        telemetry.incr("llm_output_chars", len(full_text))
+        return True, full_text.strip()
+    return False, "Error: Límite de uso de la API alcanzado. Intenta más tarde."
+
+
+def _stream_model(context: str, mode: str = "full") -> Iterator[str]:
+    """
+    Llama al modelo en streaming, con reintentos mientras no haya llegado texto.
+
+    Yields:
+        Fragmentos de texto no vacíos.
+
+    Raises:
+        AnalysisError: si el cliente no está disponible o la llamada falla.
+    """
+    model = _get_model()
+    if model is None:
+        raise AnalysisError(_client_error())
+    telemetry.incr(f"llm_calls_{mode}")
+    telemetry.incr(f"llm_prompt_tokens_{mode}", count_tokens([context])[0])
+    started = time.perf_counter()
+    received = False
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with _call_slot():
+                    response = model.generate_content(
+                        context,
+                        generation_config=generation_config(mode),
+                        stream=True,
+                    )
+                    last_chunk = None
+                    for chunk in response:
+                        last_chunk = chunk
+                        text = _response_text(chunk)
+                        if text:
+                            if not received:
+                                telemetry.record("llm_ttft", time.perf_counter() - started, started)
+                                received = True
+                            yield text
+                # El recuento de tokens llega con el último fragmento
+                _record_usage(last_chunk, mode)
+                return
+            except Exception as e:
+                telemetry.incr("gemini_error")
+                # Con texto ya entregado no se puede reintentar sin duplicarlo
+                if received or attempt == MAX_RETRIES or not _is_retryable(e):
+                    raise AnalysisError(_error_message(e)) from e
+                _wait_before_retry(attempt)
+    finally:
+        telemetry.record("llm_total", time.perf_counter() - started, started)
+
+
+def analysis_cache_key(context: str, mode: str = "full") -> str:
+    """Clave de caché del análisis para un contexto con el modelo y la configuración del modo."""
+    return llm_cache.make_key(context, MODEL_NAME, generation_config(mode))
+
+
+def generate_analysis(
+    context: str,
+    use_cache: bool = True,
+    mode: str = "full",
+    before_call: Optional[Callable[[], None]] = None,
+) -> tuple[bool, str]:
     """
     Genera el análisis de trading a partir del contexto estructurado.
+    Si el mismo contexto ya se analizó recientemente, devuelve el resultado cacheado;
+    si otra petición lo está generando en este momento, espera a su resultado.
     
     Args:
         context: Texto con datos técnicos, titulares, perfil de riesgo y horizonte.
+        use_cache: Si False, ignora la caché y fuerza una llamada nueva (el resultado
+            sustituye a la entrada cacheada y no se une a otra petición en curso).
+        mode: 'full' o 'fast' (presupuesto de salida de OUTPUT_TOKENS).
+        before_call: Función sin argumentos que se llama antes de cada intento contra la
+            API, reintentos incluidos (por ejemplo, TokenBucket.acquire).
     
     Returns:
         Tupla (éxito: bool, mensaje: str). Si éxito es False, mensaje describe el error.
     """
-    client = _get_client()
-    if client is None:
-        if genai is None:
-            return False, "Error: Falta instalar google-generativeai. Ver requirements.txt."
-        return False, "Error: GEMINI_API_KEY no configurada. Crea un archivo .env con tu API key."
+    key = analysis_cache_key(context, mode)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            telemetry.incr("llm_cache_hit")
+            return True, cached
+        telemetry.incr("llm_cache_miss")
+    flight, leader = _join_flight(key, join=use_cache)
+    if not leader:
+        telemetry.incr("llm_coalesced")
+        try:
+            return True, "".join(flight.follow()).strip()
+        except AnalysisError as e:
+            return False, str(e)
+    success, result = False, "Error: El análisis se interrumpió."
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(
-            context,
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "max_output_tokens": 2048,
-            }
-        )
-        if not response:
-            return False, "Error: No se recibió contenido del modelo."
-        if not response.candidates:
-            return False, "Error: No se recibió contenido del modelo."
-        content = response.candidates[0].content
-        if not hasattr(content, "parts") or not content.parts:
-            return False, "Error: No se recibió contenido del modelo."
-        full_text = ""
-        for part in response.candidates[0].content.parts:
-            if hasattr(part, "text") and part.text:
-                full_text += part.text
-        if not full_text.strip():
-            return False, "Error: No se recibió contenido del modelo."
-        print("----- DEBUG GEMINI RESPONSE -----")
-        print("Longitud total:", len(full_text))
-        print("----- FIN DEBUG -----")
-        return True, full_text.strip()
-    except Exception as e:
-        err_msg = str(e).strip() or "Error desconocido"
-        if "API_KEY" in err_msg.upper() or "invalid" in err_msg.lower():
-            return False, "Error: API key inválida o no autorizada. Revisa tu .env."
-        if "quota" in err_msg.lower() or "resource" in err_msg.lower():
-            return False, "Error: Límite de uso de la API alcanzado. Intenta más tarde."
-        return False, f"Error de API: {err_msg}"
+        with telemetry.span("llm_total"):
+            success, result = _call_model(context, mode, before_call)
+        if success:
+            llm_cache.put(key, MODEL_NAME, result)
+            flight.publish(result)
+    finally:
+        _land(key, flight, None if success else AnalysisError(result))
+    return success, result
+
+
+def generate_analysis_stream(context: str, use_cache: bool = True, mode: str = "full") -> Iterator[str]:
+    """
+    Genera el análisis en modo streaming, devolviendo fragmentos de texto según llegan.
+    Si el contexto está en caché, devuelve el análisis guardado en un único fragmento;
+    si otra petición idéntica está en curso, reproduce sus fragmentos en lugar de repetirla.
+    Al terminar, el texto completo se guarda en la caché.
+    
+    Args:
+        context: Texto con datos técnicos, titulares, perfil de riesgo y horizonte.
+        use_cache: Si False, ignora la caché y la petición en curso y fuerza una llamada nueva.
+        mode: 'full' o 'fast' (presupuesto de salida de OUTPUT_TOKENS).
+    
+    Yields:
+        Fragmentos de texto del análisis.
+    
+    Raises:
+        AnalysisError: con el mismo mensaje que devolvería generate_analysis.
+    """
+    yield from _open_stream(context, use_cache, mode)[1]
+
+
+def _open_stream(context: str, use_cache: bool, mode: str) -> tuple[str, Iterator[str]]:
+    """
+    Decide de dónde sale el análisis y devuelve (origen, fragmentos). El origen es 'cache'
+    (respuesta guardada), 'shared' (otra petición idéntica en curso) o 'model' (llamada nueva).
+    """
+    key = analysis_cache_key(context, mode)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            telemetry.incr("llm_cache_hit")
+            return "cache", iter([cached])
+        telemetry.incr("llm_cache_miss")
+    flight, leader = _join_flight(key, join=use_cache)
+    if not leader:
+        # Misma petición en curso en otra sesión: se comparten sus fragmentos
+        telemetry.incr("llm_coalesced")
+        return "shared", flight.follow()
+    return "model", _lead_stream(key, flight, context, mode)
+
+
+def _lead_stream(key: str, flight: _Flight, context: str, mode: str) -> Iterator[str]:
+    """Llamada en streaming del líder: publica los fragmentos y guarda el texto en la caché."""
+    error: Optional[AnalysisError] = AnalysisError("Error: El análisis se interrumpió.")
+    try:
+        for text in _stream_model(context, mode):
+            flight.publish(text)
+            yield text
+        full_text = "".join(flight.chunks).strip()
+        if not full_text:
+            telemetry.incr("gemini_empty_response")
+            raise AnalysisError("Error: No se recibió contenido del modelo.")
+        telemetry.incr("llm_output_chars", len(full_text))
+        llm_cache.put(key, MODEL_NAME, full_text)
+        error = None
+    except AnalysisError as e:
+        error = e
+        raise
+    finally:
+        _land(key, flight, error)
+
+
+class AnalysisStream:
+    """
+    Fragmentos de un análisis que se genera en un hilo de fondo (ver start_analysis_stream).
+    source indica de dónde salió el texto: 'cache', 'shared' o 'model' (None si falló antes).
+    """
+
+    _DONE = object()
+
+    def __init__(self):
+        self.source: Optional[str] = None
+        self._chunks: queue.Queue = queue.Queue()
+        self._finished = False
+
+    def __iter__(self) -> "AnalysisStream":
+        return self
+
+    def __next__(self) -> str:
+        if self._finished:
+            raise StopIteration
+        item = self._chunks.get()
+        if item is self._DONE:
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, AnalysisError):
+            self._finished = True
+            raise item
+        return item
+
+
+def start_analysis_stream(context: str, use_cache: bool = True, mode: str = "full") -> AnalysisStream:
+    """
+    Lanza la generación en streaming en un hilo de fondo y devuelve enseguida un iterador.
+    Permite que la petición al LLM avance mientras la interfaz dibuja otras secciones;
+    los fragmentos que llegan antes de empezar a consumir quedan en cola.
+    
+    Args:
+        context: Texto con datos técnicos, titulares, perfil de riesgo y horizonte.
+        use_cache: Si False, ignora la caché y fuerza una llamada nueva.
+        mode: 'full' o 'fast' (presupuesto de salida de OUTPUT_TOKENS).
+    
+    Returns:
+        AnalysisStream con los fragmentos de texto; lanza AnalysisError igual que
+        generate_analysis_stream.
+    """
+    stream = AnalysisStream()
+
+    def worker():
+        try:
+            stream.source, chunks = _open_stream(context, use_cache, mode)
+            for chunk in chunks:
+                stream._chunks.put(chunk)
+        except AnalysisError as e:
+            stream._chunks.put(e)
+        except Exception as e:
+            stream._chunks.put(AnalysisError(_error_message(e)))
+        finally:
+            stream._chunks.put(AnalysisStream._DONE)
+
+    # El hilo hereda la traza activa para que sus tiempos aparezcan en el diagnóstico
+    run_in_context = contextvars.copy_context().run
+    threading.Thread(target=run_in_context, args=(worker,), name="analysis-stream", daemon=True).start()
+    return stream
@@ -0,0 +1,151 @@
+"""
+news_cache.py
+Caché persistente de titulares por ticker (un JSON por ticker en disco).
+Define la ventana de frescura, el margen en el que se sirven titulares caducados
+mientras se refrescan en segundo plano, y la deduplicación de titulares casi idénticos
+(MinHash sobre shingles de caracteres), que también usa context_builder para el prompt.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from price_cache import CACHE_DIR, write_atomic
+
+NEWS_DIR = CACHE_DIR / "news"
+
+# Segundos en los que los titulares se consideran frescos
+FRESH_SECONDS = int(os.getenv("TRADEWISE_NEWS_FRESH_SECONDS", "1800"))
+# Segundos máximos en los que se sirven titulares caducados mientras se refrescan
+MAX_STALE_SECONDS = int(os.getenv("TRADEWISE_NEWS_MAX_STALE_SECONDS", str(24 * 3600)))
+# Titulares guardados como máximo por ticker
+MAX_STORED = 50
+
+# MinHash: permutaciones, tamaño de los shingles de caracteres y similitud de Jaccard
+# estimada a partir de la cual dos titulares se consideran el mismo
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 4
+MINHASH_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240601)
+# a < 2^31 y hash < 2^32: a * hash + b cabe en uint64 sin desbordar
+_HASH_A = _rng.integers(1, 1 << 31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, 1 << 31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+_lock = threading.Lock()
+
+
+def _ticker_path(ticker: str) -> Path:
+    """Ruta del archivo JSON de titulares de un ticker."""
+    return NEWS_DIR / f"{ticker.upper()}.json"
+
+
+def _normalize(text: str) -> str:
+    """Texto sin acentos, en minúsculas y con la puntuación convertida en espacios."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    Firma MinHash de los shingles de caracteres de un texto.
+
+    Args:
+        text: Texto (ej: un titular).
+
+    Returns:
+        Array uint64 de MINHASH_PERMUTATIONS valores; la fracción de posiciones iguales
+        entre dos firmas estima la similitud de Jaccard de sus shingles.
+    """
+    norm = _normalize(text)
+    shingles = {norm[i:i + SHINGLE_SIZE] for i in range(max(1, len(norm) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (hashes[:, None] * _HASH_A + _HASH_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def _similar(a: np.ndarray, b: np.ndarray, threshold: float) -> bool:
+    """Indica si dos firmas MinHash superan el umbral de similitud estimada."""
+    return float(np.mean(a == b)) >= threshold
+
+
+def dedupe(titles: list[str], known: Optional[list[str]] = None, threshold: float = MINHASH_THRESHOLD) -> list[str]:
+    """
+    Elimina titulares casi idénticos (misma noticia con distinta redacción) conservando
+    el primero de cada grupo y el orden original. Si un titular se parece a uno ya
+    conocido, se usa el texto conocido para que el resultado sea estable entre refrescos.
+
+    Args:
+        titles: Titulares recién obtenidos.
+        known: Titulares de refrescos anteriores.
+        threshold: Similitud de Jaccard estimada a partir de la cual dos titulares son el mismo.
+
+    Returns:
+        Lista de titulares sin duplicados.
+    """
+    known_signatures = [(minhash_signature(t), t) for t in (known or [])]
+    result, seen = [], []
+    for title in titles:
+        signature = minhash_signature(title)
+        match = next(((sig, text) for sig, text in known_signatures if _similar(signature, sig, threshold)), None)
+        if match is not None:
+            signature, title = match
+        if any(_similar(signature, other, threshold) for other in seen):
+            continue
+        seen.append(signature)
+        result.append(title)
+    return result
+
+
+def load(ticker: str) -> Optional[dict]:
+    """
+    Lee la entrada cacheada de un ticker.
+
+    Args:
+        ticker: Símbolo del activo.
+
+    Returns:
+        Diccionario con 'fetched_at' (epoch) y 'headlines', o None si no hay caché.
+    """
+    try:
+        with open(_ticker_path(ticker), "r", encoding="utf-8") as fh:
+            entry = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry.get("headlines"), list):
+        return None
+    return entry
+
+
+def save(ticker: str, headlines: list[str]) -> list[str]:
+    """
+    Guarda titulares recién obtenidos, deduplicados contra los ya cacheados.
+
+    Args:
+        ticker: Símbolo del activo.
+        headlines: Titulares obtenidos del proveedor.
+
+    Returns:
+        Titulares tal como quedaron guardados.
+    """
+    with _lock:
+        previous = load(ticker)
+        known = previous["headlines"] if previous else []
+        stored = dedupe(headlines, known)[:MAX_STORED]
+        entry = json.dumps({"fetched_at": time.time(), "headlines": stored}, ensure_ascii=False)
+        write_atomic(_ticker_path(ticker), lambda tmp: tmp.write_text(entry, encoding="utf-8"))
+    return stored
+
+
+def age(entry: dict) -> float:
+    """Segundos desde que se obtuvo la entrada."""
+    return time.time() - float(entry.get("fetched_at", 0))
@@ -0,0 +1,336 @@
+"""
+portfolio.py
+Riesgo de cartera sobre cualquier subconjunto de TOP_100_TICKERS: matrices de
+covarianza y correlación de retornos, volatilidad de la cartera, contribuciones al
+riesgo y correlaciones móviles. Todo se calcula con NumPy sobre una matriz de retornos
+alineada (fechas x tickers); los huecos (tickers que cotizan desde más tarde) se tratan
+por pares, usando para cada par solo los días en que ambos tienen dato.
+Las mismas definiciones que volatility_returns: retornos simples, ddof=1 y 252 sesiones.
+"""
+
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher import align_panel
+
+TRADING_DAYS = 252
+
+# Tolerancia relativa al comparar los retornos ya incorporados al estado con los nuevos;
+# si cambian más, el histórico se reajustó y el estado se reconstruye
+OVERLAP_RTOL = 1e-9
+
+
+def returns_matrix(prices_by_ticker: dict[str, Optional[pd.DataFrame]]) -> pd.DataFrame:
+    """
+    Retornos simples diarios alineados por fecha.
+
+    Args:
+        prices_by_ticker: Diccionario ticker -> DataFrame de precios (o None).
+
+    Returns:
+        DataFrame (fechas x tickers); NaN donde un ticker no tiene dato ese día o el anterior.
+    """
+    closes = align_panel(prices_by_ticker, column="Close")
+    if closes.empty:
+        return closes
+    return closes.pct_change(fill_method=None).iloc[1:]
+
+
+def _pair_stats(values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estadísticos suficientes por pares de una matriz de retornos (días x tickers).
+
+    Returns:
+        Tupla (n, xtx, sx, sq) de matrices (tickers x tickers): días comunes,
+        suma de productos, suma de i en los días comunes con j y suma de cuadrados de i
+        en esos mismos días.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    mask = (~np.isnan(values)).astype(np.float64)
+    filled = np.where(mask > 0, values, 0.0)
+    return mask.T @ mask, filled.T @ filled, filled.T @ mask, (filled * filled).T @ mask
+
+
+def _covariance(n: np.ndarray, xtx: np.ndarray, sx: np.ndarray, min_periods: int) -> np.ndarray:
+    """Covarianza muestral por pares a partir de los estadísticos suficientes."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (xtx - sx * sx.T / n) / (n - 1)
+    return np.where(n >= max(min_periods, 2), cov, np.nan)
+
+
+def _correlation(n: np.ndarray, xtx: np.ndarray, sx: np.ndarray, sq: np.ndarray, min_periods: int) -> np.ndarray:
+    """Correlación por pares: cada varianza se calcula sobre los días comunes del par."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = xtx - sx * sx.T / n
+        var = np.maximum(sq - sx * sx / n, 0.0)
+        corr = cov / np.sqrt(var * var.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.diag(n) >= max(min_periods, 2), 1.0, np.nan))
+    return np.where(n >= max(min_periods, 2), corr, np.nan)
+
+
+def covariance_matrix(returns: pd.DataFrame, annualize: bool = True, min_periods: int = 20) -> pd.DataFrame:
+    """
+    Matriz de covarianza de retornos por pares.
+
+    Args:
+        returns: Matriz de retornos (ver returns_matrix).
+        annualize: Si True, multiplica por 252.
+        min_periods: Días comunes mínimos por par; por debajo, NaN.
+
+    Returns:
+        DataFrame (tickers x tickers).
+    """
+    n, xtx, sx, _ = _pair_stats(returns.to_numpy())
+    cov = _covariance(n, xtx, sx, min_periods) * (TRADING_DAYS if annualize else 1)
+    return pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+
+
+def correlation_matrix(returns: pd.DataFrame, min_periods: int = 20) -> pd.DataFrame:
+    """
+    Matriz de correlación de retornos por pares (como DataFrame.corr(min_periods=...)).
+
+    Args:
+        returns: Matriz de retornos (ver returns_matrix).
+        min_periods: Días comunes mínimos por par; por debajo, NaN.
+
+    Returns:
+        DataFrame (tickers x tickers).
+    """
+    n, xtx, sx, sq = _pair_stats(returns.to_numpy())
+    corr = _correlation(n, xtx, sx, sq, min_periods)
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+
+def _normalize_weights(weights, size: int) -> np.ndarray:
+    """Pesos como array que suma 1 (pesos iguales si no se indican)."""
+    if weights is None:
+        return np.full(size, 1.0 / size)
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    return weights / total if total else weights
+
+
+def portfolio_volatility(cov: np.ndarray, weights=None) -> Optional[float]:
+    """
+    Volatilidad de la cartera: sqrt(w' Σ w).
+
+    Args:
+        cov: Matriz de covarianza (anualizada si se quiere volatilidad anual).
+        weights: Pesos por ticker (se normalizan a suma 1); por defecto, iguales.
+
+    Returns:
+        Volatilidad (decimal), o None si la covarianza tiene huecos.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    if cov.size == 0 or np.isnan(cov).any():
+        return None
+    w = _normalize_weights(weights, len(cov))
+    return float(np.sqrt(max(w @ cov @ w, 0.0)))
+
+
+def risk_contributions(cov: np.ndarray, weights=None) -> np.ndarray:
+    """
+    Parte de la varianza de la cartera que aporta cada ticker (suma 1).
+
+    Args:
+        cov: Matriz de covarianza.
+        weights: Pesos por ticker; por defecto, iguales.
+
+    Returns:
+        Array con la contribución relativa de cada ticker.
+    """
+    cov = np.nan_to_num(np.asarray(cov, dtype=np.float64))
+    w = _normalize_weights(weights, len(cov))
+    marginal = w * (cov @ w)
+    total = marginal.sum()
+    return marginal / total if total > 0 else np.zeros_like(marginal)
+
+
+def average_correlation(corr: np.ndarray) -> Optional[float]:
+    """Media de las correlaciones fuera de la diagonal (ignorando huecos)."""
+    corr = np.asarray(corr, dtype=np.float64)
+    if len(corr) < 2:
+        return None
+    off = corr[~np.eye(len(corr), dtype=bool)]
+    off = off[~np.isnan(off)]
+    return float(off.mean()) if off.size else None
+
+
+def rolling_correlation(returns: pd.DataFrame, first: str, second: str, window: int = 60) -> pd.Series:
+    """
+    Correlación móvil entre dos tickers mediante sumas acumuladas (sin bucles por día).
+
+    Args:
+        returns: Matriz de retornos (ver returns_matrix).
+        first: Primer ticker.
+        second: Segundo ticker.
+        window: Días de la ventana.
+
+    Returns:
+        Serie indexada por fecha; NaN hasta tener la mitad de la ventana con datos de ambos.
+    """
+    x = returns[first].to_numpy(dtype=np.float64)
+    y = returns[second].to_numpy(dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        both = ~np.isnan(x) & ~np.isnan(y)
+        x, y = np.where(both, x, 0.0), np.where(both, y, 0.0)
+
+        def window_sum(a: np.ndarray) -> np.ndarray:
+            csum = np.concatenate(([0.0], np.cumsum(a)))
+            return csum[window:] - csum[:-window]
+
+        n = window_sum(both.astype(np.float64))
+        sx, sy = window_sum(x), window_sum(y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = window_sum(x * y) - sx * sy / n
+            var_x = np.maximum(window_sum(x * x) - sx * sx / n, 0.0)
+            var_y = np.maximum(window_sum(y * y) - sy * sy / n, 0.0)
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        out[window - 1:] = np.where(n >= max(window // 2, 2), corr, np.nan)
+    return pd.Series(out, index=returns.index, name=f"{first}/{second}")
+
+
+class CovarianceState:
+    """
+    Estadísticos por pares de una matriz de retornos que se actualizan día a día.
+    Añadir un día cuesta O(tickers²) sin recorrer el histórico; con 'window' se
+    mantiene una ventana móvil de ese número de días (el más antiguo se descuenta).
+    Es seguro entre hilos, para poder compartirlo entre sesiones.
+    """
+
+    __slots__ = ("tickers", "window", "n", "xtx", "sx", "sq", "rows", "last_date", "_lock")
+
+    def __init__(self, tickers: list[str], window: Optional[int] = None):
+        size = len(tickers)
+        self.tickers = list(tickers)
+        self.window = window
+        self.n = np.zeros((size, size))
+        self.xtx = np.zeros((size, size))
+        self.sx = np.zeros((size, size))
+        self.sq = np.zeros((size, size))
+        # Filas de la ventana (solo si hay ventana) para poder descontarlas al salir
+        self.rows: deque = deque()
+        self.last_date: Optional[pd.Timestamp] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, window: Optional[int] = None) -> "CovarianceState":
+        """
+        Inicializa el estado con una matriz de retornos en una sola pasada vectorizada.
+
+        Args:
+            returns: Matriz de retornos (ver returns_matrix).
+            window: Días de la ventana móvil (por defecto, sin ventana).
+
+        Returns:
+            CovarianceState equivalente a haber llamado update() con cada fila.
+        """
+        state = cls(list(returns.columns), window)
+        state._fit(returns)
+        return state
+
+    def _fit(self, returns: pd.DataFrame) -> None:
+        values = returns.to_numpy(dtype=np.float64)
+        if self.window is not None:
+            values = values[-self.window:]
+            self.rows = deque(values)
+        else:
+            self.rows = deque()
+        if len(values):
+            self.n, self.xtx, self.sx, self.sq = _pair_stats(values)
+        else:
+            size = len(self.tickers)
+            self.n, self.xtx, self.sx, self.sq = (np.zeros((size, size)) for _ in range(4))
+        self.last_date = returns.index[-1] if len(returns) else None
+
+    def _add(self, row: np.ndarray, sign: float) -> None:
+        mask = (~np.isnan(row)).astype(np.float64)
+        x = np.where(mask > 0, row, 0.0)
+        self.n += sign * np.outer(mask, mask)
+        self.xtx += sign * np.outer(x, x)
+        self.sx += sign * np.outer(x, mask)
+        self.sq += sign * np.outer(x * x, mask)
+
+    def _append(self, date: pd.Timestamp, row: np.ndarray) -> None:
+        """Añade un día sin tomar el lock (quien llama ya lo tiene)."""
+        self._add(row, 1.0)
+        if self.window is not None:
+            self.rows.append(row)
+            if len(self.rows) > self.window:
+                self._add(self.rows.popleft(), -1.0)
+        self.last_date = date
+
+    def _matches(self, returns: pd.DataFrame) -> bool:
+        """
+        Indica si las filas ya incorporadas siguen iguales en 'returns'. Si Yahoo reajusta
+        el histórico (dividendos, splits), cambian y el estado acumulado deja de valer.
+        """
+        seen = returns[returns.index <= self.last_date].to_numpy(dtype=np.float64)
+        if self.window is not None:
+            # Solo se conservan las filas de la ventana: se comparan las que solapan
+            size = min(len(seen), len(self.rows))
+            if not size:
+                return False
+            kept = np.array(list(self.rows)[-size:])
+            return np.allclose(seen[-size:], kept, rtol=OVERLAP_RTOL, atol=0.0, equal_nan=True)
+        # Sin ventana se comparan recuento, suma y suma de cuadrados por ticker
+        mask = ~np.isnan(seen)
+        x = np.where(mask, seen, 0.0)
+        return (
+            np.array_equal(mask.sum(axis=0), np.diag(self.n))
+            and np.allclose(x.sum(axis=0), np.diag(self.sx), rtol=OVERLAP_RTOL, atol=1e-12)
+            and np.allclose((x * x).sum(axis=0), np.diag(self.xtx), rtol=OVERLAP_RTOL, atol=1e-12)
+        )
+
+    def update(self, date: pd.Timestamp, row) -> None:
+        """
+        Añade los retornos de un día nuevo (uno por ticker, NaN si falta).
+
+        Args:
+            date: Fecha del día.
+            row: Retornos en el orden de self.tickers.
+        """
+        row = np.asarray(row, dtype=np.float64)
+        with self._lock:
+            self._append(date, row)
+
+    def sync(self, returns: pd.DataFrame) -> int:
+        """
+        Pone el estado al día con una matriz de retornos más reciente: añade solo las
+        filas posteriores a last_date, o lo reconstruye si las series no encajan o si
+        las filas ya incorporadas han cambiado (histórico reajustado).
+
+        Args:
+            returns: Matriz de retornos con las mismas columnas que self.tickers.
+
+        Returns:
+            Número de días añadidos (len(returns) si se reconstruyó).
+        """
+        if list(returns.columns) != self.tickers:
+            raise ValueError("Las columnas no coinciden con los tickers del estado.")
+        # Todo bajo el lock: si dos sesiones sincronizan a la vez, la segunda ya no ve días nuevos
+        with self._lock:
+            if self.last_date is None or self.last_date not in returns.index or not self._matches(returns):
+                self._fit(returns)
+                return len(returns)
+            newer = returns[returns.index > self.last_date]
+            for date, row in zip(newer.index, newer.to_numpy(dtype=np.float64)):
+                self._append(date, row)
+            return len(newer)
+
+    def covariance(self, annualize: bool = True, min_periods: int = 20) -> np.ndarray:
+        """Matriz de covarianza por pares (anualizada por defecto)."""
+        with self._lock:
+            cov = _covariance(self.n, self.xtx, self.sx, min_periods)
+        return cov * (TRADING_DAYS if annualize else 1)
+
+    def correlation(self, min_periods: int = 20) -> np.ndarray:
+        """Matriz de correlación por pares."""
+        with self._lock:
+            return _correlation(self.n, self.xtx, self.sx, self.sq, min_periods)
@@ -0,0 +1,177 @@
+"""
+prefetch.py
+Planificador en segundo plano que mantiene calientes las cachés de precios,
+titulares e indicadores de todo el universo TOP_100_TICKERS.
+Se puede ejecutar como proceso aparte (python prefetch.py) o como hilo dentro de la app.
+"""
+
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import news_cache
+import price_store
+from data_fetcher import refresh_news
+from screener import build_snapshot
+from tickers import TOP_100_TICKERS
+
+logger = logging.getLogger("tradewise.prefetch")
+
+# Intervalo base entre refrescos y variación aleatoria relativa
+INTERVAL_SECONDS = int(os.getenv("TRADEWISE_PREFETCH_INTERVAL", "900"))
+JITTER = 0.2
+# Espera máxima tras fallos consecutivos del proveedor
+MAX_BACKOFF_SECONDS = 4 * 3600
+# Consultas de titulares simultáneas como máximo
+NEWS_CONCURRENCY = 4
+# Fracción de tickers fallidos a partir de la cual el ciclo cuenta como fallo del proveedor,
+# por separado para precios (sobre todo el universo) y titulares (sobre los consultados)
+PRICE_FAILURE_RATIO = 0.5
+NEWS_FAILURE_RATIO = 0.5
+
+
+def refresh_universe(tickers: Optional[list[str]] = None, months: int = 6) -> dict:
+    """
+    Ejecuta un ciclo de refresco: precios e instantánea de indicadores en bloque
+    (publicando después una versión nueva del almacén compartido de precios),
+    y titulares caducados con concurrencia acotada.
+
+    Args:
+        tickers: Tickers a refrescar (por defecto TOP_100_TICKERS).
+        months: Meses de historia de precios.
+
+    Returns:
+        Resumen con tickers, price_errors, news_refreshed, news_errors y seconds.
+    """
+    tickers = list(tickers or TOP_100_TICKERS)
+    started = time.perf_counter()
+
+    # Sin conexión la instantánea sale de la caché anterior: también cuentan como error
+    # los tickers cuyo refresco falló aunque tengan datos
+    refresh_errors: list[str] = []
+    snapshot = build_snapshot(tickers, months=months, errors=refresh_errors)
+    with_prices = set(snapshot["ticker"]) if not snapshot.empty else set()
+    failed = set(refresh_errors)
+    price_errors = [t for t in tickers if t not in with_prices or t in failed]
+    price_store.publish()
+
+    stale = []
+    for ticker in tickers:
+        entry = news_cache.load(ticker)
+        if entry is None or news_cache.age(entry) >= news_cache.FRESH_SECONDS:
+            stale.append(ticker)
+    with ThreadPoolExecutor(max_workers=NEWS_CONCURRENCY) as pool:
+        results = list(pool.map(refresh_news, stale))
+    news_errors = [t for t, headlines in zip(stale, results) if headlines is None]
+
+    return {
+        "tickers": len(tickers),
+        "price_errors": price_errors,
+        "news_refreshed": len(stale) - len(news_errors),
+        "news_errors": news_errors,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+class PrefetchScheduler:
+    """
+    Hilo que ejecuta refresh_universe periódicamente, con variación aleatoria del
+    intervalo y espera exponencial cuando el proveedor falla.
+    """
+
+    def __init__(self, tickers: Optional[list[str]] = None, interval: int = INTERVAL_SECONDS):
+        self.tickers = list(tickers or TOP_100_TICKERS)
+        self.interval = interval
+        self.failures = 0
+        self.last_summary: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def next_delay(self) -> float:
+        """Segundos hasta el próximo ciclo según los fallos consecutivos."""
+        base = min(self.interval * (2 ** self.failures), MAX_BACKOFF_SECONDS)
+        return base * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def run_once(self) -> dict:
+        """Ejecuta un ciclo y actualiza el contador de fallos."""
+        try:
+            summary = refresh_universe(self.tickers)
+        except Exception:
+            logger.exception("Fallo en el ciclo de prefetch")
+            self.failures += 1
+            return {"error": True}
+        news_checked = summary["news_refreshed"] + len(summary["news_errors"])
+        prices_failed = len(summary["price_errors"]) >= PRICE_FAILURE_RATIO * len(self.tickers)
+        news_failed = news_checked > 0 and len(summary["news_errors"]) >= NEWS_FAILURE_RATIO * news_checked
+        if prices_failed or news_failed:
+            self.failures += 1
+        else:
+            self.failures = 0
+        self.last_summary = summary
+        logger.info("Prefetch completado: %s", summary)
+        return summary
+
+    def _loop(self, initial_delay: float) -> None:
+        if self._stop.wait(initial_delay):
+            return
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.next_delay())
+
+    def start(self, initial_delay: Optional[float] = None) -> "PrefetchScheduler":
+        """
+        Arranca el hilo en segundo plano (idempotente).
+
+        Args:
+            initial_delay: Espera antes del primer ciclo; por defecto un valor aleatorio
+                pequeño para que varios procesos no arranquen a la vez.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        delay = random.uniform(0, 30) if initial_delay is None else initial_delay
+        self._thread = threading.Thread(target=self._loop, args=(delay,), name="prefetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Detiene el hilo al terminar el ciclo en curso."""
+        self._stop.set()
+
+
+_scheduler: Optional[PrefetchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def start_in_process() -> PrefetchScheduler:
+    """Arranca (una sola vez por proceso) el planificador dentro de la aplicación."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PrefetchScheduler()
+        return _scheduler.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresca en segundo plano las cachés de TradeWise.")
+    parser.add_argument("--interval", type=int, default=INTERVAL_SECONDS, help="Segundos entre ciclos.")
+    parser.add_argument("--once", action="store_true", help="Ejecuta un único ciclo y termina.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    scheduler = PrefetchScheduler(interval=args.interval)
+    if args.once:
+        print(scheduler.run_once())
+        return
+    while True:
+        scheduler.run_once()
+        time.sleep(scheduler.next_delay())
+
+
+if __name__ == "__main__":
+    main()
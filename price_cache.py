@@ -0,0 +1,219 @@
+"""
+price_cache.py
+Almacén local de precios OHLCV en disco: un archivo Parquet por ticker más un
+pequeño índice JSON con el último período descargado de cada uno. Las escrituras del
+índice se serializan con un cerrojo de archivo, así que varios procesos (la app y
+batch_report.py, por ejemplo) pueden compartir la caché sin perder entradas.
+Permite descargas incrementales (solo las barras nuevas) y servir datos sin
+conexión una vez que la caché está caliente.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Directorio raíz de la caché (configurable por entorno)
+CACHE_DIR = Path(os.getenv("TRADEWISE_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+PRICES_DIR = CACHE_DIR / "prices"
+INDEX_FILE = PRICES_DIR / "index.json"
+LOCK_FILE = PRICES_DIR / "index.lock"
+
+# Segundos durante los que una descarga se considera reciente y no se vuelve a consultar yfinance
+REFRESH_SECONDS = int(os.getenv("TRADEWISE_PRICE_REFRESH_SECONDS", "900"))
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _locked() -> Iterator[None]:
+    """
+    Exclusión mutua entre hilos y entre procesos para leer, modificar y escribir el índice
+    (flock en POSIX, msvcrt.locking en Windows).
+    """
+    with _lock:
+        PRICES_DIR.mkdir(parents=True, exist_ok=True)
+        with open(LOCK_FILE, "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            else:
+                fh.seek(0)
+                # LK_LOCK reintenta durante ~10 s; se repite hasta obtenerlo
+                while True:
+                    try:
+                        msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _ticker_path(ticker: str) -> Path:
+    """Ruta del archivo Parquet de un ticker."""
+    return PRICES_DIR / f"{ticker.upper()}.parquet"
+
+
+def _read_index() -> dict:
+    """Lee el índice de metadatos; vacío si no existe o está corrupto."""
+    try:
+        with open(INDEX_FILE, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_atomic(path: Path, writer) -> None:
+    """
+    Escribe un archivo sin dejar lecturas a medias: writer(tmp) escribe en un temporal del
+    mismo directorio, que luego sustituye al archivo con un renombrado atómico.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    writer(tmp)
+    os.replace(tmp, path)
+
+
+def _write_index(index: dict) -> None:
+    """Persiste el índice de metadatos de forma atómica."""
+    write_atomic(
+        INDEX_FILE,
+        lambda tmp: tmp.write_text(json.dumps(index, indent=1, sort_keys=True), encoding="utf-8"),
+    )
+
+
+def get_meta(ticker: str) -> Optional[dict]:
+    """
+    Devuelve los metadatos cacheados de un ticker.
+
+    Args:
+        ticker: Símbolo del activo.
+
+    Returns:
+        Diccionario con 'start' (inicio solicitado cubierto, ISO), 'last' (última barra, ISO),
+        'fetched_at' (epoch de la última consulta), 'saved_at' (epoch de la última escritura
+        de barras) y 'rows'; None si no hay caché.
+    """
+    return _read_index().get(ticker.upper())
+
+
+def all_meta() -> dict[str, dict]:
+    """Metadatos de todos los tickers cacheados (ticker -> dict como en get_meta)."""
+    return _read_index()
+
+
+def is_fresh(ticker: str, max_age: Optional[int] = None) -> bool:
+    """Indica si el ticker se consultó hace menos de max_age segundos."""
+    return meta_is_fresh(get_meta(ticker), max_age)
+
+
+def meta_is_fresh(meta: Optional[dict], max_age: Optional[int] = None) -> bool:
+    """Como is_fresh, a partir de metadatos ya leídos (evita releer el índice)."""
+    if not meta:
+        return False
+    max_age = REFRESH_SECONDS if max_age is None else max_age
+    return time.time() - float(meta.get("fetched_at", 0)) < max_age
+
+
+def load_prices(ticker: str) -> Optional[pd.DataFrame]:
+    """
+    Carga el histórico cacheado de un ticker.
+
+    Args:
+        ticker: Símbolo del activo.
+
+    Returns:
+        DataFrame OHLCV indexado por fecha, o None si no hay caché legible.
+    """
+    path = _ticker_path(ticker)
+    if not path.exists():
+        return None
+    try:
+        data = pd.read_parquet(path)
+    except Exception:
+        return None
+    if data.empty:
+        return None
+    return data
+
+
+def save_prices(ticker: str, data: pd.DataFrame, start: Optional[str] = None, merge: bool = True) -> pd.DataFrame:
+    """
+    Guarda barras de un ticker, fusionándolas con las ya cacheadas.
+    Las barras nuevas sustituyen a las existentes con la misma fecha.
+
+    Args:
+        ticker: Símbolo del activo.
+        data: DataFrame OHLCV indexado por fecha.
+        start: Inicio (ISO) del rango solicitado que ya queda cubierto por la caché.
+        merge: Si False, reemplaza por completo el histórico cacheado.
+
+    Returns:
+        DataFrame resultante tal como quedó en disco.
+    """
+    ticker = ticker.upper()
+    with _locked():
+        existing = load_prices(ticker) if merge else None
+        if existing is not None and not existing.empty:
+            combined = pd.concat([existing, data])
+            combined = combined[~combined.index.duplicated(keep="last")].sort_index()
+        else:
+            combined = data.sort_index()
+        write_atomic(_ticker_path(ticker), lambda tmp: combined.to_parquet(tmp))
+
+        index = _read_index()
+        previous = index.get(ticker, {}) if merge else {}
+        covered = [s for s in (start, previous.get("start")) if s]
+        now = time.time()
+        index[ticker] = {
+            "start": min(covered) if covered else combined.index[0].date().isoformat(),
+            "last": combined.index[-1].date().isoformat(),
+            "fetched_at": now,
+            "saved_at": now,
+            "rows": int(len(combined)),
+        }
+        _write_index(index)
+    return combined
+
+
+def touch(ticker: str) -> None:
+    """Marca el ticker como consultado ahora aunque no hubiera barras nuevas."""
+    ticker = ticker.upper()
+    with _locked():
+        index = _read_index()
+        if ticker not in index:
+            return
+        index[ticker]["fetched_at"] = time.time()
+        _write_index(index)
+
+
+def clear(ticker: Optional[str] = None) -> None:
+    """Elimina la caché de un ticker o, si no se indica, la de todos."""
+    with _locked():
+        index = _read_index()
+        targets = [ticker.upper()] if ticker else list(index)
+        for symbol in targets:
+            index.pop(symbol, None)
+            try:
+                _ticker_path(symbol).unlink()
+            except OSError:
+                pass
+        if PRICES_DIR.exists():
+            _write_index(index)
@@ -0,0 +1,190 @@
+"""
+price_store.py
+Almacén compartido de precios, de solo lectura, para todas las sesiones y procesos.
+Cada versión es un único archivo NumPy (.npy) con las barras de todos los tickers
+concatenadas y un manifiesto JSON con el desplazamiento de cada ticker. Los lectores
+abren el archivo con memmap: el sistema operativo comparte sus páginas entre procesos
+y los DataFrames devueltos son vistas sin copia. Publicar escribe un archivo nuevo y
+sustituye el manifiesto con os.replace, sin bloquear a quien esté leyendo.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import price_cache
+
+STORE_DIR = price_cache.CACHE_DIR / "store"
+MANIFEST_FILE = STORE_DIR / "manifest.json"
+
+# Fila 0: fecha (días desde 1970-01-01); filas siguientes: estas columnas
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Versiones que se conservan en disco (lectores que aún tengan abierta una anterior)
+KEEP_VERSIONS = 3
+
+_lock = threading.Lock()
+# Versión abierta en este proceso: (identidad del manifiesto, manifiesto, array mapeado)
+_opened: Optional[tuple[tuple, dict, np.ndarray]] = None
+
+
+def _open() -> Optional[tuple[dict, np.ndarray]]:
+    """Manifiesto y array mapeado de la versión vigente; se reabre solo si cambió."""
+    global _opened
+    try:
+        stat = MANIFEST_FILE.stat()
+    except OSError:
+        return None
+    # os.replace crea un inodo nuevo: distingue versiones aunque coincida el mtime
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if _opened is not None and _opened[0] == identity:
+            return _opened[1], _opened[2]
+        try:
+            manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+            values = np.load(STORE_DIR / manifest["file"], mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        _opened = (identity, manifest, values)
+        return manifest, values
+
+
+def _to_block(data: pd.DataFrame) -> np.ndarray:
+    """Convierte un DataFrame OHLCV en un bloque (1 + columnas, barras) de float64."""
+    block = np.full((len(COLUMNS) + 1, len(data)), np.nan)
+    block[0] = data.index.values.astype("datetime64[D]").astype(np.int64)
+    for row, column in enumerate(COLUMNS, start=1):
+        if column in data.columns:
+            block[row] = data[column].to_numpy(dtype=np.float64)
+    return block
+
+
+def version() -> Optional[int]:
+    """Versión publicada vigente, o None si aún no hay ninguna."""
+    opened = _open()
+    return opened[0]["version"] if opened else None
+
+
+def load(ticker: str, saved_at: Optional[float] = None) -> Optional[pd.DataFrame]:
+    """
+    Histórico de un ticker como vista sin copia sobre la versión vigente.
+
+    Args:
+        ticker: Símbolo del activo.
+        saved_at: Si se indica, solo se devuelve si la versión publicada corresponde a
+            esa escritura de la caché de precios (ver price_cache.get_meta).
+
+    Returns:
+        DataFrame OHLCV indexado por fecha (de solo lectura), o None si no está publicado.
+    """
+    opened = _open()
+    if opened is None:
+        return None
+    manifest, values = opened
+    entry = manifest["tickers"].get(ticker.upper())
+    if entry is None or (saved_at is not None and entry.get("saved_at") != saved_at):
+        return None
+    block = values[:, entry["offset"]:entry["offset"] + entry["rows"]]
+    dates = block[0].astype(np.int64).astype("datetime64[D]").astype("datetime64[ns]")
+    return pd.DataFrame(
+        block[1:].T,
+        index=pd.DatetimeIndex(dates, name="Date"),
+        columns=manifest["columns"],
+        copy=False,
+    )
+
+
+def _save_array(tmp: Path, values: np.ndarray) -> None:
+    """Guarda el array en formato .npy en la ruta indicada (sin añadir extensión)."""
+    with open(tmp, "wb") as fh:
+        np.save(fh, values)
+
+
+def publish(tickers: Optional[list[str]] = None) -> Optional[int]:
+    """
+    Publica una versión nueva con el contenido actual de la caché de precios.
+    Los tickers que no han cambiado desde la versión vigente se copian de ella sin
+    volver a leer su Parquet.
+
+    Args:
+        tickers: Tickers a incluir (por defecto, todos los de la caché).
+
+    Returns:
+        Número de la versión publicada, o None si no había nada que publicar.
+    """
+    index = price_cache.all_meta()
+    symbols = [t.upper() for t in tickers] if tickers else sorted(index)
+    current = _open()
+    previous = current[0]["tickers"] if current else {}
+
+    blocks, entries, offset = [], {}, 0
+    for ticker in symbols:
+        meta = index.get(ticker)
+        if not meta:
+            continue
+        old = previous.get(ticker)
+        if old is not None and meta.get("saved_at") is not None and old.get("saved_at") == meta.get("saved_at"):
+            block = np.array(current[1][:, old["offset"]:old["offset"] + old["rows"]])
+        else:
+            data = price_cache.load_prices(ticker)
+            if data is None:
+                continue
+            block = _to_block(data)
+        entries[ticker] = {
+            "offset": offset,
+            "rows": int(block.shape[1]),
+            "start": meta["start"],
+            "last": meta["last"],
+            "saved_at": meta.get("saved_at"),
+        }
+        blocks.append(block)
+        offset += block.shape[1]
+    if not blocks:
+        return None
+
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    number = time.time_ns()
+    name = f"prices_{number}_{os.getpid()}.npy"
+    values = np.concatenate(blocks, axis=1)
+    price_cache.write_atomic(STORE_DIR / name, lambda tmp: _save_array(tmp, values))
+    manifest = {
+        "version": number,
+        "file": name,
+        "columns": COLUMNS,
+        "published_at": time.time(),
+        "tickers": entries,
+    }
+    price_cache.write_atomic(MANIFEST_FILE, lambda tmp: tmp.write_text(json.dumps(manifest), encoding="utf-8"))
+    _remove_old_versions(keep=name)
+    return number
+
+
+def _remove_old_versions(keep: str) -> None:
+    """Borra los archivos de versiones antiguas, salvo las KEEP_VERSIONS más recientes."""
+    files = sorted(STORE_DIR.glob("prices_*.npy"), key=lambda p: int(p.name.split("_")[1]))
+    for path in files[:-KEEP_VERSIONS]:
+        if path.name == keep:
+            continue
+        try:
+            # En POSIX los lectores que lo tengan mapeado siguen funcionando
+            path.unlink()
+        except OSError:
+            pass
+
+
+def clear() -> None:
+    """Elimina todas las versiones publicadas."""
+    global _opened
+    with _lock:
+        _opened = None
+        for path in list(STORE_DIR.glob("prices_*.npy")) + [MANIFEST_FILE]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
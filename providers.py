@@ -0,0 +1,299 @@
+"""
+providers.py
+Proveedores intercambiables de datos de mercado y de LLM. data_fetcher solo usa de
+yfinance download() y Ticker(...).news, y llm_client solo usa de google.generativeai
+configure() y GenerativeModel(...).generate_content(); cualquier objeto con esa misma
+interfaz sirve de proveedor. Además de los reales incluye un proveedor de repetición, que
+lee precios y titulares grabados en disco, y un LLM simulado con latencia configurable,
+para probar la app (también con muchos usuarios a la vez) sin red ni cuota.
+
+Selección por variables de entorno:
+    TRADEWISE_DATA_PROVIDER=yfinance | replay   (replay lee TRADEWISE_REPLAY_DIR)
+    TRADEWISE_LLM_PROVIDER=gemini | mock        (mock: TRADEWISE_MOCK_LLM_TTFT y _TOTAL)
+
+Grabar fixtures para el proveedor de repetición:
+    python providers.py --tickers AAPL MSFT --out fixtures
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+# Barras intradía que se devuelven cuando no se indica desde cuándo (una sesión de 1m)
+SESSION_BARS = 390
+
+# Directorio de fixtures por defecto (junto al código, no relativo al directorio de trabajo)
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class ReplayYFinance:
+    """
+    Proveedor de datos que repite precios y titulares grabados con record_fixtures:
+
+        prices/<TICKER>.parquet               barras diarias OHLCV
+        intraday/<TICKER>_<intervalo>.parquet barras intradía (opcional)
+        news/<TICKER>.json                    noticias con el formato de yfinance
+
+    Las barras intradía se publican de una en una (una más por cada descarga intradía),
+    como si el mercado estuviera abierto. Los tickers sin grabación no devuelven datos.
+
+    Args:
+        root: Directorio de fixtures (por defecto, DEFAULT_FIXTURES).
+        latency: Segundos de espera por llamada (simula la ida y vuelta a Yahoo).
+        intraday_bars: Barras intradía publicadas al empezar.
+    """
+
+    def __init__(self, root: Path = DEFAULT_FIXTURES, latency: float = 0.0, intraday_bars: int = SESSION_BARS):
+        self.root = Path(root)
+        self.latency = latency
+        self.intraday_bars = intraday_bars
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._data: dict[str, Optional[pd.DataFrame]] = {}
+        self._intraday: dict[tuple[str, str], Optional[pd.DataFrame]] = {}
+
+    def _read(self, path: Path) -> Optional[pd.DataFrame]:
+        try:
+            return pd.read_parquet(path)
+        except (OSError, ValueError):
+            return None
+
+    def history(self, ticker: str) -> Optional[pd.DataFrame]:
+        """Histórico diario completo de un ticker, o None si no está grabado."""
+        if ticker not in self._data:
+            self._data[ticker] = self._read(self.root / "prices" / f"{ticker}.parquet")
+        return self._data[ticker]
+
+    def intraday(self, ticker: str, interval: str) -> Optional[pd.DataFrame]:
+        """Barras intradía grabadas de un ticker, o None si no hay."""
+        key = (ticker, interval)
+        if key not in self._intraday:
+            self._intraday[key] = self._read(self.root / "intraday" / f"{ticker}_{interval}.parquet")
+        return self._intraday[key]
+
+    def news(self, ticker: str) -> list[dict]:
+        """Noticias grabadas de un ticker (lista vacía si no hay)."""
+        try:
+            return json.loads((self.root / "news" / f"{ticker}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+
+    def _call(self) -> None:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def _daily_slice(self, ticker: str, start, end) -> Optional[pd.DataFrame]:
+        data = self.history(ticker)
+        if data is None:
+            return None
+        mask = pd.Series(True, index=data.index)
+        if start is not None:
+            mask &= data.index >= pd.Timestamp(start).normalize()
+        if end is not None:
+            mask &= data.index < pd.Timestamp(end)
+        return data[mask.to_numpy()]
+
+    def _intraday_slice(self, ticker: str, interval: str, start) -> Optional[pd.DataFrame]:
+        data = self.intraday(ticker, interval)
+        if data is None:
+            return None
+        with self._lock:
+            self.intraday_bars += 1
+            data = data.iloc[:self.intraday_bars]
+        if start is None:
+            return data.iloc[-SESSION_BARS:]
+        return data[data.index >= pd.Timestamp(start)]
+
+    def download(self, tickers, start=None, end=None, group_by="column", interval="1d", **kwargs) -> pd.DataFrame:
+        self._call()
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        if interval != "1d":
+            frames = {t: self._intraday_slice(t, interval, start) for t in symbols}
+        else:
+            frames = {t: self._daily_slice(t, start, end) for t in symbols}
+        frames = {t: data for t, data in frames.items() if data is not None}
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1)
+        if group_by != "ticker":
+            # Formato por columnas de yfinance: (Price, Ticker)
+            data = data.swaplevel(0, 1, axis=1).sort_index(axis=1)
+        return data
+
+    def Ticker(self, ticker: str):
+        self._call()
+        return types.SimpleNamespace(news=self.news(ticker))
+
+
+def _tokens(text: str) -> int:
+    """Tokens aproximados de un texto (4 caracteres por token)."""
+    return max(1, len(str(text)) // 4)
+
+
+def _response(text: str, usage: Optional[tuple[int, int]] = None):
+    """Respuesta con la misma forma que la de google.generativeai (usage: tokens de entrada y salida)."""
+    part = types.SimpleNamespace(text=text)
+    response = types.SimpleNamespace(candidates=[types.SimpleNamespace(content=types.SimpleNamespace(parts=[part]))])
+    if usage is not None:
+        response.usage_metadata = types.SimpleNamespace(prompt_token_count=usage[0], candidates_token_count=usage[1])
+    return response
+
+
+class MockGemini:
+    """
+    LLM simulado con la interfaz de google.generativeai: configure() y
+    GenerativeModel().generate_content(). Respeta max_output_tokens recortando el texto,
+    y el tiempo de generación es proporcional a los tokens devueltos. No necesita API key.
+
+    Args:
+        ttft: Segundos hasta el primer fragmento.
+        total: Segundos totales de generación del texto completo.
+        chunks: Número de fragmentos en modo streaming.
+        text: Texto a devolver.
+    """
+
+    requires_api_key = False
+
+    def __init__(self, ttft: float = 0.0, total: float = 0.0, chunks: int = 20, text: Optional[str] = None):
+        self.ttft = ttft
+        self.total = max(total, ttft)
+        self.chunks = chunks
+        self.text = text or ("Análisis sintético de prueba. " * 200).strip()
+        self.calls = 0
+        self._lock = threading.Lock()
+        mock = self
+
+        class GenerativeModel:
+            def __init__(self, name, **kwargs):
+                self.model_name = name
+
+            def generate_content(self, context, generation_config=None, stream=False, **kwargs):
+                with mock._lock:
+                    mock.calls += 1
+                limit = (generation_config or {}).get("max_output_tokens")
+                text = mock.text[:limit * 4] if limit else mock.text
+                usage = (_tokens(context), _tokens(text))
+                if stream:
+                    return mock._stream(text, usage)
+                time.sleep(mock.ttft + (mock.total - mock.ttft) * len(text) / len(mock.text))
+                return _response(text, usage)
+
+            def count_tokens(self, context):
+                return types.SimpleNamespace(total_tokens=_tokens(context))
+
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, **kwargs) -> None:
+        pass
+
+    def _stream(self, text: str, usage: tuple[int, int]):
+        time.sleep(self.ttft)
+        # Tamaño y ritmo de los fragmentos fijados por el texto completo
+        size = max(1, len(self.text) // self.chunks)
+        gap = (self.total - self.ttft) / max(1, self.chunks - 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(gap)
+            yield _response(piece, usage if i == len(pieces) - 1 else None)
+
+
+def data_provider():
+    """
+    Proveedor de datos elegido en TRADEWISE_DATA_PROVIDER (por defecto, yfinance).
+
+    Raises:
+        ValueError: si el nombre no es 'yfinance' ni 'replay'.
+    """
+    name = os.getenv("TRADEWISE_DATA_PROVIDER", "yfinance").strip().lower()
+    if name == "replay":
+        return ReplayYFinance(
+            os.getenv("TRADEWISE_REPLAY_DIR") or DEFAULT_FIXTURES,
+            latency=float(os.getenv("TRADEWISE_REPLAY_LATENCY", "0")),
+        )
+    if name != "yfinance":
+        raise ValueError(f"Proveedor de datos desconocido: {name}")
+    import yfinance
+    return yfinance
+
+
+def llm_provider():
+    """
+    Proveedor de LLM elegido en TRADEWISE_LLM_PROVIDER (por defecto, Gemini).
+
+    Returns:
+        Módulo google.generativeai, MockGemini, o None si Gemini no está instalado.
+
+    Raises:
+        ValueError: si el nombre no es 'gemini' ni 'mock'.
+    """
+    name = os.getenv("TRADEWISE_LLM_PROVIDER", "gemini").strip().lower()
+    if name == "mock":
+        return MockGemini(
+            ttft=float(os.getenv("TRADEWISE_MOCK_LLM_TTFT", "0.5")),
+            total=float(os.getenv("TRADEWISE_MOCK_LLM_TOTAL", "3.0")),
+        )
+    if name != "gemini":
+        raise ValueError(f"Proveedor de LLM desconocido: {name}")
+    try:
+        import google.generativeai as module
+    except ImportError:
+        return None
+    return module
+
+
+def record_fixtures(tickers: list[str], root: Path, months: int = 120, intervals: tuple[str, ...] = ()) -> dict[str, int]:
+    """
+    Graba precios y titulares actuales (del proveedor configurado) para repetirlos con ReplayYFinance.
+
+    Args:
+        tickers: Tickers a grabar.
+        root: Directorio de fixtures (se crea si no existe).
+        months: Meses de histórico diario.
+        intervals: Intervalos intradía a grabar además del diario (ej: ('1m', '5m')).
+
+    Returns:
+        Diccionario ticker -> barras diarias grabadas (0 si no hubo datos).
+    """
+    from data_fetcher import get_historical_data, get_intraday_bars, get_news_headlines
+
+    root = Path(root)
+    for folder in ("prices", "intraday", "news"):
+        (root / folder).mkdir(parents=True, exist_ok=True)
+    recorded = {}
+    for ticker in tickers:
+        ticker = ticker.upper()
+        data = get_historical_data(ticker, months=months, use_cache=False)
+        recorded[ticker] = 0 if data is None else len(data)
+        if data is not None and not data.empty:
+            data.to_parquet(root / "prices" / f"{ticker}.parquet")
+        for interval in intervals:
+            bars = get_intraday_bars(ticker, interval)
+            if bars is not None and not bars.empty:
+                bars.to_parquet(root / "intraday" / f"{ticker}_{interval}.parquet")
+        news = [{"title": title} for title in get_news_headlines(ticker, max_headlines=50)]
+        (root / "news" / f"{ticker}.json").write_text(json.dumps(news, ensure_ascii=False), encoding="utf-8")
+    return recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graba fixtures de precios y titulares para el proveedor de repetición.")
+    parser.add_argument("--tickers", nargs="+", required=True, help="Tickers a grabar.")
+    parser.add_argument("--out", type=Path, default=DEFAULT_FIXTURES, help="Directorio de salida.")
+    parser.add_argument("--months", type=int, default=120, help="Meses de histórico diario.")
+    parser.add_argument("--intraday", nargs="*", default=[], help="Intervalos intradía a grabar (1m, 5m).")
+    args = parser.parse_args()
+    recorded = record_fixtures(args.tickers, args.out, months=args.months, intervals=tuple(args.intraday))
+    print(json.dumps(recorded))
+
+
+if __name__ == "__main__":
+    main()
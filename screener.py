@@ -0,0 +1,171 @@
+"""
+screener.py
+Screener del universo TOP_100_TICKERS: calcula una instantánea de indicadores para
+todos los tickers de una vez, la guarda en disco y permite filtrarla y ordenarla.
+La vista del screener lee solo la instantánea guardada, sin descargar datos al cargar.
+"""
+
+import math
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher import get_historical_data_many
+from indicators import compute_all_indicators_many, compute_indicators
+from price_cache import CACHE_DIR
+from tickers import TOP_100_TICKERS
+
+SNAPSHOT_FILE = CACHE_DIR / "indicator_snapshot.parquet"
+
+# Umbrales clásicos del RSI
+RSI_OVERBOUGHT = 70.0
+RSI_OVERSOLD = 30.0
+
+# Indicadores del registro que se añaden a los básicos del panel
+SNAPSHOT_INDICATORS = ("macd", "bollinger")
+
+RSI_ZONES = ("Sobreventa", "Neutral", "Sobrecompra")
+TRENDS = ("Alcista", "Bajista")
+
+
+def _rsi_zone(rsi: Optional[float]) -> Optional[str]:
+    """Clasifica un RSI en sobreventa, neutral o sobrecompra."""
+    if rsi is None or pd.isna(rsi):
+        return None
+    if rsi >= RSI_OVERBOUGHT:
+        return "Sobrecompra"
+    if rsi <= RSI_OVERSOLD:
+        return "Sobreventa"
+    return "Neutral"
+
+
+def build_snapshot(
+    tickers: Optional[list[str]] = None,
+    months: int = 6,
+    errors: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """
+    Calcula la instantánea de indicadores de todo el universo y la guarda en disco.
+
+    Args:
+        tickers: Tickers a incluir (por defecto TOP_100_TICKERS).
+        months: Meses de historia usados para los indicadores.
+        errors: Lista opcional donde se añaden los tickers cuyos precios no se pudieron
+            refrescar (ver get_historical_data_many).
+
+    Returns:
+        DataFrame con una fila por ticker con datos.
+    """
+    tickers = list(tickers or TOP_100_TICKERS)
+    prices = get_historical_data_many(tickers, months=months, errors=errors)
+    values = compute_all_indicators_many(prices)
+    rows = []
+    for ticker in tickers:
+        ind = values.get(ticker)
+        if not ind or ind["last_close"] is None:
+            continue
+        row = {"ticker": ticker, **ind, **compute_indicators(prices[ticker], SNAPSHOT_INDICATORS)}
+        close, ma_20, ma_50 = ind["last_close"], ind["ma_20"], ind["ma_50"]
+        row["pct_vs_ma20"] = (close / ma_20 - 1.0) * 100 if ma_20 else None
+        row["pct_vs_ma50"] = (close / ma_50 - 1.0) * 100 if ma_50 else None
+        if ma_20 is not None and ma_50 is not None:
+            row["trend"] = "Alcista" if ma_20 > ma_50 else "Bajista"
+        else:
+            row["trend"] = None
+        row["rsi_zone"] = _rsi_zone(ind["rsi"])
+        rows.append(row)
+    snapshot = pd.DataFrame(rows)
+    snapshot["updated_at"] = time.time()
+    save_snapshot(snapshot)
+    return snapshot
+
+
+def save_snapshot(snapshot: pd.DataFrame) -> None:
+    """Guarda la instantánea de forma atómica."""
+    SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = SNAPSHOT_FILE.with_name(f".{SNAPSHOT_FILE.name}.{os.getpid()}.tmp")
+    snapshot.to_parquet(tmp, index=False)
+    os.replace(tmp, SNAPSHOT_FILE)
+
+
+def snapshot_mtime() -> Optional[float]:
+    """Fecha de modificación de la instantánea guardada (sirve como clave de caché)."""
+    try:
+        return SNAPSHOT_FILE.stat().st_mtime
+    except OSError:
+        return None
+
+
+def load_snapshot() -> Optional[pd.DataFrame]:
+    """
+    Lee la instantánea guardada.
+
+    Returns:
+        DataFrame de la instantánea, o None si todavía no se ha calculado.
+    """
+    try:
+        return pd.read_parquet(SNAPSHOT_FILE)
+    except Exception:
+        return None
+
+
+def volatility_ceiling(snapshot: pd.DataFrame) -> float:
+    """
+    Tope de la escala de volatilidad del screener, en porcentaje entero redondeado hacia
+    arriba para que el ticker más volátil quede dentro. 100 si no hay valores finitos.
+    """
+    values = snapshot["volatility"].to_numpy(dtype=float) * 100
+    values = values[np.isfinite(values)]
+    if not values.size:
+        return 100.0
+    return float(max(math.ceil(values.max()), 1))
+
+
+def filter_snapshot(
+    snapshot: pd.DataFrame,
+    rsi_zones: Optional[list[str]] = None,
+    trend: Optional[str] = None,
+    above_ma20: Optional[bool] = None,
+    above_ma50: Optional[bool] = None,
+    volatility_range: Optional[tuple[float, float]] = None,
+    sort_by: str = "rsi",
+    ascending: bool = True,
+) -> pd.DataFrame:
+    """
+    Filtra y ordena la instantánea.
+
+    Args:
+        snapshot: DataFrame devuelto por build_snapshot o load_snapshot.
+        rsi_zones: Zonas de RSI a conservar (ver RSI_ZONES).
+        trend: 'Alcista' (SMA20 > SMA50) o 'Bajista'.
+        above_ma20: True para precio sobre SMA20, False para precio bajo SMA20.
+        above_ma50: Igual que above_ma20 para la SMA50.
+        volatility_range: Tupla (mínimo, máximo) de volatilidad anualizada en decimal.
+            Los tickers sin volatilidad se descartan al aplicar este filtro.
+        sort_by: Columna de ordenación.
+        ascending: Orden ascendente si True.
+
+    Returns:
+        DataFrame filtrado y ordenado.
+    """
+    mask = pd.Series(True, index=snapshot.index)
+    if rsi_zones:
+        mask &= snapshot["rsi_zone"].isin(rsi_zones)
+    if trend:
+        mask &= snapshot["trend"] == trend
+    if above_ma20 is not None:
+        mask &= (snapshot["pct_vs_ma20"] > 0) == above_ma20
+        mask &= snapshot["pct_vs_ma20"].notna()
+    if above_ma50 is not None:
+        mask &= (snapshot["pct_vs_ma50"] > 0) == above_ma50
+        mask &= snapshot["pct_vs_ma50"].notna()
+    if volatility_range is not None:
+        low, high = volatility_range
+        mask &= snapshot["volatility"].between(low, high)
+    result = snapshot[mask]
+    if sort_by in result.columns:
+        result = result.sort_values(sort_by, ascending=ascending, na_position="last")
+    return result.reset_index(drop=True)
@@ -0,0 +1,209 @@
+"""
+telemetry.py
+Instrumentación ligera de tiempos por etapa y contadores de eventos.
+Los tiempos se acumulan por proceso (para percentiles como el p95) y, si hay una
+traza activa, también en la traza de la petición en curso (panel de diagnóstico).
+Exporta en formato de texto de Prometheus o como JSON.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Muestras recientes que se guardan por etapa para calcular percentiles
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_totals: dict[str, list] = defaultdict(lambda: [0, 0.0])  # etapa -> [cuenta, suma]
+_counters: dict[str, int] = defaultdict(int)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "tradewise_trace", default=None
+)
+
+
+class Trace:
+    """Tiempos y eventos registrados durante una petición concreta."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: list[tuple[str, float, float]] = []  # (etapa, inicio relativo, duración)
+        self.counters: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, started: Optional[float] = None) -> None:
+        """Añade una etapa medida a la traza."""
+        offset = (started if started is not None else time.perf_counter() - seconds) - self.started
+        with self._lock:
+            self.spans.append((stage, offset, seconds))
+
+    def count(self, event: str, amount: int = 1) -> None:
+        """Suma un evento a los contadores de la traza."""
+        with self._lock:
+            self.counters[event] += amount
+
+    def rows(self) -> list[dict]:
+        """Etapas de la traza ordenadas por inicio, en milisegundos."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s[1])
+        return [
+            {"etapa": stage, "inicio_ms": round(offset * 1000, 1), "duracion_ms": round(seconds * 1000, 1)}
+            for stage, offset, seconds in spans
+        ]
+
+
+def record(stage: str, seconds: float, started: Optional[float] = None) -> None:
+    """
+    Registra la duración de una etapa en el proceso y en la traza activa.
+
+    Args:
+        stage: Nombre de la etapa (ej: 'price_fetch').
+        seconds: Duración en segundos.
+        started: Instante de inicio (time.perf_counter), si se conoce.
+    """
+    with _lock:
+        _samples[stage].append(seconds)
+        totals = _totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds, started)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Mide el bloque como una etapa (también si lanza excepción)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started, started)
+
+
+def submit(pool, stage: str, func, *args, **kwargs):
+    """
+    Envía func a un pool de hilos midiendo su duración como etapa y propagando
+    la traza activa al hilo que la ejecuta.
+
+    Args:
+        pool: Executor (ej: ThreadPoolExecutor).
+        stage: Nombre de la etapa.
+        func: Función a ejecutar con args y kwargs.
+
+    Returns:
+        Future del pool.
+    """
+    def timed():
+        with span(stage):
+            return func(*args, **kwargs)
+
+    return pool.submit(contextvars.copy_context().run, timed)
+
+
+def incr(event: str, amount: int = 1) -> None:
+    """
+    Incrementa un contador de eventos (aciertos de caché, errores del proveedor...).
+
+    Args:
+        event: Nombre del evento (ej: 'price_cache_hit').
+        amount: Cantidad a sumar.
+    """
+    with _lock:
+        _counters[event] += amount
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(event, amount)
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """
+    Activa una traza para la petición en curso. Las etapas medidas en este contexto
+    (y en hilos lanzados con contextvars.copy_context) se añaden a ella.
+    """
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Percentil por el método del rango más cercano."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def snapshot() -> dict:
+    """
+    Resumen de todas las etapas y contadores del proceso.
+
+    Returns:
+        Diccionario con 'stages' (count, sum, p50, p95, p99, max en segundos) y 'counters'.
+    """
+    with _lock:
+        samples = {stage: list(values) for stage, values in _samples.items()}
+        totals = {stage: tuple(values) for stage, values in _totals.items()}
+        counters = dict(_counters)
+    stages = {}
+    for stage, values in samples.items():
+        count, total = totals[stage]
+        stages[stage] = {
+            "count": count,
+            "sum": round(total, 6),
+            "p50": round(_percentile(values, 0.50), 6),
+            "p95": round(_percentile(values, 0.95), 6),
+            "p99": round(_percentile(values, 0.99), 6),
+            "max": round(max(values), 6) if values else 0.0,
+        }
+    return {"stages": stages, "counters": counters}
+
+
+def to_json() -> dict:
+    """Alias de snapshot() pensado para volcados JSON."""
+    return snapshot()
+
+
+def to_prometheus() -> str:
+    """
+    Exporta las métricas en formato de texto de Prometheus.
+
+    Returns:
+        Texto con un summary de segundos por etapa y un counter por evento.
+    """
+    data = snapshot()
+    lines = [
+        "# HELP tradewise_stage_seconds Duración de cada etapa del análisis.",
+        "# TYPE tradewise_stage_seconds summary",
+    ]
+    for stage, stats in sorted(data["stages"].items()):
+        for quantile in ("0.5", "0.95", "0.99"):
+            key = {"0.5": "p50", "0.95": "p95", "0.99": "p99"}[quantile]
+            lines.append(f'tradewise_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+        lines.append(f'tradewise_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]}')
+        lines.append(f'tradewise_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    lines.extend([
+        "# HELP tradewise_events_total Eventos contados (cachés, errores del proveedor).",
+        "# TYPE tradewise_events_total counter",
+    ])
+    for event, value in sorted(data["counters"].items()):
+        lines.append(f'tradewise_events_total{{event="{event}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Borra todas las métricas del proceso."""
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
@@ -0,0 +1,10 @@
+"""
+tests/conftest.py
+Las pruebas usan una caché en disco temporal: la variable se fija antes de importar
+price_cache, que lee TRADEWISE_CACHE_DIR al cargarse.
+"""
+
+import os
+import tempfile
+
+os.environ["TRADEWISE_CACHE_DIR"] = tempfile.mkdtemp(prefix="tradewise-tests-")
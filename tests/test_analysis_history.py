@@ -0,0 +1,54 @@
+"""
+tests/test_analysis_history.py
+El historial solo añade filas, normaliza la fecha de la última barra y las variaciones se
+comparan con la ejecución anterior con otra barra.
+"""
+
+import pandas as pd
+
+import analysis_history
+import llm_cache
+import llm_client
+from llm_client import analysis_cache_key, start_analysis_stream
+
+
+def _record(context: str, last_bar, result: str = "análisis", rsi: float = 50.0):
+    return analysis_history.record(
+        "AAPL", "Moderado", "Medio plazo", "full", context, {"rsi": rsi}, result, last_bar=last_bar,
+    )
+
+
+def test_records_are_always_appended():
+    analysis_history.clear()
+    first = _record("contexto", "2024-01-02 00:00:00")
+    second = _record("contexto", "2024-01-02 00:00:00", result="otro")
+    assert second != first
+    assert analysis_history.count("AAPL") == 2
+    assert analysis_history.get(first)["result"] == "análisis"
+    assert analysis_history.latest("AAPL")["result"] == "otro"
+
+
+def test_bar_key_single_format():
+    expected = "2024-01-02 00:00:00"
+    assert analysis_history.bar_key(pd.Timestamp("2024-01-02")) == expected
+    assert analysis_history.bar_key(pd.Timestamp("2024-01-02", tz="America/New_York")) == expected
+    assert analysis_history.bar_key("2024-01-02T00:00:00") == expected
+    assert analysis_history.bar_key("2024-01-02") == expected
+    assert analysis_history.bar_key(None) is None
+
+
+def test_previous_run_uses_older_bar():
+    analysis_history.clear()
+    _record("día 1", pd.Timestamp("2024-01-02"), rsi=40.0)
+    _record("día 2", "2024-01-03T00:00:00", rsi=45.0)
+    previous = analysis_history.recent("AAPL", limit=1, before_bar="2024-01-03")
+    assert [run["indicators"]["rsi"] for run in previous] == [40.0]
+
+
+def test_cached_stream_reports_its_source(monkeypatch):
+    # La app solo guarda en el historial lo que genera el modelo
+    monkeypatch.setattr(llm_client, "genai", False)
+    llm_cache.put(analysis_cache_key("contexto guardado", "full"), llm_client.MODEL_NAME, "guardado")
+    stream = start_analysis_stream("contexto guardado")
+    assert "".join(stream) == "guardado"
+    assert stream.source == "cache"
@@ -0,0 +1,42 @@
+"""
+tests/test_backtest.py
+El backtest vectorizado debe reproducir una curva de capital calculada a mano: la
+posición del cierre de t se aplica al retorno de t+1 y cada cambio de posición paga el coste.
+"""
+
+import numpy as np
+import pytest
+
+from backtest import _hold_positions, evaluate, sma_matrix
+
+CLOSE = np.array([100.0, 110.0, 99.0, 99.0, 108.9])
+# Retornos: +10 %, -10 %, 0 %, +10 %
+POSITIONS = np.array([[1.0, 1.0, 0.0, 1.0, 1.0]])
+
+
+def test_equity_curve_without_costs():
+    metrics = evaluate(POSITIONS, CLOSE)
+    # Capital: 1.10 -> 0.99 -> 0.99 (fuera) -> 1.089
+    assert metrics["total_return"][0] == pytest.approx(0.089)
+    assert metrics["max_drawdown"][0] == pytest.approx(0.99 / 1.10 - 1.0)
+    assert metrics["trades"][0] == 2
+    assert metrics["exposure"][0] == pytest.approx(0.75)
+
+
+def test_equity_curve_with_costs():
+    # 100 pb por cambio de posición: se entra el día 0, se sale el 2 y se vuelve a entrar el 3
+    metrics = evaluate(POSITIONS, CLOSE, cost_bps=100)
+    equity = 1.09 * 0.90 * 0.99 * 1.09
+    assert metrics["total_return"][0] == pytest.approx(equity - 1.0)
+
+
+def test_signals_are_held_until_the_opposite_signal():
+    entries = np.array([[False, True, False, False, False]])
+    exits = np.array([[False, False, False, True, False]])
+    assert _hold_positions(entries, exits).tolist() == [[0.0, 1.0, 1.0, 0.0, 0.0]]
+
+
+def test_sma_matrix_matches_hand_values():
+    smas = sma_matrix(CLOSE, [2, 5])
+    assert smas[0, 1:].tolist() == pytest.approx([105.0, 104.5, 99.0, 103.95])
+    assert np.isnan(smas[1, :4]).all() and smas[1, 4] == pytest.approx(103.38)
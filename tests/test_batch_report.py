@@ -0,0 +1,48 @@
+"""
+tests/test_batch_report.py
+El limitador no supera su ritmo medio y el archivo de salida sirve de punto de control:
+al relanzar solo se generan las combinaciones que no terminaron con éxito.
+"""
+
+import json
+import types
+
+import pytest
+
+import batch_report
+from batch_report import TokenBucket, job_id, run_batch
+from benchmarks.fakes import install
+
+
+def test_token_bucket_keeps_the_rate(monkeypatch):
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(batch_report, "time", types.SimpleNamespace(monotonic=lambda: now[0], sleep=sleep))
+    bucket = TokenBucket(rate=2.0, capacity=1.0)
+    for _ in range(5):
+        bucket.acquire()
+    # El primer token está disponible al empezar; los otros cuatro llegan cada 0.5 s
+    assert now[0] == pytest.approx(2.0)
+
+
+def test_rerun_resumes_from_the_output(tmp_path):
+    output = tmp_path / "informe.jsonl"
+    tickers, profiles, horizons = ["AAPL", "MSFT"], ["Moderado"], ["Corto plazo"]
+    with open(output, "w", encoding="utf-8") as fh:
+        fh.write(json.dumps({"id": job_id("AAPL", "Moderado", "Corto plazo"), "success": True}) + "\n")
+        fh.write(json.dumps({"id": job_id("MSFT", "Moderado", "Corto plazo"), "success": False}) + "\n")
+        fh.write('{"id": "línea a medias')
+
+    with install() as (_, gemini):
+        summary = run_batch(tickers, profiles, horizons, output, rpm=6000, use_cache=False, mode="fast")
+        assert summary["skipped"] == 1 and summary["ok"] == 1 and summary["failed"] == 0
+        calls = gemini.calls
+
+        # Con todo generado, relanzar no llama al modelo
+        summary = run_batch(tickers, profiles, horizons, output, rpm=6000, use_cache=False, mode="fast")
+        assert summary["skipped"] == 2 and summary["ok"] == 0
+        assert gemini.calls == calls
+    assert batch_report.load_done(output) == {job_id(t, "Moderado", "Corto plazo") for t in tickers}
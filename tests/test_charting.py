@@ -0,0 +1,30 @@
+"""
+tests/test_charting.py
+LTTB devuelve exactamente 'threshold' puntos en orden, conserva los extremos de la serie
+y los picos aislados, y no toca las series que ya son cortas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from charting import decimate, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_extrema():
+    rng = np.random.default_rng(7)
+    n, threshold = 10_000, 500
+    y = 100 + rng.normal(0, 0.5, n)
+    y[3_333] += 40
+    y[6_666] -= 40
+    indices = lttb_indices(np.arange(n), y, threshold)
+    assert len(indices) == threshold
+    assert (np.diff(indices) > 0).all()
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert {int(np.argmax(y)), int(np.argmin(y))} <= set(indices.tolist())
+
+
+def test_short_series_are_untouched():
+    assert lttb_indices(np.arange(10), np.arange(10.0), 20).tolist() == list(range(10))
+    series = pd.Series(np.arange(50.0), index=pd.bdate_range("2024-01-01", periods=50))
+    assert decimate(series, max_points=100).equals(series)
+    assert len(decimate(series, max_points=20)) == 20
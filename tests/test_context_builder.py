@@ -0,0 +1,69 @@
+"""
+tests/test_context_builder.py
+Los titulares se compactan en los dos modos, y el presupuesto se mide con el contador
+de tokens del modelo cuando está disponible.
+"""
+
+import llm_client
+from benchmarks.fakes import install
+from context_builder import build_context, compact_headlines, estimate_tokens
+from providers import MockGemini
+
+HEADLINES = [
+    "Apple presenta resultados trimestrales récord",
+    "Apple presenta resultados trimestrales récord, según Reuters",
+    "La Fed mantiene los tipos de interés",
+] + [f"Noticia número {i} sobre el mercado de valores y la tecnología" for i in range(40)]
+
+
+def test_full_mode_dedupes_and_budgets_headlines():
+    context = build_context("AAPL", "Moderado", "Mediano plazo", {}, HEADLINES, mode="full")
+    lines = [line for line in context.splitlines() if line.startswith("- ") and "Noticia" in line]
+    assert "según Reuters" not in context
+    assert 0 < len(lines) < 40
+
+
+def test_budget_uses_the_given_counter():
+    calls = []
+
+    def counter(texts):
+        calls.append(list(texts))
+        return [10] * len(texts)
+
+    kept = compact_headlines(HEADLINES, budget_tokens=25, count_tokens=counter)
+    assert len(kept) == 2
+    assert len(calls) == 1
+
+
+def test_count_tokens_asks_the_model_and_falls_back_offline(monkeypatch):
+    class Counting(MockGemini):
+        def __init__(self):
+            super().__init__()
+            base = self.GenerativeModel
+            counted = self.counted = []
+
+            class GenerativeModel(base):
+                def count_tokens(self, context):
+                    counted.append(context)
+                    return super().count_tokens(context)
+
+            self.GenerativeModel = GenerativeModel
+
+    llm_client._token_counts.clear()
+    gemini = Counting()
+    text = "x" * 400
+    with install(gemini=gemini):
+        assert llm_client.count_tokens([text, text]) == [100, 100]
+        assert llm_client.count_tokens([text]) == [100]
+    assert gemini.counted == [text]
+
+    # Sin proveedor de LLM: estimación local (9 caracteres -> 3 tokens)
+    llm_client._token_counts.clear()
+    monkeypatch.setattr(llm_client, "genai", False)
+    assert llm_client.count_tokens(["abcdefghi"]) == [estimate_tokens("abcdefghi")] == [3]
+
+
+def test_indicator_header_names_the_window():
+    assert "(últimos 6 meses)" in build_context("AAPL", "Moderado", "Mediano plazo", {}, [])
+    context = build_context("AAPL", "Moderado", "Mediano plazo", {}, [], months=12)
+    assert "(últimos 12 meses)" in context and "6 meses" not in context
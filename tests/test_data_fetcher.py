@@ -0,0 +1,71 @@
+"""
+tests/test_data_fetcher.py
+La descarga incremental vuelve a pedir desde la penúltima barra: sustituye las barras
+solapadas y añade las nuevas, y si la barra solapada cambió (ajuste por dividendos o
+splits) descarga de nuevo todo el histórico.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import data_fetcher
+import price_cache
+
+DATES = pd.bdate_range("2024-01-01", periods=6)
+
+
+def _bars(dates, closes) -> pd.DataFrame:
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame(
+        {"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1000.0},
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+
+
+def _cached(ticker: str) -> tuple[pd.DataFrame, dict]:
+    price_cache.clear(ticker)
+    cached = price_cache.save_prices(ticker, _bars(DATES[:5], [10, 11, 12, 13, 14]), start="2024-01-01", merge=False)
+    return cached, price_cache.get_meta(ticker)
+
+
+def _no_download(*args):
+    raise AssertionError("no debe descargar el histórico completo")
+
+
+def test_delta_replaces_overlap_and_appends(monkeypatch):
+    cached, meta = _cached("DLTA")
+    monkeypatch.setattr(data_fetcher, "_download", _no_download)
+    # Desde la penúltima barra: la misma, la última corregida (sesión cerrada) y una nueva
+    newer = _bars(DATES[3:], [13, 14.5, 15])
+    result = data_fetcher._apply_delta("DLTA", cached, meta, newer, datetime(2024, 1, 9))
+    assert result["Close"].tolist() == [10, 11, 12, 13, 14.5, 15]
+    assert price_cache.load_prices("DLTA")["Close"].tolist() == [10, 11, 12, 13, 14.5, 15]
+
+
+def test_adjusted_overlap_forces_full_download(monkeypatch):
+    cached, meta = _cached("ADJ")
+    calls = []
+
+    def download(ticker, start, end):
+        calls.append((ticker, start))
+        return _bars(DATES, [5, 5.5, 6, 6.5, 7, 7.5])
+
+    monkeypatch.setattr(data_fetcher, "_download", download)
+    newer = _bars(DATES[3:], [6.5, 7, 7.5])
+    result = data_fetcher._apply_delta("ADJ", cached, meta, newer, datetime(2024, 1, 9))
+    assert calls == [("ADJ", datetime(2024, 1, 1))]
+    assert result["Close"].tolist() == [5, 5.5, 6, 6.5, 7, 7.5]
+    assert price_cache.get_meta("ADJ")["start"] == "2024-01-01"
+
+
+def test_no_new_bars_only_marks_the_check():
+    cached, meta = _cached("IDLE")
+    with price_cache._locked():
+        index = price_cache._read_index()
+        index["IDLE"]["fetched_at"] = 0
+        price_cache._write_index(index)
+    result = data_fetcher._apply_delta("IDLE", cached, meta, cached.iloc[:0], datetime(2024, 1, 9))
+    assert result is cached
+    assert price_cache.is_fresh("IDLE")
@@ -0,0 +1,29 @@
+"""
+tests/test_indicator_state.py
+Tras cada update() incremental, los indicadores deben coincidir con compute_all_indicators
+sobre las mismas ventanas (la volatilidad, sobre los últimos VOLATILITY_WINDOW retornos).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_state import VOLATILITY_WINDOW, IndicatorState
+from indicators import compute_all_indicators
+
+
+def test_incremental_updates_match_full_recompute():
+    rng = np.random.default_rng(4)
+    n = 400
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    prices = pd.DataFrame({"Close": close}, index=pd.bdate_range("2023-01-02", periods=n))
+
+    state = IndicatorState.from_series(prices["Close"].iloc[:30])
+    for end in range(31, n + 1):
+        state.update(close[end - 1])
+        incremental = state.snapshot()
+        expected = compute_all_indicators(prices.iloc[:end])
+        window = compute_all_indicators(prices.iloc[max(end - VOLATILITY_WINDOW - 1, 0):end])
+        for key in ("ma_20", "ma_50", "rsi", "last_close"):
+            assert incremental[key] == pytest.approx(expected[key], abs=1e-9), (end, key)
+        assert incremental["volatility"] == pytest.approx(window["volatility"], abs=1e-4), end
@@ -0,0 +1,33 @@
+"""
+tests/test_indicators.py
+El cálculo en panel y el del registro por ticker deben dar exactamente los mismos valores:
+van al contexto del LLM y a su clave de caché.
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicators import compute_all_indicators, compute_all_indicators_many
+
+
+def _prices(seed: int, tickers: int = 20) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    prices = {}
+    for i in range(tickers):
+        n = int(rng.integers(2, 300))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        prices[f"T{i}"] = pd.DataFrame(
+            {"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+             "Volume": rng.integers(100_000, 1_000_000, n)},
+            index=pd.bdate_range("2024-01-01", periods=n),
+        )
+    return prices
+
+
+def test_panel_matches_single_ticker_exactly():
+    prices = _prices(0)
+    many = compute_all_indicators_many(prices)
+    for ticker, data in prices.items():
+        single = compute_all_indicators(data)
+        for key in ("ma_20", "ma_50", "rsi", "volatility"):
+            assert single[key] == many[ticker][key], (ticker, key)
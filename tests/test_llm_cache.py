@@ -0,0 +1,50 @@
+"""
+tests/test_llm_cache.py
+Las entradas caducan tras el TTL, al superar MAX_ENTRIES se expulsa la menos usada
+recientemente e invalidate borra solo la entrada indicada.
+"""
+
+import types
+
+import pytest
+
+import llm_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr(llm_cache, "time", types.SimpleNamespace(time=lambda: now[0]))
+    llm_cache.clear()
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    llm_cache.put("k", "modelo", "texto")
+    clock[0] += 59
+    assert llm_cache.get("k", ttl=60) == "texto"
+    clock[0] += 2
+    assert llm_cache.get("k", ttl=60) is None
+    # La entrada caducada se borra: tampoco vuelve con un TTL mayor
+    assert llm_cache.get("k", ttl=3600) is None
+
+
+def test_evicts_least_recently_used(clock, monkeypatch):
+    monkeypatch.setattr(llm_cache, "MAX_ENTRIES", 3)
+    for key in ("a", "b", "c"):
+        llm_cache.put(key, "modelo", key)
+        clock[0] += 1
+    assert llm_cache.get("a") == "a"
+    clock[0] += 1
+    llm_cache.put("d", "modelo", "d")
+    assert [llm_cache.get(key) for key in ("a", "b", "c", "d")] == ["a", None, "c", "d"]
+    assert llm_cache.stats()["entries"] == 3
+
+
+def test_invalidate_removes_only_that_entry(clock):
+    llm_cache.put("a", "modelo", "a")
+    llm_cache.put("b", "modelo", "b")
+    assert llm_cache.invalidate("a") is True
+    assert llm_cache.invalidate("a") is False
+    assert llm_cache.get("a") is None
+    assert llm_cache.get("b") == "b"
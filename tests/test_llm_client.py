@@ -0,0 +1,108 @@
+"""
+tests/test_llm_client.py
+Peticiones idénticas simultáneas comparten una sola llamada (salvo si ignoran la caché),
+y los reintentos paran en el primer error no transitorio o al agotar MAX_RETRIES.
+"""
+
+import threading
+import time
+
+import pytest
+
+import llm_cache
+import llm_client
+from llm_client import analysis_cache_key, generate_analysis
+from providers import MockGemini
+
+
+class ScriptedGemini(MockGemini):
+    """MockGemini que lanza los errores indicados antes de responder."""
+
+    def __init__(self, errors=(), **kwargs):
+        super().__init__(**kwargs)
+        self.errors = list(errors)
+        base = self.GenerativeModel
+        mock = self
+
+        class GenerativeModel(base):
+            def generate_content(self, context, generation_config=None, stream=False, **kwargs):
+                with mock._lock:
+                    error = mock.errors.pop(0) if mock.errors else None
+                if error is not None:
+                    with mock._lock:
+                        mock.calls += 1
+                    raise error
+                return super().generate_content(context, generation_config, stream, **kwargs)
+
+        self.GenerativeModel = GenerativeModel
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    def install(**kwargs):
+        client = ScriptedGemini(**kwargs)
+        monkeypatch.setattr(llm_client, "genai", client)
+        monkeypatch.setattr(llm_client, "_backoff_delay", lambda attempt: 0.0)
+        return client
+    return install
+
+
+def _concurrent(calls):
+    """Lanza las llamadas a la vez y devuelve sus resultados en orden."""
+    results = [None] * len(calls)
+    barrier = threading.Barrier(len(calls))
+
+    def run(i, call):
+        barrier.wait()
+        results[i] = call()
+
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_identical_requests_share_one_call(gemini):
+    client = gemini(total=0.2, text="compartido")
+    results = _concurrent([lambda: generate_analysis("contexto compartido")] * 4)
+    assert results == [(True, "compartido")] * 4
+    assert client.calls == 1
+
+
+def test_forced_refresh_does_not_join_the_call_in_flight(gemini):
+    client = gemini(total=0.3, text="nuevo")
+    key = analysis_cache_key("contexto forzado")
+    first = threading.Thread(target=generate_analysis, args=("contexto forzado",))
+    first.start()
+    while key not in llm_client._flights:
+        time.sleep(0.001)
+    assert generate_analysis("contexto forzado", use_cache=False) == (True, "nuevo")
+    first.join()
+    assert client.calls == 2
+
+
+def test_retries_transient_errors_and_calls_hook_per_attempt(gemini):
+    client = gemini(errors=[RuntimeError("429 rate limit"), RuntimeError("503 unavailable")], text="ok")
+    attempts = []
+    success, result = generate_analysis("contexto reintento", use_cache=False, before_call=lambda: attempts.append(1))
+    assert (success, result) == (True, "ok")
+    assert client.calls == 3
+    assert len(attempts) == 3
+
+
+def test_stops_at_first_permanent_error(gemini):
+    client = gemini(errors=[RuntimeError("invalid argument")])
+    success, result = generate_analysis("contexto inválido", use_cache=False)
+    assert not success and "API key" in result
+    assert client.calls == 1
+
+
+def test_stops_after_max_retries(gemini, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 2)
+    client = gemini(errors=[RuntimeError("503 overloaded")] * 5)
+    success, result = generate_analysis("contexto saturado", use_cache=False)
+    assert not success and "503" in result
+    assert client.calls == 3
+    assert llm_cache.get(analysis_cache_key("contexto saturado")) is None
@@ -0,0 +1,29 @@
+"""
+tests/test_news_cache.py
+Los titulares casi idénticos se unifican con el texto ya guardado, y el prompt usa la
+misma deduplicación.
+"""
+
+import news_cache
+from context_builder import compact_headlines
+
+SAME_STORY = [
+    "Apple presenta resultados trimestrales récord",
+    "Apple presenta resultados trimestrales récord, según Reuters",
+]
+
+
+def test_dedupe_keeps_first_and_known_text():
+    assert news_cache.dedupe(SAME_STORY + ["La Fed mantiene los tipos"]) == [SAME_STORY[0], "La Fed mantiene los tipos"]
+    assert news_cache.dedupe(SAME_STORY[::-1], known=[SAME_STORY[0]]) == [SAME_STORY[0]]
+
+
+def test_save_merges_with_stored_headlines():
+    news_cache.save("DDUP", [SAME_STORY[0]])
+    stored = news_cache.save("DDUP", [SAME_STORY[1], "Nueva noticia sin relación"])
+    assert stored == [SAME_STORY[0], "Nueva noticia sin relación"]
+    assert news_cache.load("DDUP")["headlines"] == stored
+
+
+def test_prompt_uses_the_same_dedupe():
+    assert compact_headlines(SAME_STORY, budget_tokens=100) == news_cache.dedupe(SAME_STORY)
@@ -0,0 +1,65 @@
+"""
+tests/test_portfolio.py
+Estado incremental de covarianza: sincronización concurrente y reajustes del histórico.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio
+
+
+def _returns(days: int = 400, tickers: int = 6, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.0005, 0.02, size=(days, tickers))
+    values[rng.random(values.shape) < 0.02] = np.nan
+    index = pd.bdate_range("2020-01-01", periods=days)
+    return pd.DataFrame(values, index=index, columns=[f"T{i}" for i in range(tickers)])
+
+
+def _assert_same(state: portfolio.CovarianceState, returns: pd.DataFrame) -> None:
+    fresh = portfolio.CovarianceState.from_returns(returns, window=state.window)
+    np.testing.assert_allclose(state.covariance(), fresh.covariance(), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(state.correlation(), fresh.correlation(), rtol=1e-9, equal_nan=True)
+    assert state.last_date == fresh.last_date
+
+
+@pytest.mark.parametrize("window", [None, 120])
+def test_concurrent_sync_matches_fresh_fit(window):
+    returns = _returns()
+    for _ in range(20):
+        state = portfolio.CovarianceState.from_returns(returns.iloc[:300], window=window)
+        barrier = threading.Barrier(8)
+
+        def sync():
+            barrier.wait()
+            state.sync(returns)
+
+        threads = [threading.Thread(target=sync) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = returns if window is None else returns.iloc[-window:]
+        _assert_same(state, expected)
+
+
+@pytest.mark.parametrize("window", [None, 120])
+def test_sync_refits_when_history_is_readjusted(window):
+    returns = _returns()
+    state = portfolio.CovarianceState.from_returns(returns.iloc[:300], window=window)
+    adjusted = returns.copy()
+    adjusted.iloc[290] *= 1.5
+    assert state.sync(adjusted) == len(adjusted)
+    _assert_same(state, adjusted if window is None else adjusted.iloc[-window:])
+
+
+def test_sync_appends_only_new_days():
+    returns = _returns()
+    state = portfolio.CovarianceState.from_returns(returns.iloc[:300], window=120)
+    # La matriz de la siguiente consulta empieza más tarde (ventana por meses que avanza)
+    assert state.sync(returns.iloc[50:]) == 100
+    _assert_same(state, returns.iloc[-120:])
@@ -0,0 +1,46 @@
+"""
+tests/test_prefetch.py
+Un ciclo de prefetch con el proveedor de precios caído debe contar como fallo aunque la
+instantánea se pueda construir con la caché anterior.
+"""
+
+import price_cache
+from benchmarks.fakes import FakeYFinance, install
+from prefetch import PrefetchScheduler
+
+TICKERS = ["AAPL", "MSFT", "NVDA", "AMZN"]
+
+
+class DownYFinance(FakeYFinance):
+    """Proveedor que falla en todas las descargas de precios (los titulares responden)."""
+
+    def download(self, *args, **kwargs):
+        raise ConnectionError("sin conexión")
+
+
+def _expire_prices() -> None:
+    with price_cache._locked():
+        index = price_cache._read_index()
+        for meta in index.values():
+            meta["fetched_at"] = 0
+        price_cache._write_index(index)
+
+
+def test_price_outage_counts_as_failure():
+    scheduler = PrefetchScheduler(TICKERS)
+    with install(FakeYFinance()):
+        summary = scheduler.run_once()
+    assert summary["price_errors"] == []
+    assert scheduler.failures == 0
+
+    _expire_prices()
+    with install(DownYFinance()):
+        summary = scheduler.run_once()
+    assert sorted(summary["price_errors"]) == sorted(TICKERS)
+    assert summary["news_errors"] == []
+    assert scheduler.failures == 1
+
+    with install(FakeYFinance()):
+        summary = scheduler.run_once()
+    assert summary["price_errors"] == []
+    assert scheduler.failures == 0
@@ -0,0 +1,28 @@
+"""
+tests/test_price_cache.py
+Varios procesos que guardan tickers distintos a la vez no deben perder entradas del índice.
+"""
+
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+import price_cache
+
+
+def _save_many(first: int, count: int) -> None:
+    index = pd.bdate_range("2024-01-01", periods=5)
+    for i in range(first, first + count):
+        price_cache.save_prices(f"P{i}", pd.DataFrame({"Close": np.arange(5.0)}, index=index))
+
+
+def test_concurrent_processes_keep_every_index_entry():
+    price_cache.clear()
+    workers = [multiprocessing.Process(target=_save_many, args=(i * 10, 10)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert set(price_cache.all_meta()) == {f"P{i}" for i in range(40)}
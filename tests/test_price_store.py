@@ -0,0 +1,61 @@
+"""
+tests/test_price_store.py
+Publicar sustituye el manifiesto de forma atómica sin romper las vistas ya abiertas, y
+load rechaza la versión publicada cuando la caché de precios se escribió después.
+"""
+
+import numpy as np
+import pandas as pd
+
+import price_cache
+import price_store
+
+DATES = pd.bdate_range("2024-01-01", periods=4)
+
+
+def _save(ticker: str, close: float) -> dict:
+    data = pd.DataFrame({column: np.full(len(DATES), close) for column in price_store.COLUMNS}, index=DATES)
+    price_cache.save_prices(ticker, data, merge=False)
+    return price_cache.get_meta(ticker)
+
+
+def test_publish_swaps_manifest_without_breaking_readers():
+    price_store.clear()
+    _save("SWPA", 10.0)
+    _save("SWPB", 20.0)
+    first = price_store.publish(["SWPA", "SWPB"])
+    before = price_store.load("SWPA")
+
+    _save("SWPA", 11.0)
+    second = price_store.publish(["SWPA", "SWPB"])
+    assert second != first and price_store.version() == second
+    # La vista abierta sigue leyendo la versión anterior; las lecturas nuevas ven la nueva
+    assert before["Close"].tolist() == [10.0] * len(DATES)
+    assert price_store.load("SWPA")["Close"].tolist() == [11.0] * len(DATES)
+    assert price_store.load("SWPB")["Close"].tolist() == [20.0] * len(DATES)
+    assert not list(price_store.STORE_DIR.glob(".*.tmp"))
+
+
+def test_unchanged_tickers_are_copied_from_the_current_version(monkeypatch):
+    price_store.clear()
+    _save("CPYA", 1.0)
+    _save("CPYB", 2.0)
+    price_store.publish(["CPYA", "CPYB"])
+    _save("CPYB", 3.0)
+    read = []
+    load_prices = price_cache.load_prices
+    monkeypatch.setattr(price_cache, "load_prices", lambda ticker: read.append(ticker) or load_prices(ticker))
+    price_store.publish(["CPYA", "CPYB"])
+    assert read == ["CPYB"]
+
+
+def test_stale_version_is_rejected():
+    price_store.clear()
+    published = _save("STAL", 5.0)
+    price_store.publish(["STAL"])
+    assert price_store.load("STAL", saved_at=published["saved_at"]) is not None
+
+    # Escritura en la caché aún no publicada: la versión del almacén queda atrasada
+    newer = _save("STAL", 6.0)
+    assert newer["saved_at"] != published["saved_at"]
+    assert price_store.load("STAL", saved_at=newer["saved_at"]) is None
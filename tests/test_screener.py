@@ -0,0 +1,28 @@
+"""
+tests/test_screener.py
+La escala completa de volatilidad del screener debe incluir a todos los tickers.
+"""
+
+import numpy as np
+import pandas as pd
+
+from screener import filter_snapshot, volatility_ceiling
+
+
+def test_ceiling_covers_most_volatile_ticker():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        snapshot = pd.DataFrame({"volatility": np.round(rng.uniform(0.05, 1.5, 10), 4)})
+        top = volatility_ceiling(snapshot)
+        filtered = filter_snapshot(snapshot, volatility_range=(0.0, top / 100))
+        assert len(filtered) == len(snapshot)
+
+
+def test_ceiling_without_finite_values():
+    assert volatility_ceiling(pd.DataFrame({"volatility": [np.nan, None]})) == 100.0
+
+
+def test_no_volatility_filter_keeps_missing_values():
+    snapshot = pd.DataFrame({"ticker": ["A", "B"], "volatility": [0.2, np.nan]})
+    assert list(filter_snapshot(snapshot)["ticker"]) == ["A", "B"]
+    assert list(filter_snapshot(snapshot, volatility_range=(0.0, 1.0))["ticker"]) == ["A"]